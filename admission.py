@@ -0,0 +1,285 @@
+"""
+Admission Module
+
+This module bounds how much expensive work the app takes on at once. Each
+admission controller lets a fixed number of requests run, queues a bounded
+number of others in priority order, and sheds the rest: a request that finds
+the queue full, or waits longer than the queue timeout, fails fast with
+Overloaded instead of piling up memory and latency during a spike. The error
+carries a Retry-After estimate derived from how long admitted work holds its
+slot, so callers can answer with a 503 or fall back to cached content.
+
+Controllers guard /extract cache misses, home page cache misses and, through
+the summarization engine, Gemini summaries.
+"""
+
+import math
+import time
+import heapq
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, List, Set, Tuple, Type, Union
+
+from config import (
+    EXTRACT_CONCURRENCY,
+    EXTRACT_QUEUE_SIZE,
+    EXTRACT_QUEUE_TIMEOUT,
+    HOME_CONCURRENCY,
+    HOME_QUEUE_SIZE,
+    HOME_QUEUE_TIMEOUT,
+    logger
+)
+from metrics import ADMISSION_ACTIVE, ADMISSION_QUEUED, ADMISSION_SHED, ADMISSION_WAIT_SECONDS
+
+# Lower values are served first
+PRIORITY_USER = 0
+PRIORITY_BACKGROUND = 10
+
+# Bounds for the Retry-After sent with shed requests, in seconds
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 60
+
+class Overloaded(Exception):
+    """Raised when a request is shed because the controller is at capacity."""
+
+    def __init__(self, message: str, retry_after: int = MIN_RETRY_AFTER):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class SharedPriority:
+    """
+    Queue priority of work shared by several callers, such as a coalesced
+    extraction. A caller that joins with a more urgent priority raises it, and
+    requests still waiting in the queue are moved up accordingly.
+    """
+
+    def __init__(self, value: int):
+        self.value = value
+        self._requeues: Set[Callable[[], None]] = set()
+
+    def raise_to(self, value: int) -> None:
+        """
+        Raise the priority to `value` if that is more urgent (lower).
+
+        Args:
+            value (int): The joining caller's priority
+        """
+        if value < self.value:
+            self.value = value
+            for requeue in list(self._requeues):
+                requeue()
+
+class SharedPriorities:
+    """
+    The SharedPriority of each in-flight piece of shared work, by coalescing key.
+    """
+
+    def __init__(self):
+        self._priorities: Dict[str, SharedPriority] = {}
+
+    def join(self, key: str, priority: int) -> SharedPriority:
+        """
+        Get the key's shared priority, raised to `priority`, or start one.
+
+        Args:
+            key (str): The coalescing key
+            priority (int): The caller's priority
+
+        Returns:
+            SharedPriority: The priority to run the shared work with
+        """
+        shared = self._priorities.get(key)
+        if shared:
+            shared.raise_to(priority)
+        else:
+            shared = self._priorities[key] = SharedPriority(priority)
+        return shared
+
+    def forget(self, key: str, shared: SharedPriority) -> None:
+        """Drop the key's shared priority once its work is done, unless a newer one replaced it."""
+        if self._priorities.get(key) is shared:
+            del self._priorities[key]
+
+class AdmissionController:
+    """
+    Concurrency limit with a bounded, priority-ordered wait queue.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        concurrency: int,
+        queue_size: int,
+        queue_timeout: float,
+        error: Type[Overloaded] = Overloaded
+    ):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.error = error
+        self.active = 0
+        self.admitted = 0
+        self.shed = {"queue_full": 0, "timeout": 0}
+        self.hold_seconds = None  # moving average of how long a slot is held
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        _controllers.append(self)
+
+    @property
+    def queued(self) -> int:
+        # A requeued waiter has more than one entry in the heap
+        return len({waiter for _, _, waiter in self._waiters if not waiter.done()})
+
+    def retry_after(self) -> int:
+        """
+        Estimate when a shed request is likely to be admitted.
+
+        Returns:
+            int: Seconds, for a Retry-After header
+        """
+        if self.hold_seconds is None:
+            estimate = self.queue_timeout
+        else:
+            estimate = self.hold_seconds * (self.queued + 1) / max(self.concurrency, 1)
+        return int(min(max(math.ceil(estimate), MIN_RETRY_AFTER), MAX_RETRY_AFTER))
+
+    def stats(self) -> dict:
+        """
+        Get controller counters for monitoring.
+
+        Returns:
+            dict: Running and queued requests, limits, admitted and shed counts
+        """
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "concurrency": self.concurrency,
+            "queue_size": self.queue_size,
+            "admitted": self.admitted,
+            "shed": dict(self.shed)
+        }
+
+    @asynccontextmanager
+    async def slot(self, priority: Union[int, SharedPriority] = PRIORITY_USER):
+        """
+        Hold one slot for the duration of the block.
+
+        Args:
+            priority (Union[int, SharedPriority], optional): Queue priority, lower is served first. Defaults to PRIORITY_USER.
+
+        Raises:
+            Overloaded: If the queue is full or the wait exceeds the queue timeout
+        """
+        await self.acquire(priority)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    def _shed(self, reason: str, message: str) -> Overloaded:
+        self.shed[reason] += 1
+        ADMISSION_SHED.inc(queue=self.name, reason=reason)
+        logger.warning(f"Shedding {self.name} request: {message}")
+        return self.error(message, self.retry_after())
+
+    def _admit(self) -> None:
+        self.admitted += 1
+        ADMISSION_ACTIVE.set(self.active, queue=self.name)
+        ADMISSION_QUEUED.set(self.queued, queue=self.name)
+
+    async def acquire(self, priority: Union[int, SharedPriority] = PRIORITY_USER) -> None:
+        """
+        Take a slot, waiting in the queue if none is free. Must be followed by release().
+
+        Args:
+            priority (Union[int, SharedPriority], optional): Queue priority, lower is served first.
+                A SharedPriority raised while waiting moves the request up. Defaults to PRIORITY_USER.
+
+        Raises:
+            Overloaded: If the queue is full or the wait exceeds the queue timeout
+        """
+        if self.active < self.concurrency and not self._has_waiters():
+            self.active += 1
+            self._admit()
+            return
+
+        if self.queued >= self.queue_size:
+            raise self._shed("queue_full", f"{self.name} queue is full")
+
+        started = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        shared = priority if isinstance(priority, SharedPriority) else None
+
+        def push() -> None:
+            # An entry pushed on a raise supersedes the older one, which is skipped once the waiter is done
+            if not waiter.done():
+                heapq.heappush(self._waiters, (shared.value if shared else priority, next(self._sequence), waiter))
+
+        push()
+        if shared:
+            shared._requeues.add(push)
+        ADMISSION_QUEUED.set(self.queued, queue=self.name)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the wait timed out
+                self._admit()
+                return
+            waiter.cancel()
+            ADMISSION_QUEUED.set(self.queued, queue=self.name)
+            raise self._shed("timeout", f"Timed out waiting for a {self.name} slot")
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            if shared:
+                shared._requeues.discard(push)
+        ADMISSION_WAIT_SECONDS.observe(time.monotonic() - started, queue=self.name)
+        self._admit()
+
+    def release(self, held: float = None) -> None:
+        """
+        Give a slot back, handing it straight to the highest-priority live waiter.
+
+        Args:
+            held (float, optional): Seconds the slot was held, for the Retry-After estimate
+        """
+        if held is not None:
+            self.hold_seconds = held if self.hold_seconds is None else 0.8 * self.hold_seconds + 0.2 * held
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+        ADMISSION_ACTIVE.set(self.active, queue=self.name)
+
+    def _has_waiters(self) -> bool:
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+        return bool(self._waiters)
+
+# Every controller, for monitoring
+_controllers: List[AdmissionController] = []
+
+# Extractions of uncached articles (a Tavily/Exa race, hedged)
+extract_admission = AdmissionController("extract", EXTRACT_CONCURRENCY, EXTRACT_QUEUE_SIZE, EXTRACT_QUEUE_TIMEOUT)
+
+# Home page requests that need new domain searches
+home_admission = AdmissionController("home", HOME_CONCURRENCY, HOME_QUEUE_SIZE, HOME_QUEUE_TIMEOUT)
+
+def get_admission_stats() -> Dict[str, dict]:
+    """
+    Get the state of every admission controller.
+
+    Returns:
+        Dict[str, dict]: Controller stats keyed by name
+    """
+    return {controller.name: controller.stats() for controller in _controllers}
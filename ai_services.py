@@ -3,45 +3,86 @@ AI Services Module
 
 This module contains functions for interacting with AI services like Google Gemini.
 It handles text summarization and other AI-powered content processing tasks.
+Long articles are summarized map-reduce style: the text is split into chunks
+on paragraph boundaries, the chunks are summarized concurrently, and the chunk
+summaries are reduced into the final summary.
 """
 
 import re
 import asyncio
 import logging
-from typing import Optional
+from typing import AsyncIterator, Dict, List, Optional, Union
 
-import google.generativeai as genai
-from config import GEMINI_API_KEY, GEMINI_MODEL, GEMINI_TEMPERATURE, GEMINI_MAX_TOKENS, GEMINI_TOP_P, logger
-from cache import get_cached_summary, cache_summary
+from config import (
+    GEMINI_API_KEY,
+    GEMINI_TEMPERATURE,
+    GEMINI_MAX_TOKENS,
+    GEMINI_TOP_P,
+    SUMMARY_SINGLE_SHOT_TOKENS,
+    SUMMARY_CHUNK_TOKENS,
+    SUMMARY_MAP_CONCURRENCY,
+    logger
+)
+from utils import CJK_PATTERN, estimate_tokens, with_text_fields
+from cache import generate_cache_key, get_cached_summary, cache_summary, get_cached_chunk_summary, cache_chunk_summary
+from summarizer import engine, SummaryOverloaded
+from admission import SharedPriorities, SharedPriority, PRIORITY_USER
+from singleflight import SingleFlight
 
-async def generate_summary_with_gemini(content: str, title: str = "") -> Optional[str]:
+# Coalesces concurrent summaries of the same content
+summary_flight = SingleFlight("summary")
+# Engine priority of each in-flight summary, one-shot or streamed, raised when a more urgent caller joins
+_summary_priorities = SharedPriorities()
+
+class SummaryBroadcast:
     """
-    Generate a summary of the content using Google Gemini API.
-    
-    Args:
-        content (str): The HTML content to summarize
-        title (str, optional): The title of the content. Defaults to "".
-        
-    Returns:
-        Optional[str]: The generated summary in Simplified Chinese, or None if generation failed
+    One streamed summary generation, replayed to every caller that joins it.
     """
-    if not GEMINI_API_KEY:
-        logger.warning("GEMINI_API_KEY not found, skipping summarization")
-        return None
-    
-    try:
-        # Check cache first
-        cached_summary = await get_cached_summary(content, title)
-        if cached_summary:
-            logger.info(f"Using cached summary for content with title: {title}")
-            return cached_summary
-            
-        # Strip HTML tags from content for better summarization
-        clean_content = re.sub(r'<[^>]+>', ' ', content)
-        clean_content = re.sub(r'\s+', ' ', clean_content).strip()
-        
-        # Create the system prompt with the content
-        system_prompt = """
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def _notify(self) -> None:
+        # Wake every waiting subscriber; later waits use a fresh event
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def publish(self, chunk: str) -> None:
+        self.chunks.append(chunk)
+        self._notify()
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.done = True
+        self.error = error
+        self._notify()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        """
+        Yield every chunk generated so far, then new chunks as they arrive.
+
+        Raises:
+            SummaryOverloaded: If the generation was shed
+        """
+        index = 0
+        while True:
+            while index < len(self.chunks):
+                yield self.chunks[index]
+                index += 1
+            if self.done:
+                if self.error:
+                    raise self.error
+                return
+            await self._changed.wait()
+
+# Streamed generations in flight, by summary cache key
+_summary_streams: Dict[str, SummaryBroadcast] = {}
+
+# Summarization prompt; {context} is replaced with the cleaned article text
+SUMMARY_PROMPT_TEMPLATE = """
         <system_prompt>
           <role>expert_assistant</role>
           <task>Create concise, accurate summaries from a provided text.</task>
@@ -102,31 +143,274 @@ async def generate_summary_with_gemini(content: str, title: str = "") -> Optiona
           </guidelines>
           <goal>Deliver a self-contained summary that faithfully reflects the original content's message and intent, with clear formatting and minimal extraneous markings, in Simplified Chinese.</goal>
         </system_prompt>
-        """.replace("{context}", clean_content)
+        """
+
+# Prompt for the map step of long-article summarization
+CHUNK_PROMPT_TEMPLATE = """
+        <system_prompt>
+          <role>expert_assistant</role>
+          <task>Summarize one section of a longer article so the section summaries can later be combined into one summary.</task>
+          <section>{section}</section>
+          <input_context>{context}</input_context>
+          <guidelines>
+            <instruction id="1">Keep every key fact, figure, name and quote needed to understand the section.</instruction>
+            <instruction id="2">Remain factually accurate; avoid adding or altering information.</instruction>
+            <instruction id="3">Output must be in Simplified Chinese, as concise plain paragraphs without markup.</instruction>
+          </guidelines>
+        </system_prompt>
+        """
+
+def _split_oversized(piece: str, max_tokens: int) -> List[str]:
+    # Break a paragraph that is too large on its own: by line, then sentence, then hard cut
+    for pattern in (r'\n', r'(?<=[。！？.!?])\s*'):
+        parts = [part for part in re.split(pattern, piece) if part.strip()]
+        if len(parts) > 1:
+            return parts
+    max_chars = max_tokens if CJK_PATTERN.search(piece) else max_tokens * 4
+    return [piece[i:i + max_chars] for i in range(0, len(piece), max_chars)]
+
+def split_into_chunks(text: str, max_tokens: int) -> List[str]:
+    """
+    Split text into chunks of at most max_tokens, on paragraph boundaries where possible.
+    
+    Args:
+        text (str): Plain text with paragraphs separated by blank lines
+        max_tokens (int): The token budget per chunk
         
-        # Configure the model
-        model = genai.GenerativeModel(GEMINI_MODEL)
+    Returns:
+        List[str]: The chunks, in order
+    """
+    pieces = [piece.strip() for piece in re.split(r'\n\s*\n', text) if piece.strip()]
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    
+    while pieces:
+        piece = pieces.pop(0)
+        tokens = estimate_tokens(piece)
+        if tokens > max_tokens:
+            pieces[:0] = _split_oversized(piece, max_tokens)
+            continue
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += tokens
+    
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+def get_generation_config() -> dict:
+    """
+    Get the Gemini generation settings.
+    
+    Returns:
+        dict: The generation config
+    """
+    return {
+        "temperature": GEMINI_TEMPERATURE,
+        "top_p": GEMINI_TOP_P,
+        "max_output_tokens": GEMINI_MAX_TOKENS,
+    }
+
+async def _generate_text(prompt: str, priority: Union[int, SharedPriority] = PRIORITY_USER) -> Optional[str]:
+    """
+    Run a single Gemini generation through the summarization engine.
+    
+    Args:
+        prompt (str): The full prompt
+        priority (Union[int, SharedPriority], optional): Engine queue priority. Defaults to PRIORITY_USER.
         
-        # Generate the summary
-        response = await asyncio.to_thread(
-            model.generate_content,
-            system_prompt,
-            generation_config={
-                "temperature": GEMINI_TEMPERATURE,
-                "top_p": GEMINI_TOP_P,
-                "max_output_tokens": GEMINI_MAX_TOKENS,
-            }
+    Returns:
+        Optional[str]: The generated text, or None if the response was empty
+    """
+    return await engine.generate(prompt, get_generation_config(), priority)
+
+async def _summarize_chunk(chunk: str, index: int, total: int, semaphore: asyncio.Semaphore, priority: Union[int, SharedPriority]) -> Optional[str]:
+    cached_summary = await get_cached_chunk_summary(chunk)
+    if cached_summary:
+        return cached_summary
+    
+    async with semaphore:
+        prompt = CHUNK_PROMPT_TEMPLATE.replace("{section}", f"{index + 1}/{total}").replace("{context}", chunk)
+        summary = await _generate_text(prompt, priority)
+    
+    if summary:
+        await cache_chunk_summary(chunk, summary)
+    return summary
+
+async def prepare_summary_prompt(content_data: Dict, priority: Union[int, SharedPriority] = PRIORITY_USER) -> str:
+    """
+    Build the final summarization prompt, reducing long content first.
+    
+    Short content uses the single-shot prompt. Longer content is split into
+    chunks that are summarized concurrently (map), and the chunk summaries
+    become the context of the final prompt (reduce).
+    
+    Args:
+        content_data (Dict): The extraction result, with its plain text and token count
+        priority (Union[int, SharedPriority], optional): Engine queue priority for chunk summaries. Defaults to PRIORITY_USER.
+        
+    Returns:
+        str: The prompt for the final summary
+    
+    Raises:
+        RuntimeError: If a chunk could not be summarized
+    """
+    text = content_data["text"]
+    tokens = content_data["token_count"]
+    semaphore = asyncio.Semaphore(SUMMARY_MAP_CONCURRENCY)
+    # Repeat the map step until the chunk summaries fit in a single prompt
+    while tokens > SUMMARY_SINGLE_SHOT_TOKENS:
+        chunks = split_into_chunks(text, SUMMARY_CHUNK_TOKENS)
+        logger.info(f"Summarizing long content in {len(chunks)} chunks")
+        summaries = await asyncio.gather(
+            *[_summarize_chunk(chunk, index, len(chunks), semaphore, priority) for index, chunk in enumerate(chunks)]
         )
+        if not all(summaries):
+            raise RuntimeError("Failed to summarize one or more content chunks")
+        reduced = "\n\n".join(summaries)
+        reduced_tokens = estimate_tokens(reduced)
+        if len(chunks) == 1 or reduced_tokens >= tokens:
+            text = reduced
+            break
+        text, tokens = reduced, reduced_tokens
+    
+    return SUMMARY_PROMPT_TEMPLATE.replace("{context}", text)
+
+async def generate_summary_with_gemini(content_data: Dict, priority: int = PRIORITY_USER) -> Optional[str]:
+    """
+    Generate a summary of an extracted article using Google Gemini API.
+    A user request that joins a summary started in the background raises its
+    engine priority, so it is not queued or shed as background work.
+    
+    Args:
+        content_data (Dict): The extraction result
+        priority (int, optional): Engine queue priority. Defaults to PRIORITY_USER.
+        
+    Returns:
+        Optional[str]: The generated summary in Simplified Chinese, or None if generation failed
+    
+    Raises:
+        SummaryOverloaded: If the summarization engine is at capacity
+    """
+    if not GEMINI_API_KEY:
+        logger.warning("GEMINI_API_KEY not found, skipping summarization")
+        return None
+    
+    content_data = with_text_fields(content_data)
+    key = generate_cache_key("summary", content_data["content_hash"], content_data.get("title", ""))
+    shared = _summary_priorities.join(key, priority)
+    summary = await summary_flight.do(key, lambda: _generate_summary_with_gemini(content_data, key, shared))
+    # Also covers joining a flight that was already finishing, after it dropped its priority
+    _summary_priorities.forget(key, shared)
+    return summary
+
+async def _generate_summary_with_gemini(content_data: Dict, key: str, priority: SharedPriority) -> Optional[str]:
+    content_hash, title = content_data["content_hash"], content_data.get("title", "")
+    try:
+        # Check cache first
+        cached_summary = await get_cached_summary(content_hash, title)
+        if cached_summary:
+            logger.info(f"Using cached summary for content with title: {title}")
+            return cached_summary
+            
+        system_prompt = await prepare_summary_prompt(content_data, priority)
         
-        if response and response.text:
+        # Generate the summary
+        summary = await _generate_text(system_prompt, priority)
+        
+        if summary:
             logger.info(f"Successfully generated summary with Gemini")
             # Cache the summary
-            await cache_summary(content, title, response.text)
-            return response.text
+            await cache_summary(content_hash, title, summary)
+            return summary
         else:
             logger.warning(f"Empty response from Gemini API")
             return None
             
+    except SummaryOverloaded:
+        logger.warning(f"Summarization engine at capacity, deferring summary for: {title}")
+        raise
     except Exception as e:
         logger.error(f"Error generating summary with Gemini: {str(e)}")
-        return None 
\ No newline at end of file
+        return None
+    finally:
+        _summary_priorities.forget(key, priority)
+
+async def stream_summary_with_gemini(content_data: Dict, priority: int = PRIORITY_USER) -> AsyncIterator[str]:
+    """
+    Stream a summary of the content from Google Gemini API as it is generated.
+    A cached summary is yielded as a single chunk. Concurrent streams of the
+    same content share one generation, across workers too: a worker that finds
+    another generating the summary waits for it and streams the cached result.
+    The complete summary is cached once generation finishes.
+    
+    Args:
+        content_data (Dict): The extraction result
+        priority (int, optional): Engine queue priority. Defaults to PRIORITY_USER.
+        
+    Yields:
+        str: Chunks of the summary in Simplified Chinese
+    
+    Raises:
+        SummaryOverloaded: If the summarization engine is at capacity
+    """
+    if not GEMINI_API_KEY:
+        logger.warning("GEMINI_API_KEY not found, skipping summarization")
+        return
+    
+    content_data = with_text_fields(content_data)
+    content_hash, title = content_data["content_hash"], content_data.get("title", "")
+    cached_summary = await get_cached_summary(content_hash, title)
+    if cached_summary:
+        logger.info(f"Using cached summary for content with title: {title}")
+        yield cached_summary
+        return
+    
+    # Concurrent streams of the same summary share one generation; joiners replay what was already generated
+    # and raise its priority if theirs is more urgent
+    key = generate_cache_key("summary", content_hash, title)
+    shared = _summary_priorities.join(key, priority)
+    broadcast = _summary_streams.get(key)
+    if broadcast is None:
+        broadcast = _summary_streams[key] = SummaryBroadcast()
+        broadcast.task = asyncio.ensure_future(_stream_summary(broadcast, key, content_data, shared))
+    else:
+        logger.info(f"Joining in-flight summary stream for: {title}")
+    async for chunk in broadcast.subscribe():
+        yield chunk
+
+async def _stream_summary(broadcast: SummaryBroadcast, key: str, content_data: Dict, priority: SharedPriority) -> None:
+    # Runs on its own task, so a subscriber that disconnects does not stop the others.
+    # Holds the same cross-worker lock as generate_summary_with_gemini.
+    title = content_data.get("title", "")
+    error = None
+    try:
+        await summary_flight.exclusive(key, lambda: _publish_summary(broadcast, content_data, priority))
+    except SummaryOverloaded as e:
+        logger.warning(f"Summarization engine at capacity, deferring summary for: {title}")
+        error = e
+    except Exception as e:
+        logger.error(f"Error streaming summary with Gemini: {str(e)}")
+    finally:
+        _summary_streams.pop(key, None)
+        _summary_priorities.forget(key, priority)
+        broadcast.finish(error)
+
+async def _publish_summary(broadcast: SummaryBroadcast, content_data: Dict, priority: SharedPriority) -> None:
+    content_hash, title = content_data["content_hash"], content_data.get("title", "")
+    # Another worker may have generated the summary while this one waited for the lock
+    cached_summary = await get_cached_summary(content_hash, title)
+    if cached_summary:
+        logger.info(f"Using cached summary for content with title: {title}")
+        broadcast.publish(cached_summary)
+        return
+    
+    system_prompt = await prepare_summary_prompt(content_data, priority)
+    async for chunk in engine.stream(system_prompt, get_generation_config(), priority):
+        broadcast.publish(chunk)
+    if broadcast.chunks:
+        logger.info(f"Successfully streamed summary with Gemini")
+        await cache_summary(content_hash, title, "".join(broadcast.chunks))
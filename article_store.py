@@ -0,0 +1,299 @@
+"""
+Article Store Module
+
+This module keeps every article fetched from Exa, and every extracted article
+body, in a local SQLite database, so they outlive their cache entries. The
+store indexes articles by domain, source and published date and keeps a
+full-text index (FTS5) over titles and bodies. It serves the /search and
+/api/articles endpoints without any upstream calls.
+
+The full-text index uses the trigram tokenizer when SQLite supports it, which
+also matches Chinese text; keywords shorter than three characters fall back to
+a substring scan.
+"""
+
+import os
+import html
+import time
+import asyncio
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from config import logger
+from models import Article
+
+ARTICLE_STORE_PATH = os.getenv('ARTICLE_STORE_PATH', 'articles.db')  # empty disables the store
+ARTICLE_SEARCH_MAX_LIMIT = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    url TEXT PRIMARY KEY,
+    domain TEXT NOT NULL,
+    source TEXT,
+    title TEXT,
+    published_date TEXT,
+    fetched_at REAL NOT NULL,
+    content TEXT,
+    content_source TEXT,
+    extracted_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_articles_domain_date ON articles (domain, published_date DESC);
+CREATE INDEX IF NOT EXISTS idx_articles_source ON articles (source);
+CREATE INDEX IF NOT EXISTS idx_articles_published ON articles (published_date DESC);
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+    title, content, content='articles', content_rowid='rowid', tokenize='{tokenizer}'
+);
+CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts (rowid, title, content) VALUES (new.rowid, new.title, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN
+    INSERT INTO articles_fts (articles_fts, rowid, title, content) VALUES ('delete', old.rowid, old.title, old.content);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_au AFTER UPDATE OF title, content ON articles BEGIN
+    INSERT INTO articles_fts (articles_fts, rowid, title, content) VALUES ('delete', old.rowid, old.title, old.content);
+    INSERT INTO articles_fts (rowid, title, content) VALUES (new.rowid, new.title, new.content);
+END;
+"""
+
+def _trigram_supported() -> bool:
+    try:
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE VIRTUAL TABLE probe USING fts5(text, tokenize='trigram')")
+        conn.close()
+        return True
+    except sqlite3.Error:
+        return False
+
+class ArticleStore:
+    """
+    SQLite-backed store of fetched articles and extracted bodies with full-text search.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.min_token_length = 3
+        self._lock = threading.Lock()
+        # Opened by open(), or on first use, so creating the store does no I/O
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> None:
+        if self._conn is not None:
+            return
+        self.min_token_length = 3 if _trigram_supported() else 1
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA.format(tokenizer="trigram" if self.min_token_length == 3 else "unicode61"))
+        self._conn = conn
+        logger.info(f"Article store opened at {self.path}")
+
+    def _close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    async def _run(self, fn, *args):
+        return await asyncio.to_thread(self._locked, fn, *args)
+
+    def _locked(self, fn, *args):
+        with self._lock:
+            self._connect()
+            return fn(*args)
+
+    def _save_articles(self, domain: str, results: List[Dict]) -> None:
+        now = time.time()
+        rows = []
+        for result in results:
+            url = result.get('url')
+            if not url:
+                continue
+            rows.append((
+                url,
+                domain,
+                Article.get_source_from_url(url),
+                result.get('title'),
+                result.get('publishedDate'),
+                now
+            ))
+        with self._conn:
+            # Keep any extracted body; refresh the listing fields
+            self._conn.executemany(
+                """
+                INSERT INTO articles (url, domain, source, title, published_date, fetched_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (url) DO UPDATE SET
+                    title = COALESCE(excluded.title, articles.title),
+                    published_date = COALESCE(excluded.published_date, articles.published_date),
+                    fetched_at = excluded.fetched_at
+                """,
+                rows
+            )
+
+    def _save_content(self, url: str, content_data: Dict) -> None:
+        now = time.time()
+        with self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO articles (url, domain, source, title, fetched_at, content, content_source, extracted_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (url) DO UPDATE SET
+                    title = COALESCE(articles.title, excluded.title),
+                    content = excluded.content,
+                    content_source = excluded.content_source,
+                    extracted_at = excluded.extracted_at
+                """,
+                (
+                    url,
+                    urlparse(url).netloc,
+                    Article.get_source_from_url(url),
+                    content_data.get('title'),
+                    now,
+                    content_data.get('text') or content_data.get('content'),
+                    content_data.get('source'),
+                    now
+                )
+            )
+
+    def _search(
+        self,
+        query: Optional[str],
+        domains: Optional[List[str]],
+        since: Optional[str],
+        until: Optional[str],
+        limit: int,
+        offset: int
+    ) -> List[Dict]:
+        conditions, params = [], []
+        match_terms = []
+        for keyword in (query or "").split():
+            if len(keyword) >= self.min_token_length:
+                match_terms.append('"' + keyword.replace('"', '""') + '"')
+            else:
+                conditions.append("(a.title LIKE ? OR a.content LIKE ?)")
+                params.extend([f"%{keyword}%", f"%{keyword}%"])
+        if domains:
+            conditions.append(f"a.domain IN ({','.join('?' * len(domains))})")
+            params.extend(domains)
+        if since:
+            conditions.append("a.published_date >= ?")
+            params.append(since)
+        if until:
+            # Dates are ISO strings; include the whole `until` day
+            conditions.append("a.published_date < date(?, '+1 day')")
+            params.append(until)
+
+        columns = "a.url, a.domain, a.source, a.title, a.published_date, a.content_source, a.content IS NOT NULL AS has_content"
+        if match_terms:
+            sql = (
+                f"SELECT {columns}, snippet(articles_fts, 1, char(2), char(3), '…', 24) AS snippet "
+                "FROM articles_fts JOIN articles a ON a.rowid = articles_fts.rowid "
+                "WHERE articles_fts MATCH ?"
+            )
+            params.insert(0, " AND ".join(match_terms))
+        else:
+            sql = f"SELECT {columns}, NULL AS snippet FROM articles a WHERE 1 = 1"
+        for condition in conditions:
+            sql += f" AND {condition}"
+        sql += " ORDER BY a.published_date DESC, a.fetched_at DESC LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+        rows = [dict(row) for row in self._conn.execute(sql, params).fetchall()]
+        for row in rows:
+            row["has_content"] = bool(row["has_content"])
+            if row["snippet"]:
+                # Bodies may contain markup; escape them and keep only the match highlights
+                row["snippet"] = html.escape(row["snippet"]).replace("\x02", "<mark>").replace("\x03", "</mark>")
+        return rows
+
+    def _stats(self) -> Dict[str, int]:
+        row = self._conn.execute("SELECT COUNT(*), COUNT(content) FROM articles").fetchone()
+        return {"articles": row[0], "with_content": row[1]}
+
+    async def save_articles(self, domain: str, results: List[Dict]) -> None:
+        """
+        Record the articles returned by a domain search.
+
+        Args:
+            domain (str): The domain that was searched
+            results (List[Dict]): The Exa search results
+        """
+        try:
+            await self._run(self._save_articles, domain, results)
+        except Exception as e:
+            logger.error(f"Error storing articles for {domain}: {str(e)}")
+
+    async def save_content(self, url: str, content_data: Dict) -> None:
+        """
+        Record the extracted body of an article.
+
+        Args:
+            url (str): The article URL
+            content_data (Dict): The extraction result (title, content, source)
+        """
+        try:
+            await self._run(self._save_content, url, content_data)
+        except Exception as e:
+            logger.error(f"Error storing content for {url}: {str(e)}")
+
+    async def search(
+        self,
+        query: Optional[str] = None,
+        domains: Optional[List[str]] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0
+    ) -> List[Dict]:
+        """
+        Search stored articles, newest first.
+
+        Args:
+            query (str, optional): Space-separated keywords, all of which must match the title or body
+            domains (List[str], optional): Only articles from these domains
+            since (str, optional): Earliest published date (YYYY-MM-DD)
+            until (str, optional): Latest published date (YYYY-MM-DD), inclusive
+            limit (int, optional): Maximum number of results. Defaults to 50.
+            offset (int, optional): Number of results to skip. Defaults to 0.
+
+        Returns:
+            List[Dict]: Matching articles, with a highlighted snippet when keywords are given
+        """
+        limit = max(1, min(limit, ARTICLE_SEARCH_MAX_LIMIT))
+        return await self._run(self._search, query, domains, since, until, limit, max(offset, 0))
+
+    async def stats(self) -> Dict[str, int]:
+        """
+        Get store counters for monitoring.
+
+        Returns:
+            Dict[str, int]: Stored articles, and how many have an extracted body
+        """
+        return await self._run(self._stats)
+
+    async def open(self) -> None:
+        """Open the database and create the schema, if not done yet."""
+        try:
+            await asyncio.to_thread(self._locked, lambda: None)
+        except Exception as e:
+            logger.error(f"Error opening article store: {str(e)}")
+
+    async def close(self) -> None:
+        await asyncio.to_thread(self._close)
+
+def create_article_store(path: str = ARTICLE_STORE_PATH) -> Optional[ArticleStore]:
+    """
+    Create the article store, unless it is disabled. The database is opened
+    by the app lifespan, or on first use.
+
+    Returns:
+        Optional[ArticleStore]: The store, or None if disabled
+    """
+    if not path:
+        logger.info("Article store disabled")
+        return None
+    return ArticleStore(path)
+
+article_store = create_article_store()
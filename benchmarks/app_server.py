@@ -0,0 +1,47 @@
+"""
+Benchmark App Server
+
+Runs the FastAPI app under uvicorn for a benchmark, with the Gemini client
+pointed at the stub gRPC server. The other upstreams are redirected through
+environment variables set by the runner (EXA_API_BASE_URL, TAVILY_API_BASE_URL
+and UPSTASH_REDIS_REST_URL), so the app code itself is unchanged.
+
+Usage: python benchmarks/app_server.py --port 8081 --gemini-target 127.0.0.1:8901
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # templates and static files are resolved relative to the repo root
+
+import grpc
+import uvicorn
+from google.ai.generativelanguage_v1beta.services.generative_service.transports.grpc_asyncio import (
+    GenerativeServiceGrpcAsyncIOTransport
+)
+
+async def serve(port: int, gemini_target: str) -> None:
+    from main import app
+    from summarizer import configure_gemini
+
+    # The channel has to be created on the loop that serves requests
+    channel = grpc.aio.insecure_channel(gemini_target)
+    # An empty key keeps the pool's key off the client, since a transport instance does not accept one
+    configure_gemini(api_key="", transport=GenerativeServiceGrpcAsyncIOTransport(channel=channel))
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    try:
+        await server.serve()
+    finally:
+        await channel.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the app against the benchmark stubs")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--gemini-target", required=True, help="host:port of the stub Gemini gRPC server")
+    args = parser.parse_args()
+    asyncio.run(serve(args.port, args.gemini_target))
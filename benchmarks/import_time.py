@@ -0,0 +1,87 @@
+"""
+Import Time Report
+
+Measures how long `import main` takes in a fresh interpreter, which is most of
+the app's cold start, and breaks it down by module using `python -X importtime`.
+Use --budget-ms in CI to fail when a change makes startup slower:
+
+    python benchmarks/import_time.py --runs 5 --budget-ms 1500
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LINE_PATTERN = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+def measure(module: str) -> List[Tuple[int, int, int, str]]:
+    """
+    Import a module in a fresh interpreter.
+
+    Returns:
+        List[Tuple[int, int, int, str]]: (self µs, cumulative µs, nesting depth, module) per imported module
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    entries = []
+    for line in result.stderr.splitlines():
+        match = LINE_PATTERN.match(line)
+        if match:
+            entries.append((int(match.group(1)), int(match.group(2)), len(match.group(3)) // 2, match.group(4)))
+    return entries
+
+def breakdown(entries: List[Tuple[int, int, int, str]], module: str) -> Dict:
+    total = next(cumulative for _, cumulative, _, name in entries if name == module)
+    # Direct imports of the measured module, as the app sees them
+    direct = sorted(
+        ((name, cumulative) for _, cumulative, depth, name in entries if depth == 1),
+        key=lambda item: item[1], reverse=True
+    )
+    # Own time per top-level package, wherever it was imported from
+    packages: Dict[str, int] = defaultdict(int)
+    for self_time, _, _, name in entries:
+        packages[name.split(".")[0]] += self_time
+    return {
+        "total": total,
+        "direct": direct,
+        "packages": sorted(packages.items(), key=lambda item: item[1], reverse=True)
+    }
+
+def main(args) -> int:
+    runs = [breakdown(measure(args.module), args.module) for _ in range(args.runs)]
+    # Report the median run; the first run also pays for cold disk caches
+    runs.sort(key=lambda run: run["total"])
+    report = runs[len(runs) // 2]
+    totals = [run["total"] / 1000 for run in runs]
+
+    print(f"import {args.module}: median {statistics.median(totals):.1f} ms "
+          f"(min {min(totals):.1f}, max {max(totals):.1f}, {args.runs} runs)\n")
+    print(f"{'direct import':<40}{'cumulative ms':>15}")
+    for name, cumulative in report["direct"][:args.top]:
+        print(f"{name:<40}{cumulative / 1000:>15.1f}")
+    print(f"\n{'package':<40}{'self ms':>15}")
+    for name, self_time in report["packages"][:args.top]:
+        print(f"{name:<40}{self_time / 1000:>15.1f}")
+
+    if args.budget_ms and statistics.median(totals) > args.budget_ms:
+        print(f"\nImport time exceeds the budget of {args.budget_ms} ms", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report the app's import time by module")
+    parser.add_argument("--module", default="main", help="Module to import")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Rows per table")
+    parser.add_argument("--budget-ms", type=float, help="Exit with status 1 if the median import time exceeds this")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,279 @@
+"""
+Benchmark Runner
+
+Drives the app against local upstream stubs and reports throughput, latency
+percentiles and upstream call counts per scenario and concurrency level.
+
+Every (scenario, concurrency) cell starts a fresh app process against an empty
+stub Redis, so cells do not warm each other's caches and results line up
+between commits. Results can be saved as JSON and compared with an earlier run:
+
+    python benchmarks/run.py --output before.json
+    git checkout my-branch
+    python benchmarks/run.py --compare before.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import aiohttp
+
+from stubs import StubServer, parse_behavior
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UPSTREAMS = ["exa_search", "exa_contents", "tavily", "upstash", "gemini"]
+
+def percentile(samples: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of a list of samples."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def git_revision() -> str:
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT, capture_output=True, text=True).stdout
+        return f"{revision}-dirty" if dirty.strip() else revision
+    except Exception:
+        return "unknown"
+
+def scenario_paths(scenario: str, count: int, url_pool: int, rng: random.Random) -> List[str]:
+    """
+    Build the request paths for one scenario.
+
+    Args:
+        scenario (str): "home", "extract" or "health"
+        count (int): Number of requests
+        url_pool (int): Number of distinct article URLs for /extract; smaller pools mean more cache hits
+        rng (random.Random): Seeded generator, so every run requests the same URLs
+
+    Returns:
+        List[str]: Request paths
+    """
+    if scenario == "home":
+        return ["/"] * count
+    if scenario == "health":
+        return ["/health"] * count
+    if scenario == "extract":
+        return [f"/extract?url=https://techcrunch.com/stub-article-{rng.randrange(url_pool)}" for _ in range(count)]
+    raise ValueError(f"Unknown scenario: {scenario}")
+
+class AppProcess:
+    """
+    The app under test, running in its own process against the stubs.
+    """
+
+    def __init__(self, stubs: StubServer, log_file):
+        self.stubs = stubs
+        self.log_file = log_file
+        self.port = free_port()
+        self.process: Optional[subprocess.Popen] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def environment(self) -> Dict[str, str]:
+        return {
+            **os.environ,
+            "EXA_API_KEY": "bench",
+            "TAVILY_API_KEY": "bench",
+            "GEMINI_API_KEY": "bench",
+            "EXA_API_BASE_URL": f"{self.stubs.base_url}/exa",
+            "TAVILY_API_BASE_URL": f"{self.stubs.base_url}/tavily",
+            "UPSTASH_REDIS_REST_URL": f"{self.stubs.base_url}/upstash",
+            "UPSTASH_REDIS_REST_TOKEN": "bench",
+            "PREFETCH_ENABLED": "false"
+        }
+
+    async def start(self, timeout: float = 30) -> None:
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, "benchmarks", "app_server.py"),
+             "--port", str(self.port), "--gemini-target", self.stubs.grpc_target],
+            env=self.environment(),
+            stdout=self.log_file,
+            stderr=subprocess.STDOUT
+        )
+        deadline = time.monotonic() + timeout
+        async with aiohttp.ClientSession() as session:
+            while time.monotonic() < deadline:
+                if self.process.poll() is not None:
+                    raise RuntimeError("App process exited during startup, see the app log")
+                try:
+                    async with session.get(f"{self.base_url}/health") as response:
+                        if response.status == 200:
+                            return
+                except aiohttp.ClientError:
+                    pass
+                await asyncio.sleep(0.2)
+        raise RuntimeError("App did not become healthy in time")
+
+    def stop(self) -> None:
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+async def drive(base_url: str, paths: List[str], concurrency: int, timeout: float) -> Dict:
+    """
+    Send the requests with a fixed number of concurrent workers.
+
+    Returns:
+        Dict: Request count, errors, wall time and per-request latencies in seconds
+    """
+    queue = list(reversed(paths))
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker(session: aiohttp.ClientSession) -> None:
+        nonlocal errors
+        while queue:
+            path = queue.pop()
+            start = time.perf_counter()
+            try:
+                async with session.get(base_url + path) as response:
+                    await response.read()
+                    if response.status >= 400:
+                        errors += 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        started = time.perf_counter()
+        await asyncio.gather(*[worker(session) for _ in range(concurrency)])
+        elapsed = time.perf_counter() - started
+
+    return {"requests": len(paths), "errors": errors, "elapsed": elapsed, "latencies": latencies}
+
+async def run_cell(stubs: StubServer, scenario: str, concurrency: int, args, log_file) -> Dict:
+    # Fresh app and empty stub cache for every cell
+    stubs.store.clear()
+    stubs.expiry.clear()
+    app = AppProcess(stubs, log_file)
+    await app.start()
+    try:
+        stubs.calls.clear()
+        stubs.errors.clear()
+        rng = random.Random(f"{args.seed}:{scenario}:{concurrency}")
+        paths = scenario_paths(scenario, args.requests, args.url_pool, rng)
+        outcome = await drive(app.base_url, paths, concurrency, args.request_timeout)
+        # Let background refreshes and cache writes settle before counting upstream calls
+        await asyncio.sleep(args.settle)
+        latencies = outcome["latencies"]
+        return {
+            "scenario": scenario,
+            "concurrency": concurrency,
+            "requests": outcome["requests"],
+            "errors": outcome["errors"],
+            "throughput_rps": round(outcome["requests"] / outcome["elapsed"], 2) if outcome["elapsed"] else None,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+            "upstream_calls": {name: stubs.calls.get(name, 0) for name in UPSTREAMS},
+            "upstream_errors": {name: stubs.errors.get(name, 0) for name in UPSTREAMS if stubs.errors.get(name)}
+        }
+    finally:
+        app.stop()
+
+def print_table(results: List[Dict]) -> None:
+    header = f"{'scenario':<9}{'conc':>5}{'reqs':>6}{'errs':>6}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}  upstream calls"
+    print(header)
+    print("-" * len(header))
+    for row in results:
+        calls = " ".join(f"{name}={count}" for name, count in row["upstream_calls"].items() if count)
+        print(
+            f"{row['scenario']:<9}{row['concurrency']:>5}{row['requests']:>6}{row['errors']:>6}"
+            f"{row['throughput_rps']:>9}{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}  {calls or '-'}"
+        )
+
+def print_comparison(baseline: Dict, results: List[Dict]) -> None:
+    def change(new: float, old: float) -> str:
+        if not old:
+            return "n/a"
+        return f"{(new - old) / old * 100:+.1f}%"
+
+    previous = {(row["scenario"], row["concurrency"]): row for row in baseline["results"]}
+    print(f"\nCompared with {baseline['meta']['revision']} ({baseline['meta']['timestamp']}):")
+    print(f"{'scenario':<9}{'conc':>5}{'rps':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'upstream':>10}")
+    for row in results:
+        old = previous.get((row["scenario"], row["concurrency"]))
+        if not old:
+            continue
+        print(
+            f"{row['scenario']:<9}{row['concurrency']:>5}"
+            f"{change(row['throughput_rps'], old['throughput_rps']):>10}"
+            f"{change(row['p50_ms'], old['p50_ms']):>10}"
+            f"{change(row['p95_ms'], old['p95_ms']):>10}"
+            f"{change(row['p99_ms'], old['p99_ms']):>10}"
+            f"{change(sum(row['upstream_calls'].values()), sum(old['upstream_calls'].values())):>10}"
+        )
+
+async def main(args) -> None:
+    stubs = StubServer(parse_behavior(args.behavior), args.seed)
+    await stubs.start()
+    results = []
+    with open(args.app_log, "ab") as log_file:
+        try:
+            for scenario in args.scenarios.split(","):
+                for concurrency in (int(level) for level in args.concurrency.split(",")):
+                    print(f"Running {scenario} at concurrency {concurrency}...", file=sys.stderr)
+                    results.append(await run_cell(stubs, scenario, concurrency, args, log_file))
+        finally:
+            await stubs.stop()
+
+    print_table(results)
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "settings": {key: value for key, value in vars(args).items() if key not in ("output", "compare", "app_log")},
+            "behaviors": {name: vars(behavior) for name, behavior in stubs.behaviors.items()}
+        },
+        "results": results
+    }
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+        print(f"\nSaved results to {args.output}")
+    if args.compare:
+        with open(args.compare) as baseline:
+            print_comparison(json.load(baseline), results)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the app against local upstream stubs")
+    parser.add_argument("--scenarios", default="home,extract,health", help="Comma-separated: home, extract, health")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario and concurrency level")
+    parser.add_argument("--url-pool", type=int, default=50, help="Distinct article URLs used by the extract scenario")
+    parser.add_argument("--behavior", default="", help='Stub overrides, median[:sigma[:error_rate]], e.g. "tavily=0.8:0.5:0.05,gemini=2"')
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--request-timeout", type=float, default=120)
+    parser.add_argument("--settle", type=float, default=1.0, help="Seconds to wait for background work before counting calls")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--compare", help="Compare with a JSON file from an earlier run")
+    parser.add_argument("--app-log", default=os.devnull, help="Append the app's log output to this file")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,327 @@
+"""
+Benchmark Stubs
+
+Local stand-ins for the upstream services, served from a single aiohttp app so
+benchmarks run offline and without API costs:
+
+* Exa search and contents under /exa (/exa/search, /exa/contents)
+* Tavily extract under /tavily (/tavily/extract)
+* The Upstash Redis REST protocol under /upstash (single commands and /pipeline),
+  backed by an in-memory store
+* Gemini GenerateContent and StreamGenerateContent on a separate gRPC port,
+  since the google-generativeai async client only speaks gRPC
+
+Each endpoint has a configurable latency distribution (log-normal around a
+median) and error rate. Call counts are reported on /__stats and cleared with
+/__reset. Latencies and errors are drawn from a seeded generator, so runs are
+comparable.
+"""
+
+import asyncio
+import base64
+import math
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import grpc
+from aiohttp import web
+from google.ai.generativelanguage_v1beta.types import GenerateContentRequest, GenerateContentResponse
+
+GEMINI_SERVICE = "google.ai.generativelanguage.v1beta.GenerativeService"
+
+@dataclass
+class Behavior:
+    """Latency and error distribution of one stub endpoint."""
+    median: float  # seconds
+    sigma: float = 0.5  # log-normal spread; 0 gives a fixed latency
+    error_rate: float = 0.0  # fraction of calls answered with HTTP 500
+
+DEFAULT_BEHAVIORS: Dict[str, Behavior] = {
+    "exa_search": Behavior(0.4),
+    "exa_contents": Behavior(1.2),
+    "tavily": Behavior(0.8),
+    "upstash": Behavior(0.01, sigma=0.3),
+    "gemini": Behavior(1.5)
+}
+
+def parse_behavior(spec: str) -> Dict[str, Behavior]:
+    """
+    Parse a behavior override like "tavily=0.8:0.5:0.05,gemini=2" (median[:sigma[:error_rate]]).
+
+    Args:
+        spec (str): Comma-separated overrides
+
+    Returns:
+        Dict[str, Behavior]: Behaviors keyed by endpoint name
+    """
+    behaviors = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, values = item.partition("=")
+        if name not in DEFAULT_BEHAVIORS:
+            raise ValueError(f"Unknown stub endpoint: {name}")
+        numbers = [float(value) for value in values.split(":")]
+        default = DEFAULT_BEHAVIORS[name]
+        behaviors[name] = Behavior(
+            numbers[0],
+            numbers[1] if len(numbers) > 1 else default.sigma,
+            numbers[2] if len(numbers) > 2 else default.error_rate
+        )
+    return behaviors
+
+ARTICLE_PARAGRAPH = (
+    "Artificial intelligence research labs released new models this week, with "
+    "benchmarks showing gains in reasoning and coding tasks. Analysts expect the "
+    "competition between providers to push prices down further as usage grows."
+)
+
+SUMMARY_TEXT = (
+    "标题: 人工智能模型发布\n"
+    "摘要: 多家研究机构本周发布新模型，推理与编程能力提升，价格竞争预计加剧。\n"
+    "关键点:\n1. 新模型发布\n2. 基准测试成绩提升\n3. 价格持续下降"
+)
+
+class StubServer:
+    """
+    In-process HTTP and gRPC servers imitating Exa, Tavily, Upstash and Gemini.
+    """
+
+    def __init__(self, behaviors: Optional[Dict[str, Behavior]] = None, seed: int = 0, paragraphs: int = 12):
+        self.behaviors = {**DEFAULT_BEHAVIORS, **(behaviors or {})}
+        self.random = random.Random(seed)
+        self.paragraphs = paragraphs
+        self.calls: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.store: Dict[str, Any] = {}
+        self.expiry: Dict[str, float] = {}
+        self._runner: Optional[web.AppRunner] = None
+        self._grpc_server: Optional[grpc.aio.Server] = None
+        self.port: Optional[int] = None
+        self.grpc_port: Optional[int] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=16 * 1024 * 1024)
+        app.router.add_post("/exa/search", self.exa_search)
+        app.router.add_post("/exa/contents", self.exa_contents)
+        app.router.add_post("/tavily/extract", self.tavily_extract)
+        app.router.add_post("/upstash", self.upstash_command)
+        app.router.add_post("/upstash/pipeline", self.upstash_pipeline)
+        app.router.add_post("/upstash/multi-exec", self.upstash_pipeline)
+        app.router.add_get("/__stats", self.stats)
+        app.router.add_post("/__reset", self.reset)
+        return app
+
+    @property
+    def grpc_target(self) -> str:
+        return f"127.0.0.1:{self.grpc_port}"
+
+    async def start(self, port: int = 0, grpc_port: int = 0) -> None:
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+        self._grpc_server = grpc.aio.server()
+        self._grpc_server.add_generic_rpc_handlers((grpc.method_handlers_generic_handler(GEMINI_SERVICE, {
+            "GenerateContent": grpc.unary_unary_rpc_method_handler(
+                self.gemini_generate,
+                request_deserializer=GenerateContentRequest.deserialize,
+                response_serializer=GenerateContentResponse.serialize
+            ),
+            "StreamGenerateContent": grpc.unary_stream_rpc_method_handler(
+                self.gemini_stream,
+                request_deserializer=GenerateContentRequest.deserialize,
+                response_serializer=GenerateContentResponse.serialize
+            )
+        }),))
+        self.grpc_port = self._grpc_server.add_insecure_port(f"127.0.0.1:{grpc_port}")
+        await self._grpc_server.start()
+
+    async def stop(self) -> None:
+        if self._grpc_server:
+            await self._grpc_server.stop(grace=None)
+        if self._runner:
+            await self._runner.cleanup()
+
+    async def _simulate(self, name: str) -> bool:
+        # Sleep for a sampled latency; returns False if this call should fail
+        self.calls[name] += 1
+        behavior = self.behaviors[name]
+        latency = behavior.median * math.exp(self.random.gauss(0, behavior.sigma)) if behavior.sigma else behavior.median
+        await asyncio.sleep(latency)
+        if self.random.random() < behavior.error_rate:
+            self.errors[name] += 1
+            return False
+        return True
+
+    def _article_text(self, url: str) -> str:
+        return f"# Stub article for {url}\n\n" + "\n\n".join(
+            f"{ARTICLE_PARAGRAPH} (paragraph {index + 1})" for index in range(self.paragraphs)
+        )
+
+    async def exa_search(self, request: web.Request) -> web.Response:
+        if not await self._simulate("exa_search"):
+            return web.json_response({"error": "stub failure"}, status=500)
+        payload = await request.json()
+        domains = payload.get("includeDomains") or ["example.com"]
+        per_domain = max(1, payload.get("numResults", 10) // len(domains))
+        published = payload.get("endPublishedDate") or "2025-01-01T00:00:00"
+        results = [
+            {
+                "url": f"https://{domain}/stub-article-{index}",
+                "title": f"Stub article {index} from {domain}",
+                "publishedDate": published
+            }
+            for domain in domains
+            for index in range(per_domain)
+        ]
+        return web.json_response({"results": results})
+
+    async def exa_contents(self, request: web.Request) -> web.Response:
+        if not await self._simulate("exa_contents"):
+            return web.json_response({"error": "stub failure"}, status=500)
+        payload = await request.json()
+        return web.json_response({"results": [
+            {"url": url, "title": f"Stub article {url}", "text": self._article_text(url), "summary": "Stub summary."}
+            for url in payload.get("urls", [])
+        ]})
+
+    async def tavily_extract(self, request: web.Request) -> web.Response:
+        if not await self._simulate("tavily"):
+            return web.json_response({"error": "stub failure"}, status=500)
+        payload = await request.json()
+        urls = payload.get("urls")
+        urls = urls if isinstance(urls, list) else [urls]
+        return web.json_response({
+            "results": [{"url": url, "raw_content": self._article_text(url)} for url in urls],
+            "failed_results": []
+        })
+
+    def _encode(self, value: Any, encoding: Optional[str]) -> Any:
+        if encoding == "base64" and isinstance(value, str) and value != "OK":
+            return base64.b64encode(value.encode()).decode()
+        if isinstance(value, list):
+            return [self._encode(item, encoding) for item in value]
+        return value
+
+    def _expired(self, key: str) -> bool:
+        expires_at = self.expiry.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self.store.pop(key, None)
+            self.expiry.pop(key, None)
+            return True
+        return False
+
+    def _execute(self, command: List[Any]) -> Any:
+        name, args = str(command[0]).upper(), [str(arg) for arg in command[1:]]
+        for key in args[:1]:
+            self._expired(key)
+        if name == "GET":
+            return self.store.get(args[0])
+        if name == "SET":
+            key, value, options = args[0], args[1], [option.upper() for option in args[2:]]
+            if "NX" in options and key in self.store:
+                return None
+            self.store[key] = value
+            self.expiry.pop(key, None)
+            if "EX" in options:
+                self.expiry[key] = time.monotonic() + int(args[2 + options.index("EX") + 1])
+            return "OK"
+        if name == "TTL":
+            if args[0] not in self.store:
+                return -2
+            expires_at = self.expiry.get(args[0])
+            return -1 if expires_at is None else max(int(expires_at - time.monotonic()), 0)
+        if name == "EXPIRE":
+            if args[0] not in self.store:
+                return 0
+            self.expiry[args[0]] = time.monotonic() + int(args[1])
+            return 1
+        if name == "EXISTS":
+            return sum(1 for key in args if not self._expired(key) and key in self.store)
+        if name == "DEL":
+            return sum(1 for key in args if self.store.pop(key, None) is not None)
+        if name == "EVAL":
+            # Only the compare-and-act scripts the app uses: act if KEYS[1] holds ARGV[1]
+            script, key, token = args[0], args[2], args[3]
+            if self.store.get(key) != token:
+                return 0
+            if '"del"' in script:
+                self.store.pop(key, None)
+                return 1
+            self.expiry[key] = time.monotonic() + int(args[4])
+            return 1
+        raise ValueError(f"Unsupported command: {name}")
+
+    def _respond(self, command: List[Any], encoding: Optional[str]) -> Dict[str, Any]:
+        try:
+            return {"result": self._encode(self._execute(command), encoding)}
+        except Exception as e:
+            return {"error": f"ERR {e}"}
+
+    async def upstash_command(self, request: web.Request) -> web.Response:
+        if not await self._simulate("upstash"):
+            return web.json_response({"error": "stub failure"}, status=500)
+        return web.json_response(self._respond(await request.json(), request.headers.get("Upstash-Encoding")))
+
+    async def upstash_pipeline(self, request: web.Request) -> web.Response:
+        if not await self._simulate("upstash"):
+            return web.json_response({"error": "stub failure"}, status=500)
+        encoding = request.headers.get("Upstash-Encoding")
+        return web.json_response([self._respond(command, encoding) for command in await request.json()])
+
+    def _gemini_response(self, model: str, text: str) -> GenerateContentResponse:
+        return GenerateContentResponse({
+            "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finish_reason": 1, "index": 0}],
+            "usage_metadata": {"prompt_token_count": 100, "candidates_token_count": 60, "total_token_count": 160},
+            "model_version": model
+        })
+
+    async def gemini_generate(self, request: GenerateContentRequest, context) -> GenerateContentResponse:
+        if not await self._simulate("gemini"):
+            await context.abort(grpc.StatusCode.INTERNAL, "stub failure")
+        return self._gemini_response(request.model, SUMMARY_TEXT)
+
+    async def gemini_stream(self, request: GenerateContentRequest, context):
+        if not await self._simulate("gemini"):
+            await context.abort(grpc.StatusCode.INTERNAL, "stub failure")
+        for line in SUMMARY_TEXT.splitlines(keepends=True):
+            yield self._gemini_response(request.model, line)
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response({"calls": dict(self.calls), "errors": dict(self.errors), "keys": len(self.store)})
+
+    async def reset(self, request: web.Request) -> web.Response:
+        self.calls.clear()
+        self.errors.clear()
+        if request.query.get("flush") == "1":
+            self.store.clear()
+            self.expiry.clear()
+        return web.json_response({"ok": True})
+
+async def serve(port: int, grpc_port: int, behaviors: Dict[str, Behavior], seed: int) -> None:
+    server = StubServer(behaviors, seed)
+    await server.start(port, grpc_port)
+    print(f"Stub upstreams listening on {server.base_url} (Gemini gRPC on {server.grpc_target})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the upstream stubs on their own")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--grpc-port", type=int, default=8901)
+    parser.add_argument("--behavior", default="", help='Overrides like "tavily=0.8:0.5:0.05,gemini=2"')
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(serve(args.port, args.grpc_port, parse_behavior(args.behavior), args.seed))
@@ -1,41 +1,54 @@
 """
 Cache Module
 
-This module provides caching functionality using Upstash Redis.
-It handles caching for fetched articles and AI summaries to reduce API calls.
+This module provides caching functionality for fetched articles, extracted
+content and AI summaries to reduce API calls. A bounded in-process cache (L1)
+sits in front of a shared backend (L2: Upstash, Redis or SQLite, see
+cache_backends.py), so hot keys are served without a round trip; writes go
+through to both tiers.
+Article lists and extracted content use stale-while-revalidate entries: past
+their soft expiry they are still served while one background refresh runs,
+and only past the hard expiry (the backend TTL) does a request block.
 """
 
 import os
 import json
+import time
+import asyncio
 import hashlib
 import logging
-from typing import Any, Dict, List, Optional, Union
-from upstash_redis import Redis
-from upstash_redis.asyncio import Redis as AsyncRedis
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
 
-from config import logger
+from config import Config, ARTICLE_COUNT_BUCKETS, ARTICLE_LOOKBACK_BUCKETS, logger
+from local_cache import LocalCache
+from cache_backends import CacheBackend, create_backend
+import cache_codec
+from dedup import canonical_key
+from metrics import CACHE_BACKEND_SECONDS, CACHE_HITS, CACHE_MISSES
 
 # Cache expiration times (in seconds)
 ARTICLE_CACHE_TTL = 60 * 60 * 24  # 24 hours
 SUMMARY_CACHE_TTL = 60 * 60 * 24 * 7  # 7 days
 
-# Initialize Redis clients
-redis_url = os.getenv('UPSTASH_REDIS_REST_URL')
-redis_token = os.getenv('UPSTASH_REDIS_REST_TOKEN')
+# How long article lists and content may be served stale after ARTICLE_CACHE_TTL
+ARTICLE_STALE_TTL = int(os.getenv('ARTICLE_STALE_TTL', str(60 * 60 * 24)))  # 24 hours
+REVALIDATE_LOCK_TTL = int(os.getenv('REVALIDATE_LOCK_TTL', '60'))
 
-if not redis_url or not redis_token:
-    logger.warning("Upstash Redis credentials not found, caching will be disabled")
-    redis_client = None
-    async_redis_client = None
-else:
-    try:
-        redis_client = Redis(url=redis_url, token=redis_token)
-        async_redis_client = AsyncRedis(url=redis_url, token=redis_token)
-        logger.info("Upstash Redis client initialized successfully")
-    except Exception as e:
-        logger.error(f"Error initializing Upstash Redis client: {str(e)}")
-        redis_client = None
-        async_redis_client = None
+# In-process cache limits
+LOCAL_CACHE_MAX_BYTES = int(os.getenv('LOCAL_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))  # 64 MB
+LOCAL_CACHE_MAX_ENTRIES = int(os.getenv('LOCAL_CACHE_MAX_ENTRIES', '10000'))
+LOCAL_CACHE_MAX_ITEM_BYTES = int(os.getenv('LOCAL_CACHE_MAX_ITEM_BYTES', str(1024 * 1024)))  # 1 MB
+
+local_cache = LocalCache(LOCAL_CACHE_MAX_BYTES, LOCAL_CACHE_MAX_ENTRIES, LOCAL_CACHE_MAX_ITEM_BYTES)
+
+# Shared (L2) cache backend, chosen by CACHE_BACKEND and created by open_cache_backend();
+# None when only the in-process cache is used
+backend: Optional[CacheBackend] = None
+
+# Keys with a background refresh running in this worker
+_revalidating: Set[str] = set()
+_background_tasks: Set[asyncio.Task] = set()
 
 def generate_cache_key(prefix: str, *args) -> str:
     """
@@ -66,9 +79,66 @@ def generate_cache_key(prefix: str, *args) -> str:
     hashed_key = hashlib.md5(key_string.encode()).hexdigest()
     return f"{prefix}:{hashed_key}"
 
+def _encode_value(value: Any) -> str:
+    """
+    Encode a value for storage in the versioned cache envelope.
+    
+    Args:
+        value (Any): The value to cache
+        
+    Returns:
+        str: The encoded value
+    """
+    return cache_codec.encode(value)
+
+def _decode_value(value: Any) -> Optional[Any]:
+    """
+    Decode a value read from the cache, including legacy entries.
+    
+    Args:
+        value (Any): The raw cached value
+        
+    Returns:
+        Optional[Any]: The decoded value, or None if it cannot be decoded
+    """
+    try:
+        return cache_codec.decode(value)
+    except Exception as e:
+        logger.error(f"Error decoding cached value: {str(e)}")
+        return None
+
+def _key_family(key: str) -> str:
+    # Keys look like "<prefix>:<hash>"; the prefix names the kind of value cached
+    return key.split(":", 1)[0]
+
+def open_cache_backend() -> None:
+    """Create the shared cache backend. Called from the app lifespan, so importing is cheap."""
+    global backend
+    if backend is None:
+        backend = create_backend()
+
+async def close_cache_backend() -> None:
+    """Close the shared cache backend's connections."""
+    global backend
+    if backend:
+        try:
+            await backend.close()
+        except Exception as e:
+            logger.error(f"Error closing cache backend: {str(e)}")
+        backend = None
+
+def get_local_cache_stats() -> Dict[str, int]:
+    """
+    Get the in-process cache counters.
+    
+    Returns:
+        Dict[str, int]: Entry count, byte usage, hits, misses and evictions
+    """
+    return local_cache.stats()
+
 async def cache_get(key: str) -> Optional[Any]:
     """
-    Get a value from the cache.
+    Get a value from the cache, checking the in-process cache before the backend.
     
     Args:
         key (str): The cache key
@@ -76,28 +146,85 @@ async def cache_get(key: str) -> Optional[Any]:
     Returns:
         Optional[Any]: The cached value, or None if not found
     """
-    if not async_redis_client:
-        return None
+    return (await cache_get_many([key]))[0]
+
+async def cache_get_many(keys: List[str], local: bool = True) -> List[Optional[Any]]:
+    """
+    Get several values from the cache in at most one backend round trip.
+    
+    Args:
+        keys (List[str]): The cache keys
+        local (bool, optional): Whether to serve from the in-process cache. Defaults to True;
+            False reads the backend, e.g. for what another worker just wrote.
+        
+    Returns:
+        List[Optional[Any]]: The cached values in key order, None where not found
+    """
+    values: List[Optional[Any]] = [None] * len(keys)
+    missing = []
+    for index, key in enumerate(keys):
+        value = local_cache.get(key) if local or not backend else None
+        if value is not None:
+            logger.info(f"Local cache hit for key: {key}")
+            CACHE_HITS.inc(family=_key_family(key), tier="local")
+            values[index] = _decode_value(value)
+        else:
+            missing.append(index)
+    
+    if not missing or not backend:
+        for index in missing:
+            CACHE_MISSES.inc(family=_key_family(keys[index]))
+        return values
     
     try:
-        value = await async_redis_client.get(key)
-        if value:
-            logger.info(f"Cache hit for key: {key}")
-            if isinstance(value, str) and (value.startswith('{') or value.startswith('[')):
-                try:
-                    return json.loads(value)
-                except json.JSONDecodeError:
-                    return value
-            return value
-        logger.info(f"Cache miss for key: {key}")
-        return None
+        # Fetch the remaining TTLs in the same round trip so local copies expire with the backend
+        with CACHE_BACKEND_SECONDS.time(backend=backend.name, operation="get"):
+            entries = await backend.get_many([keys[index] for index in missing])
+        for index, (value, ttl) in zip(missing, entries):
+            key = keys[index]
+            if value:
+                logger.info(f"Cache hit for key: {key}")
+                CACHE_HITS.inc(family=_key_family(key), tier=backend.name)
+                values[index] = _decode_value(value)
+                if isinstance(value, str):
+                    local_ttl = ttl if ttl and ttl > 0 else ARTICLE_CACHE_TTL
+                    local_cache.set(key, value, _local_ttl(values[index], local_ttl))
+            else:
+                logger.info(f"Cache miss for key: {key}")
+                CACHE_MISSES.inc(family=_key_family(key))
+    except Exception as e:
+        logger.error(f"Error getting values from cache: {str(e)}")
+        for index in missing:
+            CACHE_MISSES.inc(family=_key_family(keys[index]))
+    return values
+
+async def cache_ttl(key: str) -> Optional[int]:
+    """
+    Get the remaining time to live of a cached value.
+    
+    Args:
+        key (str): The cache key
+        
+    Returns:
+        Optional[int]: Remaining seconds, or None if the key is not cached
+    """
+    if not backend:
+        remaining = local_cache.ttl(key)
+        return int(remaining) if remaining is not None else None
+    
+    try:
+        with CACHE_BACKEND_SECONDS.time(backend=backend.name, operation="ttl"):
+            ttl = await backend.ttl(key)
+        if ttl == -1:
+            return ARTICLE_CACHE_TTL
+        return ttl if ttl and ttl > 0 else None
     except Exception as e:
-        logger.error(f"Error getting value from cache: {str(e)}")
+        logger.error(f"Error getting TTL from cache: {str(e)}")
         return None
 
 async def cache_set(key: str, value: Any, ttl: int = ARTICLE_CACHE_TTL) -> bool:
     """
-    Set a value in the cache.
+    Set a value in the cache, writing through the in-process cache to the backend.
     
     Args:
         key (str): The cache key
@@ -107,46 +234,420 @@ async def cache_set(key: str, value: Any, ttl: int = ARTICLE_CACHE_TTL) -> bool:
     Returns:
         bool: True if successful, False otherwise
     """
-    if not async_redis_client:
+    local_ttl = _local_ttl(value, ttl)
+    value = _encode_value(value)
+    local_cache.set(key, value, local_ttl)
+    
+    if not backend:
         return False
     
     try:
-        # Convert complex objects to JSON strings
-        if isinstance(value, (dict, list)):
-            value = json.dumps(value)
-        
-        await async_redis_client.set(key, value, ex=ttl)
+        with CACHE_BACKEND_SECONDS.time(backend=backend.name, operation="set"):
+            await backend.set_many([(key, value, ttl)])
         logger.info(f"Cached value for key: {key} with TTL: {ttl}s")
         return True
     except Exception as e:
         logger.error(f"Error setting value in cache: {str(e)}")
         return False
 
-async def cache_articles_for_domain(domain: str, config: dict, articles: List[Dict]) -> None:
+async def cache_set_many(items: List[Tuple[str, Any, int]]) -> bool:
+    """
+    Set several values in the cache in a single backend round trip.
+    
+    Args:
+        items (List[Tuple[str, Any, int]]): (key, value, ttl) entries to cache
+        
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    if not items:
+        return True
+    
+    encoded = []
+    for key, value, ttl in items:
+        encoded_value = _encode_value(value)
+        local_cache.set(key, encoded_value, _local_ttl(value, ttl))
+        encoded.append((key, encoded_value, ttl))
+    
+    if not backend:
+        return False
+    
+    try:
+        with CACHE_BACKEND_SECONDS.time(backend=backend.name, operation="set"):
+            await backend.set_many(encoded)
+        logger.info(f"Cached {len(encoded)} values in one round trip")
+        return True
+    except Exception as e:
+        logger.error(f"Error setting values in cache: {str(e)}")
+        return False
+
+def _local_ttl(value: Any, ttl: float) -> float:
+    # With a shared backend, stale-while-revalidate entries are kept locally only
+    # until their soft expiry: past it every read goes back to L2, so a refresh
+    # made by another worker is picked up instead of each worker revalidating
+    if not backend or not isinstance(value, dict) or "__swr__" not in value:
+        return ttl
+    return min(ttl, value["__swr__"] - time.time())
+
+def _swr_entry(value: Any, fresh_ttl: int) -> Dict:
+    return {"__swr__": time.time() + fresh_ttl, "value": value}
+
+def _unwrap_swr(key: str, entry: Any, revalidate: Optional[Callable[[], Awaitable[Any]]]) -> Optional[Any]:
+    # Entries written before stale-while-revalidate was introduced are treated as fresh
+    if not isinstance(entry, dict) or "__swr__" not in entry:
+        return entry
+    
+    if entry["__swr__"] <= time.time():
+        logger.info(f"Serving stale value for key: {key}")
+        if revalidate:
+            _schedule_revalidation(key, revalidate)
+    return entry["value"]
+
+async def cache_set_swr(key: str, value: Any, fresh_ttl: int, stale_ttl: int) -> bool:
+    """
+    Set a stale-while-revalidate value in the cache.
+    
+    Args:
+        key (str): The cache key
+        value (Any): The value to cache
+        fresh_ttl (int): Seconds until the value becomes stale (soft expiry)
+        stale_ttl (int): Seconds the stale value may still be served after that
+        
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    return await cache_set(key, _swr_entry(value, fresh_ttl), fresh_ttl + stale_ttl)
+
+async def cache_get_swr(key: str, revalidate: Optional[Callable[[], Awaitable[Any]]] = None) -> Optional[Any]:
+    """
+    Get a stale-while-revalidate value from the cache.
+    
+    A stale value is returned immediately and, if revalidate is given, one
+    background refresh is started. Entries written before stale-while-revalidate
+    was introduced are treated as fresh.
+    
+    Args:
+        key (str): The cache key
+        revalidate (Callable[[], Awaitable[Any]], optional): Refreshes and re-caches the value
+        
+    Returns:
+        Optional[Any]: The cached value, or None if not found or past its hard expiry
+    """
+    return _unwrap_swr(key, await cache_get(key), revalidate)
+
+def _schedule_revalidation(key: str, revalidate: Callable[[], Awaitable[Any]]) -> None:
+    if key in _revalidating:
+        return
+    _revalidating.add(key)
+    
+    async def run():
+        try:
+            if await _acquire_revalidation_lock(key):
+                logger.info(f"Revalidating stale key: {key}")
+                await revalidate()
+        except Exception as e:
+            logger.error(f"Error revalidating key {key}: {str(e)}")
+        finally:
+            _revalidating.discard(key)
+    
+    task = asyncio.create_task(run())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+async def _acquire_revalidation_lock(key: str) -> bool:
+    # Only one worker refreshes a key; the lock expires on its own
+    if not backend:
+        return True
+    try:
+        return await backend.set_if_absent(f"revalidate:{key}", "1", REVALIDATE_LOCK_TTL)
+    except Exception as e:
+        logger.error(f"Error acquiring revalidation lock: {str(e)}")
+        return True
+
+def _bucket(value: int, buckets: Tuple[int, ...]) -> int:
+    # The smallest bucket that covers the value; values past the largest bucket are used as-is
+    return next((bucket for bucket in buckets if bucket >= value), value)
+
+def article_fetch_window(config: dict) -> Tuple[int, int]:
+    """
+    Get the (possibly larger) search that serves a request, so that requests
+    with different settings share one cached article list.
+    
+    Args:
+        config (dict): The request's fetch configuration
+        
+    Returns:
+        Tuple[int, int]: The number of results and the lookback in days to search for
+    """
+    return (
+        _bucket(config['articles_per_domain'], ARTICLE_COUNT_BUCKETS),
+        _bucket(config['lookback_days'], ARTICLE_LOOKBACK_BUCKETS)
+    )
+
+def articles_cache_key(domain: str, lookback_days: int) -> str:
+    """
+    Get the cache key of a domain's article list. Only the inputs that change
+    the search results are part of the key: the domain, the query terms and
+    the lookback bucket. The other requested domains and the article count are not.
+    
+    Args:
+        domain (str): The domain name
+        lookback_days (int): The bucketed lookback, from article_fetch_window
+        
+    Returns:
+        str: The cache key
+    """
+    return generate_cache_key("articles", domain, " ".join(Config.QUERY_TERMS), lookback_days)
+
+def articles_entry(results: List[Dict], num_results: int, lookback_days: int, complete: bool) -> Dict:
+    """
+    Wrap search results with the search they came from, so smaller requests can be sliced from them.
+    Results are kept newest first, so the list stays stable across refreshes. The
+    time of the search lets a search that waited on another worker reuse its result.
+    
+    Args:
+        results (List[Dict]): The (deduplicated) search results
+        num_results (int): The number of results searched for
+        lookback_days (int): The lookback searched, in days
+        complete (bool): Whether the search returned fewer results than asked for, so none were left out
+        
+    Returns:
+        Dict: The entry to cache, with the newest published date seen as its high-water mark
+    """
+    results = sorted(results, key=_newest_first)
+    published = [date for date in map(_published_at, results) if date]
+    return {
+        "results": results,
+        "num_results": num_results,
+        "lookback_days": lookback_days,
+        "complete": complete,
+        "high_water": max(published).isoformat() if published else None,
+        "searched_at": time.time()
+    }
+
+def merge_articles_entry(previous: Dict, new_results: List[Dict]) -> Dict:
+    """
+    Merge the results of an incremental search (newer than the previous
+    high-water mark) into a cached list. Articles that fell out of the lookback
+    window are dropped, and the list is kept to the searched result count.
+    
+    Args:
+        previous (Dict): The cached entry
+        new_results (List[Dict]): The (deduplicated) results published since its high-water mark
+        
+    Returns:
+        Dict: The merged entry
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=previous["lookback_days"])
+    known = {article.get("url") for article in new_results}
+    merged = new_results + [article for article in previous["results"] if article.get("url") not in known]
+    merged = sorted(
+        (article for article in merged if (_published_at(article) or cutoff) >= cutoff),
+        key=_newest_first
+    )
+    entry = articles_entry(
+        merged[:previous["num_results"]],
+        previous["num_results"],
+        previous["lookback_days"],
+        complete=previous["complete"] and len(merged) <= previous["num_results"]
+    )
+    # Keep the mark even if every article has since left the window
+    entry["high_water"] = entry["high_water"] or previous.get("high_water")
+    return entry
+
+def _published_at(article: Dict) -> Optional[datetime]:
+    try:
+        published = datetime.fromisoformat(article.get('publishedDate') or '')
+    except ValueError:
+        return None
+    return published if published.tzinfo else published.replace(tzinfo=timezone.utc)
+
+def _newest_first(article: Dict) -> Tuple[bool, float]:
+    # Undated articles go last
+    published = _published_at(article)
+    return (published is None, -published.timestamp() if published else 0.0)
+
+def slice_articles(entry: Any, config: dict) -> Optional[List[Dict]]:
+    """
+    Answer a request from a cached article list for the same domain.
+    
+    The list serves the request if it covers the requested lookback, and has
+    enough articles in it or is complete. A list from the very search the
+    request would make (its own lookback bucket, at least its result count)
+    also serves it with whatever falls in the window, since searching again
+    would return the same list.
+    
+    Args:
+        entry (Any): A cached articles entry
+        config (dict): The request's fetch configuration
+        
+    Returns:
+        Optional[List[Dict]]: The articles for the request, or None if the entry cannot serve it
+    """
+    if not isinstance(entry, dict) or "results" not in entry:
+        return None
+    if entry["lookback_days"] < config['lookback_days']:
+        return None
+    
+    results = entry["results"]
+    if entry["lookback_days"] > config['lookback_days']:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=config['lookback_days'])
+        results = [article for article in results if (_published_at(article) or cutoff) >= cutoff]
+    
+    if len(results) >= config['articles_per_domain'] or entry["complete"]:
+        return results[:config['articles_per_domain']]
+    num_results, lookback_days = article_fetch_window(config)
+    if entry["lookback_days"] == lookback_days and entry["num_results"] >= num_results:
+        return results[:config['articles_per_domain']]
+    return None
+
+def _candidate_keys(domain: str, config: dict) -> List[str]:
+    # The request's own bucket first, then larger lookbacks whose lists can be sliced
+    _, lookback_days = article_fetch_window(config)
+    lookbacks = [lookback_days] + [bucket for bucket in ARTICLE_LOOKBACK_BUCKETS if bucket > lookback_days]
+    return [articles_cache_key(domain, lookback) for lookback in lookbacks]
+
+def _serve_articles(
+    keys: List[str],
+    entries: List[Any],
+    config: dict,
+    revalidate: Optional[Callable[[], Awaitable[Any]]]
+) -> Optional[List[Dict]]:
+    for key, entry in zip(keys, entries):
+        value = entry["value"] if isinstance(entry, dict) and "__swr__" in entry else entry
+        articles = slice_articles(value, config)
+        if articles is not None:
+            # Starts a refresh if the entry is stale
+            _unwrap_swr(key, entry, revalidate)
+            return articles
+    return None
+
+async def cache_articles_for_domain(domain: str, entry: Dict) -> None:
     """
-    Cache articles for a specific domain.
+    Cache the article list for a specific domain.
     
     Args:
         domain (str): The domain name
-        config (dict): The configuration used to fetch articles
-        articles (List[Dict]): The articles to cache
+        entry (Dict): The search results, from articles_entry
     """
-    key = generate_cache_key("articles", domain, config)
-    await cache_set(key, articles, ARTICLE_CACHE_TTL)
+    key = articles_cache_key(domain, entry["lookback_days"])
+    await cache_set_swr(key, entry, ARTICLE_CACHE_TTL, ARTICLE_STALE_TTL)
 
-async def get_cached_articles_for_domain(domain: str, config: dict) -> Optional[List[Dict]]:
+async def get_cached_articles_entry(
+    domain: str,
+    num_results: int,
+    lookback_days: int,
+    local: bool = True
+) -> Optional[Dict]:
     """
-    Get cached articles for a specific domain.
+    Get the cached article list for a search window, if it has at least as many results.
     
     Args:
         domain (str): The domain name
-        config (dict): The configuration used to fetch articles
+        num_results (int): The number of results the search asks for
+        lookback_days (int): The bucketed lookback, from article_fetch_window
+        local (bool, optional): Whether to serve from the in-process cache. Defaults to True.
         
     Returns:
-        Optional[List[Dict]]: The cached articles, or None if not found
+        Optional[Dict]: The cached entry, or None if not found or smaller
     """
-    key = generate_cache_key("articles", domain, config)
-    return await cache_get(key)
+    return (await get_cached_articles_entries([domain], num_results, lookback_days, local)).get(domain)
+
+async def get_cached_articles_entries(
+    domains: List[str],
+    num_results: int,
+    lookback_days: int,
+    local: bool = True
+) -> Dict[str, Dict]:
+    """
+    Get the cached article lists of several domains for a search window in a single round trip.
+    
+    Args:
+        domains (List[str]): The domain names
+        num_results (int): The number of results the search asks for
+        lookback_days (int): The bucketed lookback, from article_fetch_window
+        local (bool, optional): Whether to serve from the in-process cache. Defaults to True.
+        
+    Returns:
+        Dict[str, Dict]: The cached entries keyed by domain, for the domains with one at least as large
+    """
+    keys = [articles_cache_key(domain, lookback_days) for domain in domains]
+    entries = {}
+    for domain, key, value in zip(domains, keys, await cache_get_many(keys, local)):
+        entry = _unwrap_swr(key, value, None)
+        if isinstance(entry, dict) and entry.get("num_results", 0) >= num_results:
+            entries[domain] = entry
+    return entries
+
+async def get_cached_articles_for_domain(
+    domain: str,
+    config: dict,
+    revalidate: Optional[Callable[[], Awaitable[Any]]] = None
+) -> Optional[List[Dict]]:
+    """
+    Get cached articles for a specific domain, sliced from any cached list that covers the request.
+    
+    Args:
+        domain (str): The domain name
+        config (dict): The configuration of the request
+        revalidate (Callable[[], Awaitable[Any]], optional): Refreshes the articles if they are stale
+        
+    Returns:
+        Optional[List[Dict]]: The cached articles, or None if no cached list covers the request
+    """
+    cached = await get_cached_articles_for_domains([domain], config, (lambda _: revalidate()) if revalidate else None)
+    return cached[domain]
+
+async def cache_articles_for_domains(entries_by_domain: Dict[str, Dict]) -> None:
+    """
+    Cache the article lists of several domains in a single round trip.
+    
+    Args:
+        entries_by_domain (Dict[str, Dict]): The search results keyed by domain, from articles_entry
+    """
+    await cache_set_many([
+        (
+            articles_cache_key(domain, entry["lookback_days"]),
+            _swr_entry(entry, ARTICLE_CACHE_TTL),
+            ARTICLE_CACHE_TTL + ARTICLE_STALE_TTL
+        )
+        for domain, entry in entries_by_domain.items()
+    ])
+
+async def get_cached_articles_for_domains(
+    domains: List[str],
+    config: dict,
+    revalidate: Optional[Callable[[str], Awaitable[Any]]] = None
+) -> Dict[str, Optional[List[Dict]]]:
+    """
+    Get cached articles for several domains in a single round trip.
+    
+    Args:
+        domains (List[str]): The domain names
+        config (dict): The configuration of the request
+        revalidate (Callable[[str], Awaitable[Any]], optional): Refreshes a domain's articles if they are stale
+        
+    Returns:
+        Dict[str, Optional[List[Dict]]]: The cached articles keyed by domain, None where not found
+    """
+    keys_by_domain = {domain: _candidate_keys(domain, config) for domain in dict.fromkeys(domains)}
+    
+    def serve(domain: str, keys: List[str], entries: List[Any]) -> Optional[List[Dict]]:
+        return _serve_articles(keys, entries, config, (lambda: revalidate(domain)) if revalidate else None)
+    
+    # Look up each domain's own bucket first; larger lookbacks are only read for the domains that missed
+    own_entries = await cache_get_many([keys[0] for keys in keys_by_domain.values()])
+    cached = {
+        domain: serve(domain, keys[:1], [entry])
+        for (domain, keys), entry in zip(keys_by_domain.items(), own_entries)
+    }
+    wider_keys = [key for domain, keys in keys_by_domain.items() if cached[domain] is None for key in keys[1:]]
+    if wider_keys:
+        wider_entries = dict(zip(wider_keys, await cache_get_many(wider_keys)))
+        for domain, keys in keys_by_domain.items():
+            if cached[domain] is None and len(keys) > 1:
+                cached[domain] = serve(domain, keys[1:], [wider_entries[key] for key in keys[1:]])
+    return cached
 
 async def cache_article_content(url: str, content: Dict) -> None:
     """
@@ -156,44 +657,72 @@ async def cache_article_content(url: str, content: Dict) -> None:
         url (str): The article URL
         content (Dict): The article content to cache
     """
-    key = generate_cache_key("content", url)
-    await cache_set(key, content, ARTICLE_CACHE_TTL)
+    key = generate_cache_key("content", canonical_key(url))
+    await cache_set_swr(key, content, ARTICLE_CACHE_TTL, ARTICLE_STALE_TTL)
 
-async def get_cached_article_content(url: str) -> Optional[Dict]:
+async def get_cached_article_content(
+    url: str,
+    revalidate: Optional[Callable[[], Awaitable[Any]]] = None
+) -> Optional[Dict]:
     """
     Get cached article content for a specific URL.
     
     Args:
         url (str): The article URL
+        revalidate (Callable[[], Awaitable[Any]], optional): Refreshes the content if it is stale
         
     Returns:
         Optional[Dict]: The cached article content, or None if not found
     """
-    key = generate_cache_key("content", url)
-    return await cache_get(key)
+    key = generate_cache_key("content", canonical_key(url))
+    return await cache_get_swr(key, revalidate)
 
-async def cache_summary(content: str, title: str, summary: str) -> None:
+async def cache_summary(content_hash: str, title: str, summary: str) -> None:
     """
     Cache an AI-generated summary.
     
     Args:
-        content (str): The content that was summarized
+        content_hash (str): The hash of the text that was summarized
         title (str): The title of the content
         summary (str): The generated summary
     """
-    key = generate_cache_key("summary", content, title)  # Use full content for key
+    key = generate_cache_key("summary", content_hash, title)
     await cache_set(key, summary, SUMMARY_CACHE_TTL)
 
-async def get_cached_summary(content: str, title: str) -> Optional[str]:
+async def get_cached_summary(content_hash: str, title: str) -> Optional[str]:
     """
     Get a cached AI-generated summary.
     
     Args:
-        content (str): The content to summarize
+        content_hash (str): The hash of the text to summarize
         title (str): The title of the content
         
     Returns:
         Optional[str]: The cached summary, or None if not found
     """
-    key = generate_cache_key("summary", content, title)  # Use full content for key
-    return await cache_get(key) 
\ No newline at end of file
+    key = generate_cache_key("summary", content_hash, title)
+    return await cache_get(key) 
+
+async def cache_chunk_summary(chunk: str, summary: str) -> None:
+    """
+    Cache the summary of one chunk of a long article.
+    
+    Args:
+        chunk (str): The chunk text that was summarized
+        summary (str): The generated chunk summary
+    """
+    key = generate_cache_key("summary_chunk", chunk)
+    await cache_set(key, summary, SUMMARY_CACHE_TTL)
+
+async def get_cached_chunk_summary(chunk: str) -> Optional[str]:
+    """
+    Get the cached summary of one chunk of a long article.
+    
+    Args:
+        chunk (str): The chunk text to summarize
+        
+    Returns:
+        Optional[str]: The cached chunk summary, or None if not found
+    """
+    key = generate_cache_key("summary_chunk", chunk)
+    return await cache_get(key)
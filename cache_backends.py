@@ -0,0 +1,383 @@
+"""
+Cache Backends Module
+
+This module provides the shared (L2) cache backends behind cache.py. Every
+backend stores serialized strings with a TTL and supports the few atomic
+operations the app uses for cross-worker coordination (locks and leases):
+
+* UpstashBackend: Upstash Redis over its HTTPS REST API
+* RedisBackend: a regular Redis server over RESP, with a connection pool and
+  pipelining (requires the optional `redis` package)
+* SQLiteBackend: an on-disk SQLite database, for single-node deployments and
+  local development; several workers on one host can share the file
+
+The backend is chosen with CACHE_BACKEND (upstash, redis, sqlite or none). By
+default Upstash is used when its credentials are set, then Redis when
+REDIS_URL is set, and otherwise no shared cache.
+"""
+
+import os
+import time
+import asyncio
+import sqlite3
+import threading
+from typing import List, Optional, Tuple
+
+from config import logger
+
+
+UPSTASH_REDIS_REST_URL = os.getenv('UPSTASH_REDIS_REST_URL')
+UPSTASH_REDIS_REST_TOKEN = os.getenv('UPSTASH_REDIS_REST_TOKEN')
+REDIS_URL = os.getenv('REDIS_URL')
+REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', '50'))
+REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', '5'))
+CACHE_SQLITE_PATH = os.getenv('CACHE_SQLITE_PATH', 'cache.db')
+
+def _default_backend() -> str:
+    if UPSTASH_REDIS_REST_URL and UPSTASH_REDIS_REST_TOKEN:
+        return 'upstash'
+    if REDIS_URL:
+        return 'redis'
+    return 'none'
+
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', _default_backend()).lower()
+
+# Act on a key only while it still holds our token
+DELETE_IF_EQUALS_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+EXPIRE_IF_EQUALS_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("expire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# (value, remaining ttl in seconds) for one key; ttl is None when unknown or unlimited
+Entry = Tuple[Optional[str], Optional[int]]
+
+class CacheBackend:
+    """
+    Interface of a shared cache backend. Values are serialized strings.
+    """
+    name = "base"
+
+    async def get_many(self, keys: List[str]) -> List[Entry]:
+        """
+        Get several values and their remaining TTLs in one round trip.
+
+        Args:
+            keys (List[str]): The cache keys
+
+        Returns:
+            List[Entry]: (value, ttl) per key, in key order; value is None where not found
+        """
+        raise NotImplementedError
+
+    async def set_many(self, items: List[Tuple[str, str, int]]) -> None:
+        """
+        Set several values in one round trip.
+
+        Args:
+            items (List[Tuple[str, str, int]]): (key, value, ttl) entries
+        """
+        raise NotImplementedError
+
+    async def ttl(self, key: str) -> Optional[int]:
+        """
+        Get the remaining time to live of a key.
+
+        Returns:
+            Optional[int]: Remaining seconds, -1 if the key never expires, or None if it does not exist
+        """
+        raise NotImplementedError
+
+    async def set_if_absent(self, key: str, value: str, ttl: int) -> bool:
+        """
+        Set a key only if it does not exist (SET NX EX).
+
+        Returns:
+            bool: True if the key was set
+        """
+        raise NotImplementedError
+
+    async def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    async def delete_if_equals(self, key: str, value: str) -> bool:
+        """
+        Delete a key only if it still holds the given value.
+
+        Returns:
+            bool: True if the key was deleted
+        """
+        raise NotImplementedError
+
+    async def expire_if_equals(self, key: str, value: str, ttl: int) -> bool:
+        """
+        Reset a key's TTL only if it still holds the given value.
+
+        Returns:
+            bool: True if the TTL was updated
+        """
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+def _normalize_ttl(ttl: Optional[int]) -> Optional[int]:
+    # Redis reports -2 for a missing key and -1 for a key without expiry
+    if ttl is None or ttl == -2:
+        return None
+    return ttl
+
+class UpstashBackend(CacheBackend):
+    """
+    Upstash Redis over HTTPS REST. Pipelines are sent as a single request.
+    """
+    name = "upstash"
+
+    def __init__(self, url: str, token: str):
+        from upstash_redis.asyncio import Redis as AsyncRedis
+        self.client = AsyncRedis(url=url, token=token)
+
+    async def get_many(self, keys: List[str]) -> List[Entry]:
+        pipeline = self.client.pipeline()
+        for key in keys:
+            pipeline.get(key)
+            pipeline.ttl(key)
+        results = await pipeline.exec()
+        return [(results[2 * index], _normalize_ttl(results[2 * index + 1])) for index in range(len(keys))]
+
+    async def set_many(self, items: List[Tuple[str, str, int]]) -> None:
+        if len(items) == 1:
+            key, value, ttl = items[0]
+            await self.client.set(key, value, ex=ttl)
+            return
+        pipeline = self.client.pipeline()
+        for key, value, ttl in items:
+            pipeline.set(key, value, ex=ttl)
+        await pipeline.exec()
+
+    async def ttl(self, key: str) -> Optional[int]:
+        return _normalize_ttl(await self.client.ttl(key))
+
+    async def set_if_absent(self, key: str, value: str, ttl: int) -> bool:
+        return bool(await self.client.set(key, value, nx=True, ex=ttl))
+
+    async def exists(self, key: str) -> bool:
+        return bool(await self.client.exists(key))
+
+    async def delete_if_equals(self, key: str, value: str) -> bool:
+        return bool(await self.client.eval(DELETE_IF_EQUALS_SCRIPT, keys=[key], args=[value]))
+
+    async def expire_if_equals(self, key: str, value: str, ttl: int) -> bool:
+        return bool(await self.client.eval(EXPIRE_IF_EQUALS_SCRIPT, keys=[key], args=[value, str(ttl)]))
+
+    async def close(self) -> None:
+        await self.client.close()
+
+class RedisBackend(CacheBackend):
+    """
+    A regular Redis server over RESP, sharing a bounded pool of persistent connections.
+    """
+    name = "redis"
+
+    def __init__(self, url: str, max_connections: int, socket_timeout: float):
+        import redis.asyncio as aioredis
+        self.client = aioredis.Redis.from_url(
+            url,
+            max_connections=max_connections,
+            socket_timeout=socket_timeout,
+            socket_connect_timeout=socket_timeout,
+            health_check_interval=30,
+            decode_responses=True
+        )
+
+    async def get_many(self, keys: List[str]) -> List[Entry]:
+        async with self.client.pipeline(transaction=False) as pipeline:
+            for key in keys:
+                pipeline.get(key)
+                pipeline.ttl(key)
+            results = await pipeline.execute()
+        return [(results[2 * index], _normalize_ttl(results[2 * index + 1])) for index in range(len(keys))]
+
+    async def set_many(self, items: List[Tuple[str, str, int]]) -> None:
+        if len(items) == 1:
+            key, value, ttl = items[0]
+            await self.client.set(key, value, ex=ttl)
+            return
+        async with self.client.pipeline(transaction=False) as pipeline:
+            for key, value, ttl in items:
+                pipeline.set(key, value, ex=ttl)
+            await pipeline.execute()
+
+    async def ttl(self, key: str) -> Optional[int]:
+        return _normalize_ttl(await self.client.ttl(key))
+
+    async def set_if_absent(self, key: str, value: str, ttl: int) -> bool:
+        return bool(await self.client.set(key, value, nx=True, ex=ttl))
+
+    async def exists(self, key: str) -> bool:
+        return bool(await self.client.exists(key))
+
+    async def delete_if_equals(self, key: str, value: str) -> bool:
+        return bool(await self.client.eval(DELETE_IF_EQUALS_SCRIPT, 1, key, value))
+
+    async def expire_if_equals(self, key: str, value: str, ttl: int) -> bool:
+        return bool(await self.client.eval(EXPIRE_IF_EQUALS_SCRIPT, 1, key, value, ttl))
+
+    async def close(self) -> None:
+        close = getattr(self.client, "aclose", None) or self.client.close
+        await close()
+
+class SQLiteBackend(CacheBackend):
+    """
+    An on-disk SQLite cache. Queries run in a worker thread so they do not block
+    the event loop; expired rows are ignored on read and purged periodically.
+    """
+    name = "sqlite"
+
+    PURGE_EVERY = 500  # writes between purges of expired rows
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    async def _run(self, fn, *args):
+        return await asyncio.to_thread(self._locked, fn, *args)
+
+    def _locked(self, fn, *args):
+        with self._lock:
+            return fn(*args)
+
+    def _transaction(self, fn, *args):
+        # BEGIN IMMEDIATE takes the write lock up front, so check-and-set is atomic across processes
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(*args)
+            self._conn.execute("COMMIT")
+            return result
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _get_many(self, keys: List[str]) -> List[Entry]:
+        now = time.time()
+        placeholders = ",".join("?" * len(keys))
+        rows = self._conn.execute(
+            f"SELECT key, value, expires_at FROM cache WHERE key IN ({placeholders}) AND expires_at > ?",
+            (*keys, now)
+        ).fetchall()
+        found = {key: (value, max(int(expires_at - now), 1)) for key, value, expires_at in rows}
+        return [found.get(key, (None, None)) for key in keys]
+
+    def _set_many(self, items: List[Tuple[str, str, int]]) -> None:
+        now = time.time()
+        def write():
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                [(key, value, now + ttl) for key, value, ttl in items]
+            )
+            self._writes += len(items)
+            if self._writes >= self.PURGE_EVERY:
+                self._writes = 0
+                self._conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+        self._transaction(write)
+
+    def _ttl(self, key: str) -> Optional[int]:
+        now = time.time()
+        row = self._conn.execute("SELECT expires_at FROM cache WHERE key = ? AND expires_at > ?", (key, now)).fetchone()
+        return max(int(row[0] - now), 1) if row else None
+
+    def _set_if_absent(self, key: str, value: str, ttl: int) -> bool:
+        now = time.time()
+        def write():
+            self._conn.execute("DELETE FROM cache WHERE key = ? AND expires_at <= ?", (key, now))
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO cache (key, value, expires_at) VALUES (?, ?, ?)", (key, value, now + ttl)
+            )
+            return cursor.rowcount == 1
+        return self._transaction(write)
+
+    def _delete_if_equals(self, key: str, value: str) -> bool:
+        cursor = self._conn.execute("DELETE FROM cache WHERE key = ? AND value = ?", (key, value))
+        return cursor.rowcount == 1
+
+    def _expire_if_equals(self, key: str, value: str, ttl: int) -> bool:
+        now = time.time()
+        cursor = self._conn.execute(
+            "UPDATE cache SET expires_at = ? WHERE key = ? AND value = ? AND expires_at > ?", (now + ttl, key, value, now)
+        )
+        return cursor.rowcount == 1
+
+    async def get_many(self, keys: List[str]) -> List[Entry]:
+        return await self._run(self._get_many, keys)
+
+    async def set_many(self, items: List[Tuple[str, str, int]]) -> None:
+        await self._run(self._set_many, items)
+
+    async def ttl(self, key: str) -> Optional[int]:
+        return await self._run(self._ttl, key)
+
+    async def set_if_absent(self, key: str, value: str, ttl: int) -> bool:
+        return await self._run(self._set_if_absent, key, value, ttl)
+
+    async def exists(self, key: str) -> bool:
+        return await self.ttl(key) is not None
+
+    async def delete_if_equals(self, key: str, value: str) -> bool:
+        return await self._run(self._delete_if_equals, key, value)
+
+    async def expire_if_equals(self, key: str, value: str, ttl: int) -> bool:
+        return await self._run(self._expire_if_equals, key, value, ttl)
+
+    async def close(self) -> None:
+        await self._run(self._conn.close)
+
+def create_backend(kind: str = CACHE_BACKEND) -> Optional[CacheBackend]:
+    """
+    Create the configured cache backend.
+
+    Args:
+        kind (str, optional): upstash, redis, sqlite or none. Defaults to CACHE_BACKEND.
+
+    Returns:
+        Optional[CacheBackend]: The backend, or None if disabled or it could not be created
+    """
+    try:
+        if kind == 'upstash':
+            if not UPSTASH_REDIS_REST_URL or not UPSTASH_REDIS_REST_TOKEN:
+                logger.warning("Upstash Redis credentials not found, caching will be disabled")
+                return None
+            backend = UpstashBackend(UPSTASH_REDIS_REST_URL, UPSTASH_REDIS_REST_TOKEN)
+        elif kind == 'redis':
+            backend = RedisBackend(REDIS_URL or 'redis://localhost:6379/0', REDIS_MAX_CONNECTIONS, REDIS_SOCKET_TIMEOUT)
+        elif kind == 'sqlite':
+            backend = SQLiteBackend(CACHE_SQLITE_PATH)
+        elif kind == 'none':
+            logger.info("Shared cache disabled, using the in-process cache only")
+            return None
+        else:
+            logger.error(f"Unknown CACHE_BACKEND: {kind}, caching will be disabled")
+            return None
+    except ImportError:
+        logger.error(f"CACHE_BACKEND={kind} requires its client package, caching will be disabled")
+        return None
+    except Exception as e:
+        logger.error(f"Error initializing {kind} cache backend: {str(e)}")
+        return None
+
+    logger.info(f"Cache backend initialized: {backend.name}")
+    return backend
@@ -0,0 +1,119 @@
+"""
+Cache Codec Module
+
+This module defines the serialization format for cached values.
+
+Values are stored as a versioned envelope string:
+
+    ~1|<codec>|<type>|<payload>
+
+where codec is "r" (raw), "z" (zlib) or "s" (zstd), and type is "j" (JSON)
+or "s" (plain string). Compressed payloads are base64-encoded so they survive
+the Upstash REST API. Payloads below CACHE_COMPRESS_THRESHOLD bytes are stored
+raw. orjson and zstandard are used when installed, with json and zlib as
+fallbacks. Values written before the envelope existed are still decoded.
+"""
+
+import os
+import json
+import zlib
+import base64
+from typing import Any
+
+from config import logger
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ENVELOPE_PREFIX = "~1|"
+
+CACHE_COMPRESSION = os.getenv('CACHE_COMPRESSION', 'zstd' if zstandard else 'zlib').lower()
+CACHE_COMPRESS_THRESHOLD = int(os.getenv('CACHE_COMPRESS_THRESHOLD', '1024'))  # bytes
+CACHE_COMPRESS_LEVEL = int(os.getenv('CACHE_COMPRESS_LEVEL', '6'))
+
+if CACHE_COMPRESSION == 'zstd' and not zstandard:
+    logger.warning("zstandard not installed, falling back to zlib cache compression")
+    CACHE_COMPRESSION = 'zlib'
+
+def _dumps(value: Any) -> bytes:
+    if orjson:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def _loads(data: bytes) -> Any:
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _compress(data: bytes) -> tuple:
+    if CACHE_COMPRESSION == 'none' or len(data) < CACHE_COMPRESS_THRESHOLD:
+        return "r", data
+    if CACHE_COMPRESSION == 'zstd':
+        return "s", zstandard.ZstdCompressor(level=CACHE_COMPRESS_LEVEL).compress(data)
+    return "z", zlib.compress(data, CACHE_COMPRESS_LEVEL)
+
+def _decompress(codec: str, payload: str) -> bytes:
+    if codec == "r":
+        return payload.encode('utf-8')
+    data = base64.b64decode(payload)
+    if codec == "z":
+        return zlib.decompress(data)
+    if codec == "s":
+        if not zstandard:
+            raise ValueError("zstd-compressed cache value but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f"Unknown cache codec: {codec}")
+
+def encode(value: Any) -> str:
+    """
+    Encode a value into the cache envelope format.
+
+    Args:
+        value (Any): The value to cache (str, or anything JSON-serializable)
+
+    Returns:
+        str: The envelope string
+    """
+    if isinstance(value, str):
+        type_tag, data = "s", value.encode('utf-8')
+    else:
+        type_tag, data = "j", _dumps(value)
+
+    codec, data = _compress(data)
+    payload = data.decode('utf-8') if codec == "r" else base64.b64encode(data).decode('ascii')
+    return f"{ENVELOPE_PREFIX}{codec}|{type_tag}|{payload}"
+
+def decode(value: Any) -> Any:
+    """
+    Decode a value read from the cache.
+
+    Args:
+        value (Any): The raw cached value, in envelope or legacy format
+
+    Returns:
+        Any: The decoded value
+    """
+    if not isinstance(value, str):
+        return value
+
+    if value.startswith(ENVELOPE_PREFIX):
+        codec, type_tag, payload = value[len(ENVELOPE_PREFIX):].split("|", 2)
+        data = _decompress(codec, payload)
+        if type_tag == "j":
+            return _loads(data)
+        return data.decode('utf-8')
+
+    # Legacy entries: plain JSON documents or plain strings
+    if value.startswith('{') or value.startswith('['):
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError:
+            return value
+    return value
@@ -1,7 +1,6 @@
 import os
 import logging
 from dotenv import load_dotenv
-import google.generativeai as genai
 
 # Load environment variables
 load_dotenv()
@@ -14,24 +13,129 @@ logging.basicConfig(
 )
 logger = logging.getLogger("technews")
 
+def _api_keys(provider: str) -> list:
+    # A comma-separated pool in <PROVIDER>_API_KEYS, or the single <PROVIDER>_API_KEY
+    value = os.getenv(f'{provider}_API_KEYS') or os.getenv(f'{provider}_API_KEY', '')
+    return [key.strip() for key in value.split(',') if key.strip()]
+
+# API keys for each provider; requests are spread over every key in the pool
+EXA_API_KEYS = _api_keys('EXA')
+TAVILY_API_KEYS = _api_keys('TAVILY')
+GEMINI_API_KEYS = _api_keys('GEMINI')
+
 # Configure Google Gemini API
-GEMINI_API_KEY = os.getenv('GEMINI_API_KEY', '')
+GEMINI_API_KEY = GEMINI_API_KEYS[0] if GEMINI_API_KEYS else ''
 GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-2.0-flash')
 GEMINI_TEMPERATURE = float(os.getenv('GEMINI_TEMPERATURE', '0.3'))
 GEMINI_MAX_TOKENS = int(os.getenv('GEMINI_MAX_TOKENS', '2048'))
 GEMINI_TOP_P = float(os.getenv('GEMINI_TOP_P', '0.8'))
 
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-    logger.info("Google Gemini API configured successfully")
-else:
+# Long articles are summarized map-reduce style in chunks of this many (estimated) tokens
+SUMMARY_SINGLE_SHOT_TOKENS = int(os.getenv('SUMMARY_SINGLE_SHOT_TOKENS', '12000'))
+SUMMARY_CHUNK_TOKENS = int(os.getenv('SUMMARY_CHUNK_TOKENS', '6000'))
+SUMMARY_MAP_CONCURRENCY = int(os.getenv('SUMMARY_MAP_CONCURRENCY', '4'))
+
+# Summarization engine limits: concurrent Gemini calls, waiting requests and max wait (seconds)
+SUMMARY_CONCURRENCY = int(os.getenv('SUMMARY_CONCURRENCY', '4'))
+SUMMARY_QUEUE_SIZE = int(os.getenv('SUMMARY_QUEUE_SIZE', '32'))
+SUMMARY_QUEUE_TIMEOUT = float(os.getenv('SUMMARY_QUEUE_TIMEOUT', '10'))
+
+# Admission control for /extract and home page cache misses: concurrent requests, waiting requests and
+# max wait (seconds); requests beyond these are shed with a 503 or served from cache
+EXTRACT_CONCURRENCY = int(os.getenv('EXTRACT_CONCURRENCY', '16'))
+EXTRACT_QUEUE_SIZE = int(os.getenv('EXTRACT_QUEUE_SIZE', '64'))
+EXTRACT_QUEUE_TIMEOUT = float(os.getenv('EXTRACT_QUEUE_TIMEOUT', '5'))
+HOME_CONCURRENCY = int(os.getenv('HOME_CONCURRENCY', '8'))
+HOME_QUEUE_SIZE = int(os.getenv('HOME_QUEUE_SIZE', '32'))
+HOME_QUEUE_TIMEOUT = float(os.getenv('HOME_QUEUE_TIMEOUT', '3'))
+
+# The Gemini SDK is configured by the summarizer when first used
+if not GEMINI_API_KEY:
     logger.warning("GEMINI_API_KEY not found, summarization will be disabled")
 
+# Shared HTTP client configuration
+HTTP_POOL_LIMIT = int(os.getenv('HTTP_POOL_LIMIT', '100'))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv('HTTP_POOL_LIMIT_PER_HOST', '20'))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv('HTTP_KEEPALIVE_TIMEOUT', '60'))
+HTTP_DNS_CACHE_TTL = int(os.getenv('HTTP_DNS_CACHE_TTL', '300'))
+HTTP_TOTAL_TIMEOUT = float(os.getenv('HTTP_TOTAL_TIMEOUT', '30'))
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '5'))
+
+# Upstream resilience: adaptive timeouts and circuit breakers
+UPSTREAM_TIMEOUT_PERCENTILE = float(os.getenv('UPSTREAM_TIMEOUT_PERCENTILE', '99'))
+UPSTREAM_TIMEOUT_MULTIPLIER = float(os.getenv('UPSTREAM_TIMEOUT_MULTIPLIER', '1.5'))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', '5'))
+BREAKER_RECOVERY_TIMEOUT = float(os.getenv('BREAKER_RECOVERY_TIMEOUT', '30'))
+
+# Outbound scheduling, per API key: requests per second (0 is unlimited), burst size and concurrent requests
+EXA_KEY_QPS = float(os.getenv('EXA_KEY_QPS', '5'))
+EXA_KEY_BURST = int(os.getenv('EXA_KEY_BURST', '5'))
+EXA_KEY_CONCURRENCY = int(os.getenv('EXA_KEY_CONCURRENCY', '10'))
+TAVILY_KEY_QPS = float(os.getenv('TAVILY_KEY_QPS', '1.5'))
+TAVILY_KEY_BURST = int(os.getenv('TAVILY_KEY_BURST', '5'))
+TAVILY_KEY_CONCURRENCY = int(os.getenv('TAVILY_KEY_CONCURRENCY', '5'))
+GEMINI_KEY_QPS = float(os.getenv('GEMINI_KEY_QPS', '5'))
+GEMINI_KEY_BURST = int(os.getenv('GEMINI_KEY_BURST', '5'))
+GEMINI_KEY_CONCURRENCY = int(os.getenv('GEMINI_KEY_CONCURRENCY', '8'))
+
+# Rate-limited calls are retried this many times, after the Retry-After or an exponential
+# backoff (seconds, capped), plus up to this fraction of jitter
+UPSTREAM_MAX_RETRIES = int(os.getenv('UPSTREAM_MAX_RETRIES', '3'))
+UPSTREAM_RETRY_BASE_DELAY = float(os.getenv('UPSTREAM_RETRY_BASE_DELAY', '1'))
+UPSTREAM_RETRY_MAX_DELAY = float(os.getenv('UPSTREAM_RETRY_MAX_DELAY', '30'))
+UPSTREAM_RETRY_JITTER = float(os.getenv('UPSTREAM_RETRY_JITTER', '0.5'))
+# Longest a call waits for a ready API key before giving up
+UPSTREAM_SCHEDULE_TIMEOUT = float(os.getenv('UPSTREAM_SCHEDULE_TIMEOUT', '30'))
+
+# Request coalescing configuration
+SINGLEFLIGHT_REDIS_LOCK = os.getenv('SINGLEFLIGHT_REDIS_LOCK', 'false').lower() in ('1', 'true', 'yes')
+SINGLEFLIGHT_LOCK_TTL = int(os.getenv('SINGLEFLIGHT_LOCK_TTL', '60'))
+SINGLEFLIGHT_WAIT_TIMEOUT = float(os.getenv('SINGLEFLIGHT_WAIT_TIMEOUT', '45'))
+SINGLEFLIGHT_POLL_INTERVAL = float(os.getenv('SINGLEFLIGHT_POLL_INTERVAL', '0.25'))
+
+# Hedged extraction configuration ("off", "delayed" or "immediate")
+EXTRACT_HEDGE_MODE = os.getenv('EXTRACT_HEDGE_MODE', 'delayed').lower()
+EXTRACT_HEDGE_DELAY = float(os.getenv('EXTRACT_HEDGE_DELAY', '3'))
+EXTRACT_HEDGE_PERCENTILE = float(os.getenv('EXTRACT_HEDGE_PERCENTILE', '95'))
+EXTRACT_HEDGE_MIN_DELAY = float(os.getenv('EXTRACT_HEDGE_MIN_DELAY', '0.5'))
+EXTRACT_HEDGE_MAX_DELAY = float(os.getenv('EXTRACT_HEDGE_MAX_DELAY', '10'))
+
+# Background prefetch configuration
+PREFETCH_ENABLED = os.getenv('PREFETCH_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+PREFETCH_INTERVAL = int(os.getenv('PREFETCH_INTERVAL', '900'))  # seconds between runs
+PREFETCH_REFRESH_WINDOW = int(os.getenv('PREFETCH_REFRESH_WINDOW', '3600'))  # refresh entries expiring within this window
+PREFETCH_TOP_N = int(os.getenv('PREFETCH_TOP_N', '10'))
+PREFETCH_CONCURRENCY = int(os.getenv('PREFETCH_CONCURRENCY', '3'))
+PREFETCH_MAX_CALLS = int(os.getenv('PREFETCH_MAX_CALLS', '50'))  # upstream calls allowed per run
+PREFETCH_LEADER_TTL = int(os.getenv('PREFETCH_LEADER_TTL', str(PREFETCH_INTERVAL * 2)))
+
+# Home page: render after this many seconds; slower domains load in via fragments (0 waits for all)
+HOME_RENDER_DEADLINE = float(os.getenv('HOME_RENDER_DEADLINE', '3'))
+
+# Article searches are rounded up to these result counts and lookbacks (days), and cached per
+# domain, so requests for fewer articles or a shorter lookback are sliced from a larger cached list
+ARTICLE_COUNT_BUCKETS = tuple(sorted(int(value) for value in os.getenv('ARTICLE_COUNT_BUCKETS', '25,100').split(',')))
+ARTICLE_LOOKBACK_BUCKETS = tuple(sorted(int(value) for value in os.getenv('ARTICLE_LOOKBACK_BUCKETS', '1,3,7,14,30').split(',')))
+
+# Cold searches for several domains are batched into one includeDomains query of up to this many
+# domains (1 searches each domain on its own); EXA_SEARCH_MAX_RESULTS caps numResults per query
+EXA_SEARCH_BATCH_SIZE = int(os.getenv('EXA_SEARCH_BATCH_SIZE', '10'))
+EXA_SEARCH_MAX_RESULTS = int(os.getenv('EXA_SEARCH_MAX_RESULTS', '100'))
+
+# Deduplication: search results whose titles are at least this similar (Jaccard, 0-1) are one story
+DEDUP_ENABLED = os.getenv('DEDUP_ENABLED', 'true').lower() == 'true'
+DEDUP_SIMILARITY = float(os.getenv('DEDUP_SIMILARITY', '0.8'))
+
+# Upstream base URLs, overridable to route through a proxy or the benchmark stubs
+EXA_API_BASE_URL = os.getenv('EXA_API_BASE_URL', 'https://api.exa.ai').rstrip('/')
+TAVILY_API_BASE_URL = os.getenv('TAVILY_API_BASE_URL', 'https://api.tavily.com').rstrip('/')
+
 # Dreamer AI News Curator Configuration
 class Config:
     QUERY_TERMS = ['人工智能', 'artificial intelligence', 'ai']
     DOMAINS = ["techcrunch.com", "36kr.com", "news.qq.com"]
     ARTICLES_PER_DOMAIN = 9
     LOOKBACK_DAYS = 3
-    API_URL = "https://api.exa.ai/search"
-    TAVILY_API_URL = "https://api.tavily.com/extract" 
+    API_URL = f"{EXA_API_BASE_URL}/search"
+    EXA_CONTENTS_URL = f"{EXA_API_BASE_URL}/contents"
+    TAVILY_API_URL = f"{TAVILY_API_BASE_URL}/extract"
@@ -0,0 +1,176 @@
+"""
+Dedup Module
+
+This module removes duplicate articles before they are extracted or
+summarized. The same story often comes back from several hosts (m.36kr.com and
+36kr.com), with tracking parameters, or syndicated to another site, and each
+copy would otherwise be cached, extracted and summarized on its own.
+
+URLs are first canonicalized: host aliases are folded, tracking parameters and
+fragments are dropped. The canonical key (the canonical URL without its scheme
+or "www.") is shared by the content cache and the extraction flight, so every
+copy of a URL maps to one extraction and therefore one cached summary.
+Near-duplicates across hosts are then found by comparing character shingles
+of the title and summary, which also works for Chinese text. A page holds tens
+of articles, so the exact Jaccard similarity of the shingle sets is computed
+directly rather than estimated with MinHash or SimHash signatures, which are
+noisy on texts as short as a headline.
+"""
+
+import re
+import unicodedata
+from typing import Dict, FrozenSet, List
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from config import DEDUP_ENABLED, DEDUP_SIMILARITY, logger
+
+# Hosts that serve the same articles as another host
+HOST_ALIASES = {
+    "m.36kr.com": "36kr.com",
+    "m.163.com": "163.com",
+    "3g.163.com": "163.com",
+    "new.qq.com": "news.qq.com",
+    "xw.qq.com": "news.qq.com",
+    "m.cnbc.com": "cnbc.com",
+    "m.wsj.com": "wsj.com",
+    "mobile.reuters.com": "reuters.com",
+    "mobile.nytimes.com": "nytimes.com",
+    "m.ftchinese.com": "ftchinese.com",
+}
+
+# Query parameters that only track the visit
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "ref", "ref_src", "ref_url", "referrer", "share", "share_token",
+    "spm", "scm", "from", "isappinstalled", "guccounter", "guce_referrer", "guce_referrer_sig",
+    "tpcc", "cmpid", "ncid", "sr_share", "smid", "taid", "_ga", "_gl",
+}
+TRACKING_PREFIXES = ("utm_", "hmsr", "hmpl", "hmcu", "hmkw", "hmci", "mkt_", "__twitter")
+
+# Shorter texts (such as "Home") are too generic to compare
+MIN_SHINGLES = 8
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalize a URL so every copy of the same page compares equal.
+
+    Args:
+        url (str): The article URL
+
+    Returns:
+        str: The URL with aliased hosts folded, tracking parameters and the fragment removed
+    """
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url
+    if not parts.netloc:
+        return url
+
+    host = parts.hostname or ""
+    host = HOST_ALIASES.get(host, host)
+    # Default ports carry no information
+    if parts.port and (parts.scheme, parts.port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{parts.port}"
+
+    query = [
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if name.lower() not in TRACKING_PARAMS and not name.lower().startswith(TRACKING_PREFIXES)
+    ]
+    path = re.sub(r"/{2,}", "/", parts.path or "/")
+    if len(path) > 1:
+        path = path.rstrip("/")
+
+    return urlunsplit((parts.scheme.lower() or "https", host, path, urlencode(sorted(query)), ""))
+
+def canonical_key(url: str) -> str:
+    """
+    Get the identity of a URL for caching and deduplication.
+
+    Args:
+        url (str): The article URL
+
+    Returns:
+        str: The canonical URL without its scheme or a leading "www."
+    """
+    canonical = canonicalize_url(url)
+    canonical = canonical.split("://", 1)[-1]
+    return canonical[4:] if canonical.startswith("www.") else canonical
+
+def _normalize_text(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    # Keep letters, digits and CJK characters; punctuation and spacing differ between copies
+    return re.sub(r"[\W_]+", " ", text).strip()
+
+def shingles(text: str, size: int = 3) -> FrozenSet[str]:
+    """
+    Split a text into overlapping character shingles.
+
+    Character shingles work for languages with and without word boundaries,
+    and are insensitive to case, punctuation and spacing.
+
+    Args:
+        text (str): The text to split
+        size (int, optional): Shingle length in characters. Defaults to 3.
+
+    Returns:
+        FrozenSet[str]: The distinct shingles
+    """
+    compact = _normalize_text(text).replace(" ", "")
+    return frozenset(compact[index:index + size] for index in range(len(compact) - size + 1))
+
+def similarity(left: FrozenSet[str], right: FrozenSet[str]) -> float:
+    """Jaccard similarity of two shingle sets."""
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+def _fingerprint_text(result: Dict) -> str:
+    return " ".join(filter(None, [result.get("title"), result.get("summary")]))
+
+def dedupe_results(results: List[Dict], threshold: float = DEDUP_SIMILARITY) -> List[Dict]:
+    """
+    Drop duplicate search results.
+
+    The first copy of each article is kept, so callers control the preference
+    through the order of the results. Canonical URLs only identify duplicates;
+    the kept results keep their original URLs, since some sites serve a
+    different page at the canonical one.
+
+    Args:
+        results (List[Dict]): Exa search results
+        threshold (float, optional): Smallest title similarity treated as the same story
+
+    Returns:
+        List[Dict]: The unique results
+    """
+    if not DEDUP_ENABLED:
+        return results
+
+    unique, seen_keys, fingerprints = [], set(), []
+    for result in results:
+        url = result.get("url")
+        if not url:
+            unique.append(result)
+            continue
+
+        key = canonical_key(url)
+        if key in seen_keys:
+            continue
+
+        fingerprint = shingles(_fingerprint_text(result))
+        if len(fingerprint) < MIN_SHINGLES:
+            fingerprint = None
+        if fingerprint and any(similarity(fingerprint, other) >= threshold for other in fingerprints):
+            logger.debug(f"Dropping near-duplicate article {url}")
+            continue
+
+        seen_keys.add(key)
+        if fingerprint:
+            fingerprints.append(fingerprint)
+        unique.append(result)
+
+    if len(unique) < len(results):
+        logger.info(f"Removed {len(results) - len(unique)} duplicate articles")
+    return unique
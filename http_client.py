@@ -0,0 +1,68 @@
+"""
+HTTP Client Module
+
+This module builds the shared aiohttp client session used for all upstream
+API calls (Exa search, Exa contents and Tavily extract). The session is
+created once in the FastAPI app lifespan and injected into the callers, so
+TLS contexts, DNS lookups and keep-alive connections are reused across requests.
+"""
+
+import ssl
+import certifi
+import aiohttp
+
+from config import (
+    HTTP_POOL_LIMIT,
+    HTTP_POOL_LIMIT_PER_HOST,
+    HTTP_KEEPALIVE_TIMEOUT,
+    HTTP_DNS_CACHE_TTL,
+    HTTP_TOTAL_TIMEOUT,
+    HTTP_CONNECT_TIMEOUT,
+    logger
+)
+
+def create_ssl_context() -> ssl.SSLContext:
+    """
+    Create an SSL context backed by the certifi CA bundle.
+
+    Returns:
+        ssl.SSLContext: The SSL context
+    """
+    return ssl.create_default_context(cafile=certifi.where())
+
+def create_http_session() -> aiohttp.ClientSession:
+    """
+    Create a pooled aiohttp client session for upstream API calls.
+
+    Must be called from within a running event loop.
+
+    Returns:
+        aiohttp.ClientSession: The client session
+    """
+    connector = aiohttp.TCPConnector(
+        ssl=create_ssl_context(),
+        limit=HTTP_POOL_LIMIT,
+        limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=HTTP_DNS_CACHE_TTL
+    )
+    timeout = aiohttp.ClientTimeout(
+        total=HTTP_TOTAL_TIMEOUT,
+        connect=HTTP_CONNECT_TIMEOUT
+    )
+    logger.info(
+        f"HTTP client session created (limit={HTTP_POOL_LIMIT}, "
+        f"limit_per_host={HTTP_POOL_LIMIT_PER_HOST}, total_timeout={HTTP_TOTAL_TIMEOUT}s)"
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+async def close_http_session(session: aiohttp.ClientSession) -> None:
+    """
+    Close the shared client session and its connection pool.
+
+    Args:
+        session (aiohttp.ClientSession): The client session to close
+    """
+    if session and not session.closed:
+        await session.close()
+        logger.info("HTTP client session closed")
@@ -0,0 +1,65 @@
+"""
+Latency Module
+
+This module keeps rolling latency samples for upstream providers.
+The percentiles drive decisions such as when to hedge an extraction request.
+"""
+
+import math
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+class LatencyTracker:
+    """
+    Rolling window of latency samples (in seconds) for one provider.
+    """
+
+    def __init__(self, name: str, window: int = 200, min_samples: int = 10):
+        self.name = name
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        """
+        Record a latency sample.
+
+        Args:
+            seconds (float): The observed latency in seconds
+        """
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """
+        Get a latency percentile over the rolling window.
+
+        Args:
+            pct (float): The percentile, between 0 and 100
+
+        Returns:
+            Optional[float]: The latency in seconds, or None if there are too few samples
+        """
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        """
+        Get a summary of the rolling window for monitoring.
+
+        Returns:
+            Dict[str, Optional[float]]: Sample count and p50/p95/p99 latencies
+        """
+        with self._lock:
+            count = len(self._samples)
+        return {
+            "samples": count,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99)
+        }
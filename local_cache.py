@@ -0,0 +1,151 @@
+"""
+Local Cache Module
+
+This module provides a bounded in-process cache that sits in front of Redis.
+Entries expire with the same TTL as their Redis counterparts and are evicted
+in least-recently-used order once the total stored size exceeds the byte budget.
+Values are stored in their serialized form, so callers that mutate a returned
+object cannot corrupt the cached copy.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+class LocalCache:
+    """
+    Byte-size-aware LRU cache with per-entry TTL and hit/miss counters.
+    """
+
+    def __init__(self, max_bytes: int, max_entries: int, max_item_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.max_item_bytes = max_item_bytes
+        self._entries: "OrderedDict[str, Tuple[str, float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 and self.max_entries > 0
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Get a serialized value from the cache.
+
+        Args:
+            key (str): The cache key
+
+        Returns:
+            Optional[str]: The serialized value, or None if missing or expired
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at, size = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: str, ttl: int) -> bool:
+        """
+        Store a serialized value in the cache.
+
+        Args:
+            key (str): The cache key
+            value (str): The serialized value
+            ttl (int): Time to live in seconds
+
+        Returns:
+            bool: True if stored, False if disabled or the value is too large
+        """
+        if not self.enabled or ttl <= 0:
+            return False
+
+        size = len(key) + len(value.encode('utf-8'))
+        if size > self.max_item_bytes:
+            return False
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic() + ttl, size)
+            self.current_bytes += size
+            self._evict()
+        return True
+
+    def ttl(self, key: str) -> Optional[float]:
+        """
+        Get the remaining time to live of a value.
+
+        Args:
+            key (str): The cache key
+
+        Returns:
+            Optional[float]: Remaining seconds, or None if missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            remaining = entry[1] - time.monotonic()
+            return remaining if remaining > 0 else None
+
+    def delete(self, key: str) -> None:
+        """
+        Remove a value from the cache.
+
+        Args:
+            key (str): The cache key
+        """
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self) -> None:
+        """Remove all values from the cache."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache counters for monitoring.
+
+        Returns:
+            Dict[str, int]: Entry count, byte usage, hits, misses and evictions
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+    def _remove(self, key: str) -> None:
+        _, _, size = self._entries.pop(key)
+        self.current_bytes -= size
+
+    def _evict(self) -> None:
+        while self._entries and (self.current_bytes > self.max_bytes or len(self._entries) > self.max_entries):
+            _, (_, _, size) = self._entries.popitem(last=False)
+            self.current_bytes -= size
+            self.evictions += 1
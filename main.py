@@ -1,32 +1,85 @@
 # file: main.py
+import time
+import sys
+_imports_started = time.perf_counter()
+
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
+from fastapi.responses import HTMLResponse, JSONResponse, FileResponse, StreamingResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from contextlib import asynccontextmanager
 from datetime import datetime
+import json
 import os
 from collections import defaultdict
 import uvicorn
-from urllib.parse import urlparse
 
 # Import from our modules
-from config import Config, logger, GEMINI_API_KEY
+from config import Config, logger, GEMINI_API_KEY, HOME_RENDER_DEADLINE
 from models import Article
 from services import (
     ArticleFetcher, 
-    try_tavily_extraction, 
-    try_exa_extraction, 
-    generate_fallback_content
+    extract_article,
+    extraction_latency
 )
-from ai_services import generate_summary_with_gemini
+from ai_services import generate_summary_with_gemini, stream_summary_with_gemini
+from summarizer import engine as summary_engine, SummaryOverloaded
 from utils import datetimeformat
-from cache import get_cached_article_content
+from cache import get_local_cache_stats, open_cache_backend, close_cache_backend
+from article_store import article_store
+from http_client import create_http_session, close_http_session
+from prefetch import PrefetchScheduler
+from resilience import get_breaker_states
+from scheduler import get_scheduler_stats
+from admission import Overloaded, home_admission, get_admission_stats
+from metrics import render_metrics, TEMPLATE_RENDER_SECONDS
+
+# Time spent importing the app's modules, the bulk of a cold start
+IMPORT_SECONDS = time.perf_counter() - _imports_started
+
+# SDKs that should be loaded on first use or by the lifespan; any of them loaded by an import is a cold-start regression
+LAZY_MODULES = ("google.generativeai", "upstash_redis", "redis", "dateutil")
+EAGER_MODULES = [module for module in LAZY_MODULES if module in sys.modules]
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    # Clients are created here rather than at import time, to keep imports fast
+    open_cache_backend()
+    if article_store:
+        await article_store.open()
+    # Shared, pooled HTTP client for all upstream API calls
+    app.state.http_session = create_http_session()
+    # Background cache warm-up for the default front page
+    app.state.prefetcher = PrefetchScheduler(app.state.http_session)
+    app.state.prefetcher.start()
+    app.state.startup = {
+        "import_ms": round(IMPORT_SECONDS * 1000, 1),
+        "init_ms": round((time.perf_counter() - started) * 1000, 1),
+        "eager_modules": EAGER_MODULES
+    }
+    logger.info(
+        f"Startup: imports took {app.state.startup['import_ms']} ms, "
+        f"clients took {app.state.startup['init_ms']} ms"
+    )
+    if EAGER_MODULES:
+        logger.warning(f"Loaded at import time instead of on first use: {', '.join(EAGER_MODULES)}")
+    try:
+        yield
+    finally:
+        await app.state.prefetcher.stop()
+        await close_http_session(app.state.http_session)
+        await close_cache_backend()
+        if article_store:
+            await article_store.close()
+        summary_engine.reset()
 
 # Initialize FastAPI app
 app = FastAPI(
     title="🕊️ Dreamer AI News Curator",
     description="AI-powered tech news curated just for you, with a beautiful bird-themed design",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
@@ -34,6 +87,32 @@ templates = Jinja2Templates(directory="templates")
 # Add custom datetime filter
 templates.env.filters['datetimeformat'] = datetimeformat
 
+def render_template(name: str, context: dict):
+    """
+    Render a template response, recording how long rendering took.
+    """
+    with TEMPLATE_RENDER_SECONDS.time(template=name):
+        return templates.TemplateResponse(name, context)
+
+
+def build_config(domains: str = None, articles_per_domain: int = None, lookback_days: int = None) -> dict:
+    """
+    Build the fetch configuration from query parameters, falling back to the defaults.
+    """
+    return {
+        'domains': domains.split(',') if domains else Config.DOMAINS,
+        'articles_per_domain': articles_per_domain if articles_per_domain is not None else Config.ARTICLES_PER_DOMAIN,
+        'lookback_days': lookback_days if lookback_days is not None else Config.LOOKBACK_DAYS
+    }
+
+
+def group_by_source(articles) -> dict:
+    grouped_articles = defaultdict(list)
+    for article in articles:
+        grouped_articles[article.source].append(article)
+    return dict(grouped_articles)
+
+
 # Routes
 @app.get("/", response_class=HTMLResponse)
 async def home(
@@ -42,32 +121,144 @@ async def home(
     articles_per_domain: int = None,
     lookback_days: int = None
 ):
-    # Get configuration from query parameters or use defaults
-    user_domains = domains.split(',') if domains else Config.DOMAINS
-    user_articles_per_domain = articles_per_domain if articles_per_domain is not None else Config.ARTICLES_PER_DOMAIN
-    user_lookback_days = lookback_days if lookback_days is not None else Config.LOOKBACK_DAYS
+    # Create a custom config for this request from query parameters or defaults
+    custom_config = build_config(domains, articles_per_domain, lookback_days)
     
-    # Create a custom config for this request
-    custom_config = {
-        'domains': user_domains,
-        'articles_per_domain': user_articles_per_domain,
-        'lookback_days': user_lookback_days
-    }
-    
-    fetcher = ArticleFetcher(os.getenv('EXA_API_KEY', ''))
-    articles = await fetcher.fetch_all(custom_config)
-
-    grouped_articles = defaultdict(list)
-    for article in articles:
-        grouped_articles[article.source].append(article)
+    # Render once the deadline passes; domains still loading get placeholders filled in by /fragments/domain
+    fetcher = ArticleFetcher(request.app.state.http_session)
+    try:
+        articles, pending_domains = await fetcher.fetch_until(
+            custom_config, HOME_RENDER_DEADLINE or None, admission=home_admission
+        )
+    except Overloaded as e:
+        # Shed with nothing cached to fall back on
+        response = render_template(
+            "index.html",
+            {
+                "request": request,
+                "grouped_articles": {},
+                "pending_domains": [],
+                "error": f"We're busy right now. Please try again in {e.retry_after} seconds.",
+                "config": custom_config,
+                "domains_str": ','.join(custom_config['domains'])
+            }
+        )
+        response.status_code = 503
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response
 
-    return templates.TemplateResponse(
+    return render_template(
         "index.html",
         {
             "request": request,
-            "grouped_articles": dict(grouped_articles),
+            "grouped_articles": group_by_source(articles),
+            "pending_domains": pending_domains,
             "config": custom_config,
-            "domains_str": ','.join(user_domains)
+            "domains_str": ','.join(custom_config['domains'])
+        }
+    )
+
+
+@app.get("/fragments/domain", response_class=HTMLResponse)
+async def domain_fragment(
+    request: Request,
+    domain: str,
+    domains: str = None,
+    articles_per_domain: int = None,
+    lookback_days: int = None
+):
+    """
+    Render the article sections for a single domain, used to fill in the home page
+    placeholders for domains that missed the render deadline. Takes the same query
+    parameters as the home page, so it joins the fetch the home page started if it
+    is still in flight, or reads the result it cached.
+    """
+    custom_config = build_config(domains, articles_per_domain, lookback_days)
+    session = request.app.state.http_session
+    fetcher = ArticleFetcher(session)
+    results = await fetcher.fetch_for_domain(session, domain, custom_config) if fetcher.configured else []
+
+    return render_template(
+        "articles/domain_fragment.html",
+        {
+            "request": request,
+            "grouped_articles": group_by_source(fetcher.to_articles(results))
+        }
+    )
+
+
+def parse_date(value: str = None):
+    """
+    Validate an optional YYYY-MM-DD query parameter.
+    """
+    if not value:
+        return None
+    datetime.strptime(value, "%Y-%m-%d")
+    return value
+
+
+@app.get("/api/articles")
+async def list_articles(
+    q: str = None,
+    domain: str = None,
+    since: str = None,
+    until: str = None,
+    limit: int = 50,
+    offset: int = 0
+):
+    """
+    Query the local article store by keywords, domains (comma-separated) and
+    published date range (YYYY-MM-DD). Served entirely from the store, with no
+    upstream calls.
+    """
+    if not article_store:
+        return JSONResponse({"error": "Article store is disabled"}, status_code=503)
+    try:
+        since, until = parse_date(since), parse_date(until)
+    except ValueError:
+        return JSONResponse({"error": "Dates must be formatted as YYYY-MM-DD"}, status_code=400)
+
+    articles = await article_store.search(q, domain.split(',') if domain else None, since, until, limit, offset)
+    return {"articles": articles, "count": len(articles), "limit": limit, "offset": offset}
+
+
+@app.get("/search", response_class=HTMLResponse)
+async def search(
+    request: Request,
+    q: str = None,
+    domain: str = None,
+    since: str = None,
+    until: str = None
+):
+    """
+    Search page over the local article store.
+    """
+    error = None
+    articles = []
+    if not article_store:
+        error = "Search is unavailable because the article store is disabled."
+    else:
+        try:
+            results = await article_store.search(
+                q, domain.split(',') if domain else None, parse_date(since), parse_date(until), limit=100
+            )
+            articles = ArticleFetcher.to_articles([
+                {"url": row["url"], "title": row["title"] or row["url"], "publishedDate": row["published_date"] or "未知"}
+                for row in results
+            ])
+        except ValueError:
+            error = "Dates must be formatted as YYYY-MM-DD."
+
+    return render_template(
+        "search.html",
+        {
+            "request": request,
+            "grouped_articles": group_by_source(articles),
+            "pending_domains": [],
+            "error": error,
+            "query": {"q": q or "", "domain": domain or "", "since": since or "", "until": until or ""},
+            "config": build_config(),
+            "domains_str": ','.join(Config.DOMAINS)
         }
     )
 
@@ -78,52 +269,116 @@ async def favicon():
 
 
 @app.get("/health")
-async def health_check():
-    return {"status": "ok", "timestamp": datetime.now().isoformat()}
+async def health_check(request: Request):
+    return {
+        "status": "ok",
+        "timestamp": datetime.now().isoformat(),
+        "local_cache": get_local_cache_stats(),
+        "extract_latency": {provider: tracker.stats() for provider, tracker in extraction_latency.items()},
+        "prefetch": request.app.state.prefetcher.last_run,
+        "summarizer": summary_engine.stats(),
+        "upstreams": get_breaker_states(),
+        "api_keys": get_scheduler_stats(),
+        "admission": get_admission_stats(),
+        "startup": request.app.state.startup
+    }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Prometheus-style metrics: Redis, upstream and template latency histograms,
+    cache hit/miss and fallback counters, and in-flight upstream calls.
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+def overloaded_response(error: Overloaded) -> JSONResponse:
+    """
+    Answer a shed request with a 503 and a Retry-After header.
+    """
+    return JSONResponse(
+        {"error": "Server is busy, please retry later", "retry_after": error.retry_after},
+        status_code=503,
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+def without_text(content_data: dict) -> dict:
+    """
+    Drop the plain text kept for summarization; clients render the HTML content.
+    """
+    return {key: value for key, value in content_data.items() if key != "text"}
+
 async def add_chinese_summary(content_data):
-    """Helper function to add Chinese summary to content if GEMINI_API_KEY is available"""
+    """
+    Helper function to add Chinese summary to content if GEMINI_API_KEY is available.
+    If the summarization engine is at capacity, marks the summary as pending instead of waiting.
+    """
     if GEMINI_API_KEY and "chinese_summary" not in content_data:
-        summary = await generate_summary_with_gemini(
-            content_data["content"], 
-            content_data.get("title", "")
-        )
+        try:
+            summary = await generate_summary_with_gemini(content_data)
+        except SummaryOverloaded:
+            content_data["summary_status"] = "pending"
+            return content_data
         if summary:
             content_data["chinese_summary"] = summary
     return content_data
 
 
 @app.get("/extract")
-async def extract_content(url: str):
+async def extract_content(request: Request, url: str):
     """
     Extract content from a URL using the Tavily Extract API with Exa API as fallback.
     If both APIs fail or are not configured, returns a mock response.
     Includes a Chinese summary generated by Google Gemini if available.
+    Concurrent requests for the same URL share a single extraction.
+    Cached content is always served; when too many uncached extractions are
+    running or queued, the request gets a 503 with Retry-After.
     """
-    # Extract domain from URL for domain-specific handling
-    domain = urlparse(url).netloc
-    
-    # Check cache first for any content from this URL
-    cached_content = await get_cached_article_content(url)
-    if cached_content:
-        logger.info(f"Using cached content for {url}")
-        return await add_chinese_summary(cached_content)
-    
-    # Try Tavily API first (better for article extraction)
-    tavily_result = await try_tavily_extraction(url, domain)
-    if tavily_result and not tavily_result.get("is_fallback"):
-        return await add_chinese_summary(tavily_result)
+    try:
+        content_data = dict(await extract_article(request.app.state.http_session, url))
+    except Overloaded as e:
+        return overloaded_response(e)
+    if content_data.get("is_fallback"):
+        return content_data
+    return without_text(await add_chinese_summary(content_data))
+
+
+@app.get("/extract/stream")
+async def extract_content_stream(request: Request, url: str):
+    """
+    Streaming variant of /extract, returned as newline-delimited JSON events:
+    a "content" event with the extracted article, "summary" events with chunks
+    of the Chinese summary as Gemini produces them, and a final "done" event
+    carrying the complete summary once it has been cached.
+    The content is extracted before the stream starts, so a shed request still
+    gets a 503 with Retry-After.
+    """
+    try:
+        content_data = dict(await extract_article(request.app.state.http_session, url))
+    except Overloaded as e:
+        return overloaded_response(e)
     
-    # If Tavily failed or returned fallback, try Exa API
-    exa_result = await try_exa_extraction(url, domain)
-    if exa_result and not exa_result.get("is_fallback"):
-        return await add_chinese_summary(exa_result)
+    async def events():
+        yield json.dumps({"type": "content", **without_text(content_data)}) + "\n"
+        
+        summary_parts = []
+        done_event = {"type": "done"}
+        if GEMINI_API_KEY and not content_data.get("is_fallback"):
+            try:
+                async for chunk in stream_summary_with_gemini(content_data):
+                    summary_parts.append(chunk)
+                    yield json.dumps({"type": "summary", "text": chunk}) + "\n"
+            except SummaryOverloaded:
+                done_event["summary_status"] = "pending"
+        
+        done_event["chinese_summary"] = "".join(summary_parts) or None
+        yield json.dumps(done_event) + "\n"
     
-    # If both APIs failed, use our fallback content
-    logger.warning(f"Both Tavily and Exa APIs failed for {url}, using fallback content")
-    fallback_content = generate_fallback_content(url, domain)
-    return fallback_content
+    return StreamingResponse(
+        events(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,187 @@
+"""
+Metrics Module
+
+This module provides lightweight Prometheus-style metrics: counters, gauges and
+histograms with labels, rendered in the Prometheus text exposition format by
+the /metrics endpoint. Metrics live in process memory, so with several workers
+each worker reports its own values.
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from sub-millisecond cache reads to slow generations
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_registry: List["_Metric"] = []
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{_escape(extra[1])}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_number(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    metric_type = ""
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.metric_type}"]
+        with self._lock:
+            lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    """
+    A value that only goes up, such as a number of requests.
+    """
+    metric_type = "counter"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_number(value)}"
+            for key, value in self._values.items()
+        ]
+
+class Gauge(_Metric):
+    """
+    A value that goes up and down, such as the number of calls in flight.
+    """
+    metric_type = "gauge"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_number(value)}"
+            for key, value in self._values.items()
+        ]
+
+class Histogram(_Metric):
+    """
+    A distribution of observed values, such as request latencies, in cumulative buckets.
+    """
+    metric_type = "histogram"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * len(self.buckets), [0.0]))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            total[0] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observe the duration of the block, in seconds. Also works around awaits in async code.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', _format_number(bound)))} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_number(total[0])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+def render_metrics() -> str:
+    """
+    Render every registered metric in the Prometheus text exposition format.
+
+    Returns:
+        str: The metrics document
+    """
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# Metrics shared across modules
+CACHE_BACKEND_SECONDS = Histogram(
+    "cache_backend_seconds", "Duration of shared cache round trips (a pipeline counts as one).", ["backend", "operation"]
+)
+CACHE_HITS = Counter("cache_hits_total", "Cache lookups that found a value, by key family and tier.", ["family", "tier"])
+CACHE_MISSES = Counter("cache_misses_total", "Cache lookups that found no value, by key family.", ["family"])
+UPSTREAM_SECONDS = Histogram(
+    "upstream_request_seconds",
+    "Duration of upstream calls to Exa, Tavily and Gemini.",
+    ["upstream", "operation", "outcome"]
+)
+UPSTREAM_IN_FLIGHT = Gauge("upstream_in_flight", "Upstream calls currently in flight.", ["upstream"])
+UPSTREAM_REJECTED = Counter("upstream_rejected_total", "Upstream calls rejected by an open circuit breaker.", ["upstream"])
+UPSTREAM_RATE_LIMITED = Counter("upstream_rate_limited_total", "Upstream calls rejected with a rate limit, by provider.", ["provider"])
+UPSTREAM_SCHEDULE_SECONDS = Histogram(
+    "upstream_schedule_seconds", "Time upstream calls waited for a ready API key.", ["provider"]
+)
+ADMISSION_ACTIVE = Gauge("admission_active", "Requests holding an admission slot.", ["queue"])
+ADMISSION_QUEUED = Gauge("admission_queued", "Requests waiting for an admission slot.", ["queue"])
+ADMISSION_SHED = Counter("admission_shed_total", "Requests shed by admission control, by reason.", ["queue", "reason"])
+ADMISSION_WAIT_SECONDS = Histogram("admission_wait_seconds", "Time admitted requests waited in the queue.", ["queue"])
+FALLBACK_CONTENT = Counter("fallback_content_total", "Extractions that returned fallback content.")
+TEMPLATE_RENDER_SECONDS = Histogram("template_render_seconds", "Duration of template rendering.", ["template"])
@@ -1,11 +1,23 @@
 from pydantic import BaseModel, model_validator
 from typing import Optional
 from urllib.parse import urlparse
-import pytz
-from dateutil import parser
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from config import logger
 
+# China Standard Time (UTC+8) has no daylight saving, so a fixed offset is exact
+CHINA_TZ = timezone(timedelta(hours=8))
+
+def parse_date(date_str: str) -> datetime:
+    """
+    Parse a published date, using the fast ISO 8601 parser for the formats the APIs return.
+    """
+    try:
+        return datetime.fromisoformat(date_str)
+    except ValueError:
+        # Other formats are rare; dateutil is only imported when one shows up
+        from dateutil import parser
+        return parser.parse(date_str)
+
 class Article(BaseModel):
     title: str = "未命名"
     url: str
@@ -27,16 +39,15 @@ class Article(BaseModel):
                     self.formatted_date = "未知日期"
                 else:
                     # Parse the ISO format date
-                    dt = parser.parse(date_str)
+                    dt = parse_date(date_str)
                     
                     # Convert to China timezone (UTC+8)
-                    china_tz = pytz.timezone('Asia/Shanghai')
                     if dt.tzinfo is None:
                         # If the datetime has no timezone info, assume it's UTC
-                        dt = dt.replace(tzinfo=pytz.UTC)
+                        dt = dt.replace(tzinfo=timezone.utc)
                     
                     # Convert to China timezone
-                    dt = dt.astimezone(china_tz)
+                    dt = dt.astimezone(CHINA_TZ)
                     
                     # Format the date in YYYY-MM-DD format
                     self.formatted_date = dt.strftime('%Y-%m-%d')
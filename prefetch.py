@@ -0,0 +1,202 @@
+"""
+Prefetch Module
+
+This module runs a background scheduler that keeps the caches warm. Each run
+refreshes the default domain article lists before they expire, extracts the
+newest front-page articles and generates their summaries, so the first visitor
+after an expiry does not pay for the upstream calls. When several workers run,
+a lease in the shared cache backend elects a single leader to do the prefetching.
+"""
+
+import asyncio
+import uuid
+from typing import Dict, List, Optional
+
+import aiohttp
+
+from config import (
+    Config,
+    GEMINI_API_KEY,
+    PREFETCH_ENABLED,
+    PREFETCH_INTERVAL,
+    PREFETCH_REFRESH_WINDOW,
+    PREFETCH_TOP_N,
+    PREFETCH_CONCURRENCY,
+    PREFETCH_MAX_CALLS,
+    PREFETCH_LEADER_TTL,
+    logger
+)
+import cache
+from cache import (
+    ARTICLE_STALE_TTL,
+    article_fetch_window,
+    articles_cache_key,
+    cache_ttl,
+    get_cached_articles_for_domain,
+    get_cached_article_content,
+    get_cached_summary
+)
+from services import ArticleFetcher, extract_article
+from ai_services import generate_summary_with_gemini
+from admission import PRIORITY_BACKGROUND
+from scheduler import CallBudget, call_budget
+from utils import with_text_fields
+
+LEADER_KEY = "prefetch:leader"
+
+def get_default_config() -> dict:
+    """
+    Get the home page configuration used when no query parameters are given.
+
+    Returns:
+        dict: The default fetch configuration
+    """
+    return {
+        'domains': Config.DOMAINS,
+        'articles_per_domain': Config.ARTICLES_PER_DOMAIN,
+        'lookback_days': Config.LOOKBACK_DAYS
+    }
+
+class PrefetchScheduler:
+    """
+    Periodically warms the article, content and summary caches.
+    """
+
+    def __init__(self, session: aiohttp.ClientSession):
+        self.session = session
+        self.token = uuid.uuid4().hex
+        self.last_run: Optional[Dict[str, int]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start the background loop if prefetching is enabled."""
+        if not PREFETCH_ENABLED:
+            logger.info("Prefetch scheduler disabled")
+            return
+        self._task = asyncio.create_task(self._run_forever())
+        logger.info(f"Prefetch scheduler started (interval={PREFETCH_INTERVAL}s)")
+
+    async def stop(self) -> None:
+        """Stop the background loop and give up leadership."""
+        if not self._task:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self._release_leadership()
+        logger.info("Prefetch scheduler stopped")
+
+    async def _run_forever(self) -> None:
+        while True:
+            try:
+                if await self._acquire_leadership():
+                    self.last_run = await self.run_once()
+                else:
+                    logger.info("Another worker is the prefetch leader, skipping run")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in prefetch run: {str(e)}")
+            await asyncio.sleep(PREFETCH_INTERVAL)
+
+    async def run_once(self) -> Dict[str, int]:
+        """
+        Run one prefetch pass over the default domains.
+
+        Returns:
+            Dict[str, int]: Counts of refreshed domains, extractions, summaries and calls spent
+        """
+        # Every upstream request made by the run, including hedges, retries and map-reduce chunks, is charged
+        budget = CallBudget(PREFETCH_MAX_CALLS)
+        budget_token = call_budget.set(budget)
+        try:
+            return await self._run_once(budget)
+        finally:
+            call_budget.reset(budget_token)
+
+    async def _run_once(self, budget: CallBudget) -> Dict[str, int]:
+        semaphore = asyncio.Semaphore(PREFETCH_CONCURRENCY)
+        stats = {"domains_refreshed": 0, "articles_extracted": 0, "summaries_generated": 0}
+        config = get_default_config()
+        fetcher = ArticleFetcher(self.session)
+
+        if not fetcher.configured:
+            logger.warning("EXA_API_KEY not found, skipping prefetch")
+            return {**stats, "calls": 0}
+
+        async def refresh_domain(domain: str) -> List[Dict]:
+            async with semaphore:
+                key = articles_cache_key(domain, article_fetch_window(config)[1])
+                remaining = await cache_ttl(key)
+                # The stored TTL includes the stale window; refresh before the entry turns stale
+                refresh = remaining is None or remaining - ARTICLE_STALE_TTL < PREFETCH_REFRESH_WINDOW
+                if budget.exhausted:
+                    # Over budget: use whatever is cached, without searching
+                    return await get_cached_articles_for_domain(domain, config) or []
+                results = await fetcher.fetch_for_domain(self.session, domain, config, refresh=refresh)
+                if refresh and results:
+                    stats["domains_refreshed"] += 1
+                return results
+
+        domain_results = await asyncio.gather(
+            *[refresh_domain(domain) for domain in config['domains']],
+            return_exceptions=True
+        )
+
+        articles = []
+        for results in domain_results:
+            if isinstance(results, Exception):
+                logger.error(f"Prefetch domain task failed: {results}")
+                continue
+            articles.extend(results)
+        articles.sort(key=lambda article: article.get('publishedDate') or '', reverse=True)
+        top_urls = list(dict.fromkeys(article['url'] for article in articles if article.get('url')))[:PREFETCH_TOP_N]
+
+        async def warm_article(url: str) -> None:
+            async with semaphore:
+                content_data = await get_cached_article_content(url)
+                if not content_data:
+                    if budget.exhausted:
+                        return
+                    content_data = await extract_article(self.session, url, priority=PRIORITY_BACKGROUND)
+                    stats["articles_extracted"] += 1
+                if not content_data or content_data.get("is_fallback") or not GEMINI_API_KEY:
+                    return
+
+                content_data = with_text_fields(content_data)
+                if await get_cached_summary(content_data["content_hash"], content_data.get("title", "")):
+                    return
+                if budget.exhausted:
+                    return
+                if await generate_summary_with_gemini(content_data, priority=PRIORITY_BACKGROUND):
+                    stats["summaries_generated"] += 1
+
+        await asyncio.gather(*[warm_article(url) for url in top_urls], return_exceptions=True)
+
+        stats["calls"] = budget.spent
+        logger.info(f"Prefetch run finished: {stats}")
+        return stats
+
+    async def _acquire_leadership(self) -> bool:
+        # Without Redis there is nothing to coordinate with
+        if not cache.backend:
+            return True
+        try:
+            if await cache.backend.set_if_absent(LEADER_KEY, self.token, PREFETCH_LEADER_TTL):
+                return True
+            # Extend the lease only if we still hold it
+            return await cache.backend.expire_if_equals(LEADER_KEY, self.token, PREFETCH_LEADER_TTL)
+        except Exception as e:
+            logger.error(f"Error acquiring prefetch leadership: {str(e)}")
+            return False
+
+    async def _release_leadership(self) -> None:
+        if not cache.backend:
+            return
+        try:
+            await cache.backend.delete_if_equals(LEADER_KEY, self.token)
+        except Exception as e:
+            logger.error(f"Error releasing prefetch leadership: {str(e)}")
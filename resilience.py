@@ -0,0 +1,271 @@
+"""
+Resilience Module
+
+This module protects the app from degraded upstream providers (Exa, Tavily and
+Gemini). Each upstream gets a guard with:
+
+* an adaptive timeout derived from a rolling latency percentile,
+* a circuit breaker that opens after consecutive failures, so calls fail fast
+  instead of waiting on a provider that is down,
+* half-open probing: after the recovery timeout a single call is let through,
+  and its outcome closes or re-opens the breaker.
+
+Rate limits (429) are not failures: they say the API key is busy, not that the
+provider is down, so they leave the breaker alone and are retried by the
+scheduler module on another key.
+"""
+
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+import aiohttp
+
+from config import (
+    UPSTREAM_TIMEOUT_PERCENTILE,
+    UPSTREAM_TIMEOUT_MULTIPLIER,
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RECOVERY_TIMEOUT,
+    logger
+)
+from latency import LatencyTracker
+from metrics import UPSTREAM_SECONDS, UPSTREAM_IN_FLIGHT, UPSTREAM_REJECTED
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the upstream's circuit breaker is open."""
+
+class UpstreamError(Exception):
+    """Raised when an upstream responds with a server error or rate limit."""
+
+class RateLimitedError(UpstreamError):
+    """Raised when an upstream rejects a call for exceeding its rate limit."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header.
+
+    Args:
+        value (Optional[str]): Delay in seconds, or an HTTP date
+
+    Returns:
+        Optional[float]: Seconds to wait, or None if the header is missing or invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+class UpstreamGuard:
+    """
+    Adaptive timeout and circuit breaker for one upstream endpoint.
+    """
+
+    def __init__(self, name: str, initial_timeout: float, min_timeout: float, max_timeout: float):
+        self.name = name
+        self.initial_timeout = initial_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.latency = LatencyTracker(name)
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.total_failures = 0
+        self.rejected = 0
+        self._probe_in_flight = False
+
+    def timeout(self) -> float:
+        """
+        Get the timeout for the next call.
+
+        Returns:
+            float: Seconds, from the rolling latency percentile times the multiplier, clamped to the min/max
+        """
+        observed = self.latency.percentile(UPSTREAM_TIMEOUT_PERCENTILE)
+        if observed is None:
+            return self.initial_timeout
+        return min(max(observed * UPSTREAM_TIMEOUT_MULTIPLIER, self.min_timeout), self.max_timeout)
+
+    def check(self) -> None:
+        """
+        Check whether a call would be let through, without taking the half-open probe.
+        Lets callers skip work spent ahead of the call, such as taking an API key.
+
+        Raises:
+            CircuitOpenError: If the breaker is open, or half-open with a probe already running
+        """
+        if self.state == OPEN and time.monotonic() - self.opened_at < BREAKER_RECOVERY_TIMEOUT:
+            reason = f"Circuit open for {self.name}"
+        elif self.state == HALF_OPEN and self._probe_in_flight:
+            reason = f"Circuit half-open for {self.name}, probe in flight"
+        else:
+            return
+        self.rejected += 1
+        UPSTREAM_REJECTED.inc(upstream=self.name)
+        raise CircuitOpenError(reason)
+
+    def before_call(self) -> None:
+        """
+        Check whether a call may proceed.
+
+        Raises:
+            CircuitOpenError: If the breaker is open, or half-open with a probe already running
+        """
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < BREAKER_RECOVERY_TIMEOUT:
+                self.rejected += 1
+                raise CircuitOpenError(f"Circuit open for {self.name}")
+            self.state = HALF_OPEN
+            logger.info(f"Circuit half-open for {self.name}, probing")
+
+        if self.state == HALF_OPEN:
+            if self._probe_in_flight:
+                self.rejected += 1
+                raise CircuitOpenError(f"Circuit half-open for {self.name}, probe in flight")
+            self._probe_in_flight = True
+
+    def record_success(self, seconds: float = None) -> None:
+        if seconds is not None:
+            self.latency.record(seconds)
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+        if self.state != CLOSED:
+            logger.info(f"Circuit closed for {self.name}")
+            self.state = CLOSED
+
+    def record_failure(self, reason: str) -> None:
+        self.consecutive_failures += 1
+        self.total_failures += 1
+        self._probe_in_flight = False
+        if self.state == HALF_OPEN or self.consecutive_failures >= BREAKER_FAILURE_THRESHOLD:
+            if self.state != OPEN:
+                logger.warning(f"Circuit opened for {self.name} after: {reason}")
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def record_cancelled(self) -> None:
+        # A cancelled call (e.g. a hedging loser) says nothing about upstream health
+        self._probe_in_flight = False
+
+    @asynccontextmanager
+    async def track(self, record_latency: bool = True, operation: str = "request"):
+        """
+        Guard one call: reject it if the breaker is open and record its outcome.
+
+        Args:
+            record_latency (bool, optional): Whether the call's duration feeds the adaptive timeout. Defaults to True.
+            operation (str, optional): Operation label for the latency metrics. Defaults to "request".
+
+        Raises:
+            CircuitOpenError: If the breaker rejects the call
+        """
+        try:
+            self.before_call()
+        except CircuitOpenError:
+            UPSTREAM_REJECTED.inc(upstream=self.name)
+            raise
+        start = time.monotonic()
+        UPSTREAM_IN_FLIGHT.inc(upstream=self.name)
+        try:
+            yield
+        except (asyncio.CancelledError, GeneratorExit):
+            self.record_cancelled()
+            raise
+        except RateLimitedError:
+            self.record_cancelled()
+            UPSTREAM_SECONDS.observe(time.monotonic() - start, upstream=self.name, operation=operation, outcome="rate_limited")
+            raise
+        except Exception as e:
+            self.record_failure(f"{type(e).__name__}: {str(e)}")
+            UPSTREAM_SECONDS.observe(time.monotonic() - start, upstream=self.name, operation=operation, outcome="failure")
+            raise
+        finally:
+            UPSTREAM_IN_FLIGHT.dec(upstream=self.name)
+        elapsed = time.monotonic() - start
+        UPSTREAM_SECONDS.observe(elapsed, upstream=self.name, operation=operation, outcome="success")
+        self.record_success(elapsed if record_latency else None)
+
+    def stats(self) -> dict:
+        """
+        Get breaker state and counters for monitoring.
+
+        Returns:
+            dict: State, failure counts, rejected calls, current timeout and latency percentiles
+        """
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "total_failures": self.total_failures,
+            "rejected": self.rejected,
+            "timeout": round(self.timeout(), 3),
+            "latency": self.latency.stats()
+        }
+
+@asynccontextmanager
+async def guarded_post(guard: UpstreamGuard, session: aiohttp.ClientSession, url: str, **kwargs):
+    """
+    POST through a guard, with the guard's adaptive timeout covering the whole request.
+    Server errors (5xx), and connection errors or timeouts while reading the body,
+    count as failures. Rate limits (429, or 503 with a Retry-After) raise
+    RateLimitedError, which does not. Other errors raised in the block, such as a
+    body that does not parse, propagate without counting against the upstream.
+
+    Args:
+        guard (UpstreamGuard): The guard for the upstream endpoint
+        session (aiohttp.ClientSession): The HTTP client session
+        url (str): The request URL
+        **kwargs: Passed through to session.post
+
+    Yields:
+        aiohttp.ClientResponse: The response
+    """
+    caller_error = None
+    async with guard.track():
+        async with session.post(url, timeout=aiohttp.ClientTimeout(total=guard.timeout()), **kwargs) as response:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if response.status == 429 or (response.status == 503 and retry_after is not None):
+                raise RateLimitedError(f"{guard.name} returned HTTP {response.status}", retry_after)
+            if response.status >= 500:
+                raise UpstreamError(f"{guard.name} returned HTTP {response.status}: {await response.text()}")
+            try:
+                yield response
+            except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError):
+                raise
+            except Exception as e:
+                # The upstream answered; the call is recorded from its status, not from what the caller made of it
+                caller_error = e
+    if caller_error:
+        raise caller_error
+
+# One guard per upstream endpoint: (initial, min, max) timeouts in seconds
+guards: Dict[str, UpstreamGuard] = {
+    "exa_search": UpstreamGuard("exa_search", 10, 2, 20),
+    # Live crawls may take up to livecrawlTimeout (10s), so the floor stays above it
+    "exa_contents": UpstreamGuard("exa_contents", 20, 12, 25),
+    "tavily": UpstreamGuard("tavily", 20, 3, 30),
+    "gemini": UpstreamGuard("gemini", 45, 10, 90)
+}
+
+def get_breaker_states() -> Dict[str, dict]:
+    """
+    Get the state of every upstream guard.
+
+    Returns:
+        Dict[str, dict]: Guard stats keyed by upstream name
+    """
+    return {name: guard.stats() for name, guard in guards.items()}
@@ -0,0 +1,443 @@
+"""
+Scheduler Module
+
+This module schedules outbound calls to Exa, Tavily and Gemini over a pool of
+API keys per provider, so a fan-out is paced to the providers' rate limits
+instead of being answered with 429s. Each key has:
+
+* a token bucket (requests per second, with a burst),
+* a limit on concurrent requests,
+* a cooldown, set when the provider rate-limits the key.
+
+A call takes the least loaded key that is ready, or waits for the first one to
+become ready. A rate-limited call puts its key on cooldown for the Retry-After
+(or an exponential backoff when there is none), with jitter so waiting calls
+do not all return at once, and is retried on the next ready key. Rate limits
+therefore delay results instead of dropping them.
+"""
+
+import time
+import random
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar, Union
+
+import aiohttp
+
+from config import (
+    EXA_API_KEYS,
+    TAVILY_API_KEYS,
+    GEMINI_API_KEYS,
+    EXA_KEY_QPS,
+    EXA_KEY_BURST,
+    EXA_KEY_CONCURRENCY,
+    TAVILY_KEY_QPS,
+    TAVILY_KEY_BURST,
+    TAVILY_KEY_CONCURRENCY,
+    GEMINI_KEY_QPS,
+    GEMINI_KEY_BURST,
+    GEMINI_KEY_CONCURRENCY,
+    UPSTREAM_MAX_RETRIES,
+    UPSTREAM_RETRY_BASE_DELAY,
+    UPSTREAM_RETRY_MAX_DELAY,
+    UPSTREAM_RETRY_JITTER,
+    UPSTREAM_SCHEDULE_TIMEOUT,
+    logger
+)
+from resilience import UpstreamGuard, UpstreamError, RateLimitedError, guarded_post
+from metrics import UPSTREAM_RATE_LIMITED, UPSTREAM_SCHEDULE_SECONDS
+
+T = TypeVar("T")
+
+class BudgetExhausted(UpstreamError):
+    """Raised when a call would exceed the call budget of its context."""
+
+class CallBudget:
+    """
+    Caps the number of upstream requests made within a context, such as one prefetch run.
+    """
+
+    def __init__(self, max_calls: int):
+        self.max_calls = max_calls
+        self.spent = 0
+
+    @property
+    def exhausted(self) -> bool:
+        return self.spent >= self.max_calls
+
+    def try_spend(self) -> bool:
+        """
+        Reserve one upstream request.
+
+        Returns:
+            bool: True if the request fits in the budget
+        """
+        if self.exhausted:
+            return False
+        self.spent += 1
+        return True
+
+class SharedBudget:
+    """
+    The call budget of work that other callers may join, such as a coalesced
+    extraction. It charges the budget of the caller that started the work until
+    a caller without a budget (a user request) joins, and then stops applying,
+    so the joiner is not served a result cut short by someone else's budget.
+    """
+
+    def __init__(self, budget: "Union[CallBudget, SharedBudget]"):
+        self.budget: "Optional[Union[CallBudget, SharedBudget]]" = budget
+
+    @property
+    def max_calls(self) -> Optional[int]:
+        return self.budget.max_calls if self.budget else None
+
+    @property
+    def exhausted(self) -> bool:
+        return bool(self.budget) and self.budget.exhausted
+
+    def try_spend(self) -> bool:
+        return self.budget.try_spend() if self.budget else True
+
+    def lift(self) -> None:
+        self.budget = None
+
+# The budget charged for every upstream request made in the current context, if any.
+# Tasks inherit it, so hedged extractions and map-reduce summaries are charged per request.
+call_budget: ContextVar[Optional[Union[CallBudget, SharedBudget]]] = ContextVar("call_budget", default=None)
+
+def share_call_budget() -> Optional[SharedBudget]:
+    """
+    Wrap the current context's budget, if any, for work other callers may join.
+    The work should run with call_budget set to the result.
+
+    Returns:
+        Optional[SharedBudget]: The shared budget, or None if the context has no budget
+    """
+    budget = call_budget.get()
+    return SharedBudget(budget) if budget is not None else None
+
+def join_call_budget(shared: Optional[SharedBudget]) -> None:
+    """
+    Join work started with share_call_budget(): a caller without a budget lifts it.
+
+    Args:
+        shared (Optional[SharedBudget]): The work's shared budget
+    """
+    if shared is not None and call_budget.get() is None:
+        shared.lift()
+
+def _charge(provider: str) -> None:
+    budget = call_budget.get()
+    if budget is not None and not budget.try_spend():
+        raise BudgetExhausted(f"Call budget of {budget.max_calls} spent, not calling {provider}")
+
+class TokenBucket:
+    """
+    Token bucket refilled at `rate` tokens per second, holding at most `burst`.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        if self.rate > 0:
+            self._refill(now)
+            self.tokens -= 1
+
+    def drain(self, now: float) -> None:
+        # The provider says the key is over its limit, whatever the bucket estimated
+        if self.rate > 0:
+            self._refill(now)
+            self.tokens = min(self.tokens, 0.0)
+
+class ApiKey:
+    """
+    One API key and its rate limit state.
+    """
+
+    def __init__(self, provider: str, key: str, qps: float, burst: int, concurrency: int):
+        self.provider = provider
+        self.key = key
+        self.bucket = TokenBucket(qps, burst)
+        self.concurrency = max(concurrency, 1)
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.rate_limited = 0
+
+    @property
+    def label(self) -> str:
+        # Enough of the key to tell the pool's keys apart in logs, without exposing it
+        return f"{self.provider}:…{self.key[-4:]}"
+
+    def wait(self, now: float) -> float:
+        """Seconds until this key can take a call; infinite while it is at its concurrency limit."""
+        if self.in_flight >= self.concurrency:
+            return float("inf")
+        return max(self.cooldown_until - now, self.bucket.delay(now), 0.0)
+
+    def stats(self, now: float) -> dict:
+        return {
+            "key": self.label,
+            "in_flight": self.in_flight,
+            "tokens": round(self.bucket.tokens, 2),
+            "cooldown": round(max(self.cooldown_until - now, 0.0), 3),
+            "requests": self.requests,
+            "rate_limited": self.rate_limited
+        }
+
+class KeyPool:
+    """
+    The API keys of one provider, handed out to calls as they become ready.
+    """
+
+    def __init__(self, provider: str, keys: List[str], qps: float, burst: int, concurrency: int):
+        self.provider = provider
+        self.qps = qps
+        self.burst = burst
+        self.concurrency = concurrency
+        self.keys: List[ApiKey] = []
+        self.waiting = 0
+        self._waiters: set = set()
+        self.set_keys(keys)
+
+    def set_keys(self, keys: List[str]) -> None:
+        """Replace the pool's keys, keeping the state of keys that stay."""
+        existing = {api_key.key: api_key for api_key in self.keys}
+        self.keys = [
+            existing.get(key) or ApiKey(self.provider, key, self.qps, self.burst, self.concurrency)
+            for key in dict.fromkeys(keys)
+        ]
+        self._wake()
+
+    def __bool__(self) -> bool:
+        return bool(self.keys)
+
+    def _pick(self, now: float) -> Tuple[Optional[ApiKey], float]:
+        # The least loaded ready key, or the shortest wait until one is ready
+        ready = [api_key for api_key in self.keys if api_key.wait(now) == 0]
+        if ready:
+            return min(ready, key=lambda api_key: (api_key.in_flight / api_key.concurrency, -api_key.bucket.tokens)), 0.0
+        return None, min((api_key.wait(now) for api_key in self.keys), default=float("inf"))
+
+    def _wake(self) -> None:
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def acquire(self, timeout: float = UPSTREAM_SCHEDULE_TIMEOUT) -> ApiKey:
+        """
+        Wait for a ready key and take it.
+
+        Args:
+            timeout (float, optional): Longest wait in seconds. Defaults to UPSTREAM_SCHEDULE_TIMEOUT.
+
+        Returns:
+            ApiKey: The key, which must be given back with release()
+
+        Raises:
+            UpstreamError: If the pool has no keys
+            RateLimitedError: If no key becomes ready within the timeout
+        """
+        if not self.keys:
+            raise UpstreamError(f"No API keys configured for {self.provider}")
+
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        deadline = started + timeout
+        self.waiting += 1
+        try:
+            while True:
+                now = time.monotonic()
+                api_key, wait = self._pick(now)
+                if api_key:
+                    api_key.bucket.take(now)
+                    api_key.in_flight += 1
+                    api_key.requests += 1
+                    UPSTREAM_SCHEDULE_SECONDS.observe(now - started, provider=self.provider)
+                    return api_key
+
+                remaining = deadline - now
+                if remaining <= 0 or (wait != float("inf") and wait > remaining):
+                    # No key will be ready in time (one may be cooling down for longer); fail now
+                    raise RateLimitedError(f"No {self.provider} API key available within {timeout:g}s")
+
+                # Sleep until a key is released or the soonest one is ready
+                waiter = loop.create_future()
+                self._waiters.add(waiter)
+                try:
+                    await asyncio.wait([waiter], timeout=min(wait, remaining))
+                finally:
+                    self._waiters.discard(waiter)
+        finally:
+            self.waiting -= 1
+
+    def release(self, api_key: ApiKey) -> None:
+        api_key.in_flight -= 1
+        self._wake()
+
+    @asynccontextmanager
+    async def lease(self, timeout: float = UPSTREAM_SCHEDULE_TIMEOUT):
+        """
+        Hold one key for the duration of the block.
+
+        Yields:
+            ApiKey: The key
+        """
+        api_key = await self.acquire(timeout)
+        try:
+            yield api_key
+        finally:
+            self.release(api_key)
+
+    def back_off(self, api_key: ApiKey, retry_after: Optional[float], attempt: int) -> float:
+        """
+        Put a rate-limited key on cooldown.
+
+        Args:
+            api_key (ApiKey): The key the provider rejected
+            retry_after (Optional[float]): The provider's Retry-After in seconds, if it sent one
+            attempt (int): How many times the call has been retried so far
+
+        Returns:
+            float: The cooldown in seconds
+        """
+        now = time.monotonic()
+        if retry_after is None:
+            retry_after = min(UPSTREAM_RETRY_BASE_DELAY * 2 ** attempt, UPSTREAM_RETRY_MAX_DELAY)
+        delay = retry_after * (1 + random.uniform(0, UPSTREAM_RETRY_JITTER))
+        api_key.cooldown_until = max(api_key.cooldown_until, now + delay)
+        api_key.bucket.drain(now)
+        api_key.rate_limited += 1
+        UPSTREAM_RATE_LIMITED.inc(provider=self.provider)
+        logger.warning(f"{api_key.label} rate limited, cooling down for {delay:.2f}s")
+        return delay
+
+    def stats(self) -> dict:
+        """
+        Get the pool's state for monitoring.
+
+        Returns:
+            dict: Calls waiting for a key and the state of each key
+        """
+        now = time.monotonic()
+        return {
+            "waiting": self.waiting,
+            "keys": [api_key.stats(now) for api_key in self.keys]
+        }
+
+# One pool per provider; Exa search and contents share the Exa keys
+key_pools: Dict[str, KeyPool] = {
+    "exa": KeyPool("exa", EXA_API_KEYS, EXA_KEY_QPS, EXA_KEY_BURST, EXA_KEY_CONCURRENCY),
+    "tavily": KeyPool("tavily", TAVILY_API_KEYS, TAVILY_KEY_QPS, TAVILY_KEY_BURST, TAVILY_KEY_CONCURRENCY),
+    "gemini": KeyPool("gemini", GEMINI_API_KEYS, GEMINI_KEY_QPS, GEMINI_KEY_BURST, GEMINI_KEY_CONCURRENCY)
+}
+
+@asynccontextmanager
+async def scheduled(provider: str, start: Callable[[ApiKey], Awaitable[T]], guard: Optional[UpstreamGuard] = None):
+    """
+    Start a call on the next ready key of a provider, retrying rate limits on another key.
+    The key stays taken until the block exits, so a streamed response counts against it.
+
+    Args:
+        provider (str): The provider's pool name
+        start (Callable[[ApiKey], Awaitable[T]]): Starts the call with a key; raises RateLimitedError on a rate limit
+        guard (UpstreamGuard, optional): Checked before each attempt when `start` enters it itself
+
+    Yields:
+        T: The result of `start`
+
+    Raises:
+        CircuitOpenError: If the guard's breaker rejects the call
+        RateLimitedError: If the call is still rate limited after UPSTREAM_MAX_RETRIES retries
+        BudgetExhausted: If the context's call budget is spent
+    """
+    pool = key_pools[provider]
+    for attempt in range(UPSTREAM_MAX_RETRIES + 1):
+        # A call the breaker would reject must not spend a token, a key slot or the budget
+        if guard:
+            guard.check()
+        _charge(provider)
+        async with pool.lease() as api_key:
+            try:
+                result = await start(api_key)
+            except RateLimitedError as e:
+                pool.back_off(api_key, e.retry_after, attempt)
+                if attempt == UPSTREAM_MAX_RETRIES:
+                    raise
+                continue
+            yield result
+            return
+
+@asynccontextmanager
+async def scheduled_post(
+    provider: str,
+    guard: UpstreamGuard,
+    session: aiohttp.ClientSession,
+    url: str,
+    headers: Callable[[str], dict],
+    **kwargs
+):
+    """
+    POST through a guard on the next ready key of a provider, retrying rate limits on another key.
+
+    Args:
+        provider (str): The provider's pool name
+        guard (UpstreamGuard): The guard for the upstream endpoint
+        session (aiohttp.ClientSession): The HTTP client session
+        url (str): The request URL
+        headers (Callable[[str], dict]): Builds the request headers for an API key
+        **kwargs: Passed through to session.post
+
+    Yields:
+        aiohttp.ClientResponse: The response
+
+    Raises:
+        CircuitOpenError: If the guard's breaker rejects the call
+        RateLimitedError: If the call is still rate limited after UPSTREAM_MAX_RETRIES retries
+        BudgetExhausted: If the context's call budget is spent
+    """
+    pool = key_pools[provider]
+    for attempt in range(UPSTREAM_MAX_RETRIES + 1):
+        responded = False
+        # A call the breaker would reject must not spend a token, a key slot or the budget
+        guard.check()
+        _charge(provider)
+        async with pool.lease() as api_key:
+            try:
+                async with guarded_post(guard, session, url, headers=headers(api_key.key), **kwargs) as response:
+                    responded = True
+                    yield response
+                return
+            except RateLimitedError as e:
+                # Only the request itself is retried, not errors raised by the caller's block
+                if responded:
+                    raise
+                pool.back_off(api_key, e.retry_after, attempt)
+                if attempt == UPSTREAM_MAX_RETRIES:
+                    raise
+
+def get_scheduler_stats() -> Dict[str, dict]:
+    """
+    Get the state of every provider's key pool.
+
+    Returns:
+        Dict[str, dict]: Pool stats keyed by provider
+    """
+    return {provider: pool.stats() for provider, pool in key_pools.items()}
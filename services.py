@@ -1,253 +1,784 @@
 # file: services.py
 import aiohttp
-import ssl
-import certifi
 import logging
 import asyncio
-import os
 import re
-from typing import List, Dict
-from datetime import datetime, timedelta
+import time
+from typing import List, Dict, Optional, Tuple, Union
+from datetime import datetime, timedelta, timezone
 from urllib.parse import urlparse
 
 from models import Article
-from config import Config, logger
-from utils import extract_title_from_content
+from config import (
+    Config,
+    EXTRACT_HEDGE_MODE,
+    EXTRACT_HEDGE_DELAY,
+    EXTRACT_HEDGE_PERCENTILE,
+    EXTRACT_HEDGE_MIN_DELAY,
+    EXTRACT_HEDGE_MAX_DELAY,
+    EXA_SEARCH_BATCH_SIZE,
+    EXA_SEARCH_MAX_RESULTS,
+    logger
+)
+from utils import extract_title_from_content, with_text_fields
 from ai_services import generate_summary_with_gemini
-from cache import get_cached_articles_for_domain, cache_articles_for_domain, get_cached_article_content, cache_article_content
+from cache import (
+    generate_cache_key,
+    article_fetch_window,
+    articles_cache_key,
+    articles_entry,
+    merge_articles_entry,
+    slice_articles,
+    get_cached_articles_entry,
+    get_cached_articles_entries,
+    get_cached_articles_for_domain,
+    get_cached_articles_for_domains,
+    cache_articles_for_domain,
+    cache_articles_for_domains,
+    get_cached_article_content,
+    cache_article_content
+)
+from singleflight import SingleFlight
+from latency import LatencyTracker
+from resilience import guards
+from scheduler import key_pools, scheduled_post
+from admission import AdmissionController, Overloaded, SharedPriorities, SharedPriority, PRIORITY_USER, extract_admission
+from metrics import FALLBACK_CONTENT
+from article_store import article_store
+from dedup import canonical_key, dedupe_results
+
+# Coalesces concurrent searches for the same domain and config
+domain_flight = SingleFlight("articles")
+
+# Coalesces concurrent extractions of the same URL
+extract_flight = SingleFlight("extract")
+# Admission priority of each in-flight extraction, raised when a more urgent caller joins
+_extract_priorities = SharedPriorities()
+
+# Rolling extraction latencies, used to pick the hedge delay
+extraction_latency = {
+    "tavily": LatencyTracker("tavily"),
+    "exa": LatencyTracker("exa")
+}
 
 class ArticleFetcher:
-    def __init__(self, api_key: str):
-        self.api_key = api_key
-        self.ssl_context = ssl.create_default_context(cafile=certifi.where())
+    def __init__(self, session: aiohttp.ClientSession):
+        self.session = session
 
-    async def fetch_for_domain(self, session: aiohttp.ClientSession, domain: str, config: dict) -> List[Dict]:
-        try:
-            # Check cache first
-            cached_articles = await get_cached_articles_for_domain(domain, config)
+    @property
+    def configured(self) -> bool:
+        """Whether any Exa API key is configured."""
+        return bool(key_pools["exa"])
+
+    async def fetch_for_domain(
+        self,
+        session: aiohttp.ClientSession,
+        domain: str,
+        config: dict,
+        refresh: bool = False
+    ) -> List[Dict]:
+        """
+        Get a domain's articles for a request, sliced from any cached list that covers it,
+        or from a new search.
+        """
+        # Check cache first, unless the caller wants to refresh it
+        if not refresh:
+            cached_articles = await get_cached_articles_for_domain(
+                domain,
+                config,
+                revalidate=lambda: self.search_domain(session, domain, config, refresh=True)
+            )
             if cached_articles:
                 logger.info(f"Using cached articles for {domain}")
                 return cached_articles
-                
-            # If not in cache, fetch from API
-            now = datetime.now()
-            start_date = now - timedelta(days=config['lookback_days'])
-
-            payload = {
-                'query': " ".join(Config.QUERY_TERMS),
-                'numResults': config['articles_per_domain'],
-                'startPublishedDate': start_date.isoformat(),
-                'endPublishedDate': now.isoformat(),
-                'includeDomains': [domain]
-            }
-
-            async with session.post(
-                    Config.API_URL,
-                    headers={'x-api-key': self.api_key, 'Content-Type': 'application/json'},
-                    json=payload
-            ) as response:
-                logger.info(f"API response status for {domain}: {response.status}")
-                data = await response.json()
-                results = data.get('results', [])
+
+        entry = await self.search_domain(session, domain, config, refresh)
+        return (slice_articles(entry, config) or []) if entry else []
+
+    async def search_domain(
+        self,
+        session: aiohttp.ClientSession,
+        domain: str,
+        config: dict,
+        refresh: bool = False
+    ) -> Optional[Dict]:
+        """
+        Search a domain with the request's window rounded up to the cache buckets.
+        Concurrent searches of the same window share a single call, whatever
+        their exact article count and lookback. The result is cached before the
+        call completes, so a worker waiting on it picks it up instead of searching again.
+
+        Returns:
+            Optional[Dict]: The articles entry (see cache.articles_entry), or None if the search failed
+        """
+        num_results, lookback_days = article_fetch_window(config)
+        requested_at = time.time()
+        return await domain_flight.do(
+            _flight_key(domain, config),
+            lambda: self._search_domain(session, domain, num_results, lookback_days, refresh, requested_at)
+        )
+
+    async def _search_domain(
+        self,
+        session: aiohttp.ClientSession,
+        domain: str,
+        num_results: int,
+        lookback_days: int,
+        refresh: bool,
+        requested_at: float
+    ) -> Optional[Dict]:
+        try:
+            # Fresh or stale, the cached list is either the answer or the base of an incremental refresh.
+            # A list cut short by a batched search records a smaller result count, so it is neither.
+            # It is read from the shared cache, which has what other workers just searched.
+            previous = await get_cached_articles_entry(domain, num_results, lookback_days, local=False)
+            # A search by another worker may have just been cached, e.g. while this one waited for its lock
+            if previous and (not refresh or previous.get("searched_at", 0) >= requested_at):
+                return previous
+
+            entry = await self._search_since_high_water(session, domain, previous) if previous else None
+            if entry is None:
+                now = datetime.now(timezone.utc)
+                raw_results = await self._exa_search(session, domain, num_results, now - timedelta(days=lookback_days), now)
+                results = dedupe_results(raw_results)
                 logger.info(f"Fetched {len(results)} articles from {domain}")
-                
-                # Cache the results
-                if results:
-                    await cache_articles_for_domain(domain, config, results)
-                    
-                return results
+                entry = articles_entry(results, num_results, lookback_days, complete=len(raw_results) < num_results)
+                if results and article_store:
+                    await article_store.save_articles(domain, results)
+
+            if entry["results"]:
+                await cache_articles_for_domain(domain, entry)
+
+            return entry
         except Exception as e:
             logger.error(f"Error fetching articles from {domain}: {str(e)}")
-            return []
+            return None
+
+    async def _search_since_high_water(
+        self,
+        session: aiohttp.ClientSession,
+        domain: str,
+        previous: Dict
+    ) -> Optional[Dict]:
+        """
+        Refresh a cached list by searching only for articles published since its
+        high-water mark, and merging them in.
+
+        Returns:
+            Optional[Dict]: The merged entry, or None if a full search is needed
+        """
+        now = datetime.now(timezone.utc)
+        high_water = previous.get("high_water")
+        if not high_water or datetime.fromisoformat(high_water) <= now - timedelta(days=previous["lookback_days"]):
+            return None
+
+        raw_results = await self._exa_search(session, domain, previous["num_results"], datetime.fromisoformat(high_water), now)
+        if len(raw_results) >= previous["num_results"]:
+            # The new articles alone fill a page, so some may be missing; search the whole window instead
+            logger.info(f"Incremental search for {domain} is saturated, running a full search")
+            return None
+
+        results = dedupe_results(raw_results)
+        logger.info(f"Fetched {len(results)} articles from {domain} published since {high_water}")
+        if results and article_store:
+            await article_store.save_articles(domain, results)
+        return merge_articles_entry(previous, results)
+
+    def _start_searches(self, domains: List[str], config: dict) -> Dict[str, asyncio.Future]:
+        """
+        Start full searches for several domains, batching them into shared
+        includeDomains queries. Each search caches its results before its flight completes.
+
+        Returns:
+            Dict[str, asyncio.Future]: Each domain's future articles entry
+        """
+        tasks = {}
+        for batch in self._batches(domains, config):
+            if len(batch) == 1:
+                tasks[batch[0]] = asyncio.ensure_future(
+                    self.search_domain(self.session, batch[0], config, refresh=True)
+                )
+                continue
+            requested_at = time.time()
+            batch_task = asyncio.ensure_future(self._search_batch(self.session, batch, config, requested_at))
+            for domain in batch:
+                # Registered under the domain's own key, so a search_domain for it joins the batch
+                tasks[domain] = asyncio.ensure_future(domain_flight.do(
+                    _flight_key(domain, config),
+                    lambda domain=domain: self._from_batch(batch_task, domain, config, requested_at)
+                ))
+        return tasks
+
+    @staticmethod
+    def _batches(domains: List[str], config: dict) -> List[List[str]]:
+        # Leave every domain in a batch room for twice its quota, so a few busy domains do not crowd out the rest
+        quota = max(config['articles_per_domain'], 1)
+        size = max(1, min(EXA_SEARCH_BATCH_SIZE, EXA_SEARCH_MAX_RESULTS // (2 * quota)))
+        return [domains[index:index + size] for index in range(0, len(domains), size)]
+
+    async def _search_batch(
+        self,
+        session: aiohttp.ClientSession,
+        domains: List[str],
+        config: dict,
+        requested_at: float
+    ) -> Dict[str, Dict]:
+        """
+        Search several domains in one query and split the results back out per domain.
+        Concurrent searches of the same batch share a single call, and the results
+        are cached in one round trip before it completes.
+
+        Returns:
+            Dict[str, Dict]: Articles entries for the domains that returned results, or for every domain if the batch was complete
+        """
+        num_results, lookback_days = article_fetch_window(config)
+        key = generate_cache_key("articles_batch", sorted(domains), num_results, lookback_days)
+        try:
+            return await domain_flight.do(key, lambda: self._run_batch(session, domains, num_results, lookback_days, config, requested_at))
+        except Exception as e:
+            logger.error(f"Error fetching articles from {', '.join(domains)}: {str(e)}")
+            return {}
+
+    async def _run_batch(
+        self,
+        session: aiohttp.ClientSession,
+        domains: List[str],
+        num_results: int,
+        lookback_days: int,
+        config: dict,
+        requested_at: float
+    ) -> Dict[str, Dict]:
+        # Lists another worker searched while this batch waited for its lock are reused, even if cut
+        # short: they are what this search would return, and _from_batch follows up on short ones
+        recent = {
+            domain: entry
+            for domain, entry in (await get_cached_articles_entries(domains, 0, lookback_days, local=False)).items()
+            if entry.get("searched_at", 0) >= requested_at
+        }
+        domains = [domain for domain in domains if domain not in recent]
+        if not domains:
+            return recent
+
+        requested = min(EXA_SEARCH_MAX_RESULTS, 2 * config['articles_per_domain'] * len(domains))
+        now = datetime.now(timezone.utc)
+        raw_results = await self._exa_search(session, domains, requested, now - timedelta(days=lookback_days), now)
+        # If the query returned fewer than asked for, every domain got all of its articles
+        batch_complete = len(raw_results) < requested
+
+        by_domain: Dict[str, List[Dict]] = {domain: [] for domain in domains}
+        for result in dedupe_results(raw_results):
+            domain = _matching_domain(result.get('url', ''), domains)
+            if domain:
+                by_domain[domain].append(result)
+        logger.info(
+            f"Fetched {len(raw_results)} articles for {len(domains)} domains in one search: "
+            + ", ".join(f"{domain}={len(results)}" for domain, results in by_domain.items())
+        )
+
+        entries = {}
+        for domain, results in by_domain.items():
+            if not results:
+                # A complete batch proves the domain has nothing in the window; otherwise it needs a follow-up
+                if batch_complete:
+                    entries[domain] = articles_entry([], num_results, lookback_days, complete=True)
+                continue
+            if article_store:
+                await article_store.save_articles(domain, results)
+            # Each domain keeps at most its own result count, whatever the others returned.
+            # A cut-off batch only vouches for the results it holds, not for a full search of the domain.
+            complete = batch_complete and len(results) <= num_results
+            results = results[:num_results]
+            entries[domain] = articles_entry(
+                results,
+                num_results if complete else len(results),
+                lookback_days,
+                complete=complete
+            )
+        await cache_articles_for_domains({domain: entry for domain, entry in entries.items() if entry["results"]})
+        return {**recent, **entries}
+
+    async def _from_batch(
+        self,
+        batch_task: asyncio.Future,
+        domain: str,
+        config: dict,
+        requested_at: float
+    ) -> Optional[Dict]:
+        entry = (await asyncio.shield(batch_task)).get(domain)
+        if entry and slice_articles(entry, config) is not None:
+            return entry
+        # The batch did not fill this domain's quota; follow up with a search of the domain alone.
+        # This already runs under the domain's flight key, so it searches directly.
+        logger.info(f"Batched search left {domain} short, searching it on its own")
+        num_results, lookback_days = article_fetch_window(config)
+        return await self._search_domain(self.session, domain, num_results, lookback_days, refresh=True, requested_at=requested_at)
+
+    async def _exa_search(
+        self,
+        session: aiohttp.ClientSession,
+        domains: Union[str, List[str]],
+        num_results: int,
+        start: datetime,
+        end: datetime
+    ) -> List[Dict]:
+        domains = [domains] if isinstance(domains, str) else domains
+        domain = ", ".join(domains)
+        payload = {
+            'query': " ".join(Config.QUERY_TERMS),
+            'numResults': num_results,
+            'startPublishedDate': start.isoformat(),
+            'endPublishedDate': end.isoformat(),
+            'includeDomains': domains
+        }
+
+        async with scheduled_post(
+                "exa",
+                guards["exa_search"],
+                session,
+                Config.API_URL,
+                headers=lambda api_key: {'x-api-key': api_key, 'Content-Type': 'application/json'},
+                json=payload
+        ) as response:
+            logger.info(f"API response status for {domain}: {response.status}")
+            data = await response.json()
+            return data.get('results', [])
 
     async def fetch_all(self, config: dict) -> List[Article]:
-        if not self.api_key:
+        articles, _ = await self.fetch_until(config)
+        return articles
+
+    async def fetch_until(
+        self,
+        config: dict,
+        deadline: Optional[float] = None,
+        admission: Optional[AdmissionController] = None
+    ) -> Tuple[List[Article], List[str]]:
+        """
+        Fetch articles for every configured domain, waiting at most `deadline` seconds.
+        Domains that have not answered by then keep fetching in the background and
+        are cached when they finish, so a follow-up request for them is cheap.
+
+        With an admission controller, new searches run only once admitted. If the
+        request is shed, uncached domains are served from the article store instead.
+
+        Returns:
+            Tuple[List[Article], List[str]]: The articles available by the deadline, and the domains still pending
+
+        Raises:
+            Overloaded: If the request is shed and there are no cached or stored articles to serve
+        """
+        if not self.configured:
             logger.warning("EXA_API_KEY not found")
-            return []
+            return [], []
 
         try:
-            async with aiohttp.ClientSession(
-                    connector=aiohttp.TCPConnector(ssl=self.ssl_context)
-            ) as session:
-                tasks = [self.fetch_for_domain(session, domain, config) for domain in config['domains']]
-                results = await asyncio.gather(*tasks, return_exceptions=True)
-
-                articles = []
-                for domain_results in results:
-                    if isinstance(domain_results, Exception):
-                        logger.error(f"Task failed with exception: {domain_results}")
-                        continue
-                    for article in domain_results:
-                        try:
-                            articles.append(Article(**article))
-                        except Exception as e:
-                            logger.warning(f"Article validation failed: {str(e)}")
-                            articles.append(Article(url=article.get('url', '#')))
-                return articles
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            domains = config['domains']
+
+            # Check every domain's cache entry in a single round trip
+            cached = await get_cached_articles_for_domains(
+                domains,
+                config,
+                revalidate=lambda domain: self.search_domain(self.session, domain, config, refresh=True)
+            )
+            missing = [domain for domain in dict.fromkeys(domains) if not cached.get(domain)]
+
+            tasks = {}
+            if missing and admission:
+                try:
+                    await admission.acquire()
+                except Overloaded:
+                    stored = await self._stored_results(missing, config)
+                    if not stored and not any(cached.get(domain) for domain in domains):
+                        raise
+                    cached.update(stored)
+                    missing = []
+                else:
+                    tasks = self._admitted_searches(admission, missing, config)
+            elif missing:
+                tasks = self._start_searches(missing, config)
+            if tasks:
+                timeout = None if deadline is None else max(deadline - (loop.time() - started), 0)
+                await asyncio.wait(tasks.values(), timeout=timeout)
+
+            fetched = {domain: _task_result(task) for domain, task in tasks.items() if task.done()}
+            late = {domain: task for domain, task in tasks.items() if not task.done()}
+            if late:
+                logger.info(f"Deadline reached, still waiting on: {', '.join(late)}")
+                # The searches cache their own results; keep them referenced until they finish
+                _spawn(asyncio.wait(late.values()))
+
+            # The same story can come back from several domains; keep the first copy
+            results = []
+            for domain in domains:
+                if domain in late:
+                    continue
+                if cached.get(domain):
+                    results.extend(cached[domain])
+                elif fetched.get(domain):
+                    results.extend(slice_articles(fetched[domain], config) or [])
+            return self.to_articles(dedupe_results(results)), [domain for domain in dict.fromkeys(domains) if domain in late]
+        except Overloaded:
+            raise
         except Exception as e:
             logger.error(f"Critical error in fetch_all: {str(e)}")
-            return []
+            return [], []
+
+    def _admitted_searches(
+        self,
+        admission: AdmissionController,
+        domains: List[str],
+        config: dict
+    ) -> Dict[str, asyncio.Future]:
+        # The admission slot is held until every search finishes, including those that outlive the deadline
+        started = time.monotonic()
+        try:
+            tasks = self._start_searches(domains, config)
+        except BaseException:
+            admission.release()
+            raise
+        asyncio.gather(*tasks.values(), return_exceptions=True).add_done_callback(
+            lambda _: admission.release(time.monotonic() - started)
+        )
+        return tasks
+
+    async def _stored_results(self, domains: List[str], config: dict) -> Dict[str, List[Dict]]:
+        # Articles kept by the article store from earlier searches, served when new searches are shed
+        if not article_store:
+            return {}
+        since = (datetime.now(timezone.utc) - timedelta(days=config['lookback_days'])).date().isoformat()
+        stored = {}
+        for domain in domains:
+            try:
+                rows = await article_store.search(domains=[domain], since=since, limit=config['articles_per_domain'])
+            except Exception as e:
+                logger.error(f"Error reading stored articles for {domain}: {str(e)}")
+                continue
+            if rows:
+                stored[domain] = [
+                    {"url": row["url"], "title": row["title"] or row["url"], "publishedDate": row["published_date"] or "未知"}
+                    for row in rows
+                ]
+        if stored:
+            logger.info(f"Serving stored articles for {', '.join(stored)} while new searches are shed")
+        return stored
+
+    @staticmethod
+    def to_articles(results: List[Dict]) -> List[Article]:
+        articles = []
+        for article in results:
+            try:
+                articles.append(Article(**article))
+            except Exception as e:
+                logger.warning(f"Article validation failed: {str(e)}")
+                articles.append(Article(url=article.get('url', '#')))
+        return articles
+
+
+def _flight_key(domain: str, config: dict) -> str:
+    # Searches of the same domain and bucketed window share a flight, whatever their exact count and lookback
+    num_results, lookback_days = article_fetch_window(config)
+    return f"{articles_cache_key(domain, lookback_days)}:{num_results}"
+
+
+def _matching_domain(url: str, domains: List[str]) -> Optional[str]:
+    # The configured domain a URL belongs to, including its subdomains (m.36kr.com is 36kr.com)
+    host = (urlparse(url).hostname or "").lower()
+    for domain in domains:
+        bare = domain.lower().removeprefix("www.")
+        if host == bare or host.endswith("." + bare):
+            return domain
+    return None
+
+
+# Keeps background tasks referenced until they finish
+_background_tasks = set()
+
+def _spawn(coro) -> None:
+    task = asyncio.ensure_future(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
 
 
-async def try_tavily_extraction(url, domain):
+async def try_tavily_extraction(session: aiohttp.ClientSession, url, domain):
     """
     Try to extract content using Tavily API
     """
-    # Check cache first
-    cached_content = await get_cached_article_content(url)
-    if cached_content and cached_content.get("source") == "tavily":
-        logger.info(f"Using cached Tavily content for {url}")
-        return cached_content
-        
-    tavily_api_key = os.getenv('TAVILY_API_KEY', '')
-        
     # If no API key, skip Tavily
-    if not tavily_api_key:
+    if not key_pools["tavily"]:
         logger.warning("TAVILY_API_KEY not found, skipping Tavily extraction")
         return None
     
     try:
-        ssl_context = ssl.create_default_context(cafile=certifi.where())
-        async with aiohttp.ClientSession(
-                connector=aiohttp.TCPConnector(ssl=ssl_context)
-        ) as session:
-            async with session.post(
-                Config.TAVILY_API_URL,
-                json={"urls": url, "include_images": False, "extract_depth": "advanced"},
-                headers={"Authorization": f"Bearer {tavily_api_key}", "Content-Type": "application/json"}
-            ) as response:
-                logger.info(f"Tavily API response status: {response.status}")
+        async with scheduled_post(
+            "tavily",
+            guards["tavily"],
+            session,
+            Config.TAVILY_API_URL,
+            json={"urls": url, "include_images": False, "extract_depth": "advanced"},
+            headers=lambda api_key: {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+        ) as response:
+            logger.info(f"Tavily API response status: {response.status}")
+            
+            if response.status != 200:
+                error_text = await response.text()
+                logger.error(f"Tavily API error: {error_text}")
+                return None
+            
+            data = await response.json()
+            
+            # Handle the response format according to the API documentation
+            if "results" in data and len(data["results"]) > 0:
+                result = data["results"][0]
+                content = result.get("raw_content", "")
                 
-                if response.status != 200:
-                    error_text = await response.text()
-                    logger.error(f"Tavily API error: {error_text}")
+                # If no content was extracted or it's too short, return None
+                if not content or len(content) < 100:
+                    logger.warning(f"Insufficient content extracted from {url} using Tavily")
                     return None
                 
-                data = await response.json()
+                # Try to extract a title from the content
+                title = extract_title_from_content(content) or f"Article from {domain}"
                 
-                # Handle the response format according to the API documentation
-                if "results" in data and len(data["results"]) > 0:
-                    result = data["results"][0]
-                    content = result.get("raw_content", "")
-                    
-                    # If no content was extracted or it's too short, return None
-                    if not content or len(content) < 100:
-                        logger.warning(f"Insufficient content extracted from {url} using Tavily")
-                        return None
-                    
-                    # Try to extract a title from the content
-                    title = extract_title_from_content(content) or f"Article from {domain}"
-                    
-                    tavily_result = {
-                        "title": title,
-                        "content": content,
-                        "url": result.get("url", url),
-                        "source": "tavily"
-                    }
-                    
-                    # Cache the result
-                    await cache_article_content(url, tavily_result)
-                    
-                    return tavily_result
+                tavily_result = with_text_fields({
+                    "title": title,
+                    "content": content,
+                    "url": result.get("url", url),
+                    "source": "tavily"
+                })
                 
-                logger.warning(f"No results found for {url} using Tavily")
-                return None
+                # Cache the result
+                await cache_article_content(url, tavily_result)
                 
+                return tavily_result
+            
+            logger.warning(f"No results found for {url} using Tavily")
+            return None
+            
     except Exception as e:
         logger.error(f"Error extracting content with Tavily: {str(e)}")
         return None
 
 
-async def try_exa_extraction(url, domain):
+async def try_exa_extraction(session: aiohttp.ClientSession, url, domain):
     """
     Try to extract content using Exa API
     """
-    # Check cache first
-    cached_content = await get_cached_article_content(url)
-    if cached_content and cached_content.get("source") == "exa":
-        logger.info(f"Using cached Exa content for {url}")
-        return cached_content
-        
-    exa_api_key = os.getenv('EXA_API_KEY', '')
-    
     # If no API key, skip Exa
-    if not exa_api_key:
+    if not key_pools["exa"]:
         logger.warning("EXA_API_KEY not found, skipping Exa extraction")
         return None
     
     try:
-        ssl_context = ssl.create_default_context(cafile=certifi.where())
-        async with aiohttp.ClientSession(
-                connector=aiohttp.TCPConnector(ssl=ssl_context)
-        ) as session:
-            async with session.post(
-                "https://api.exa.ai/contents",
-                json={
-                    "urls": [url],
-                    "text": True,
-                    "summary": {"enabled": True},
-                    "livecrawl": "always",
-                    "livecrawlTimeout": 10000  # Maximum allowed by Exa API
-                },
-                headers={"Authorization": f"Bearer {exa_api_key}", "Content-Type": "application/json"}
-            ) as response:
-                logger.info(f"Exa API response status: {response.status}")
+        async with scheduled_post(
+            "exa",
+            guards["exa_contents"],
+            session,
+            Config.EXA_CONTENTS_URL,
+            json={
+                "urls": [url],
+                "text": True,
+                "summary": {"enabled": True},
+                "livecrawl": "always",
+                "livecrawlTimeout": 10000  # Maximum allowed by Exa API
+            },
+            headers=lambda api_key: {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+        ) as response:
+            logger.info(f"Exa API response status: {response.status}")
+            
+            if response.status != 200:
+                error_text = await response.text()
+                logger.error(f"Exa API error: {error_text}")
+                return None
+            
+            data = await response.json()
+            
+            if "results" in data and len(data["results"]) > 0:
+                result = data["results"][0]
+                content = result.get("text", "")
+                summary = result.get("summary", "")
+                title = result.get("title", f"Article from {domain}")
                 
-                if response.status != 200:
-                    error_text = await response.text()
-                    logger.error(f"Exa API error: {error_text}")
+                # If no content was extracted or it's too short, return None
+                if not content or len(content) < 100:
+                    logger.warning(f"Insufficient content extracted from {url} using Exa")
                     return None
                 
-                data = await response.json()
+                # Format the content nicely
+                # Process the content to replace newlines with <br> tags before using in f-string
+                processed_content = content.replace('\n', '<br>')
+                summary_html = f"<div class='summary-box'><h3>Summary</h3><p>{summary}</p></div>" if summary else ""
                 
-                if "results" in data and len(data["results"]) > 0:
-                    result = data["results"][0]
-                    content = result.get("text", "")
-                    summary = result.get("summary", "")
-                    title = result.get("title", f"Article from {domain}")
+                formatted_content = f"""
+                <div class="exa-content">
+                    <h1>{title}</h1>
                     
-                    # If no content was extracted or it's too short, return None
-                    if not content or len(content) < 100:
-                        logger.warning(f"Insufficient content extracted from {url} using Exa")
-                        return None
+                    {summary_html}
                     
-                    # Format the content nicely
-                    # Process the content to replace newlines with <br> tags before using in f-string
-                    processed_content = content.replace('\n', '<br>')
-                    summary_html = f"<div class='summary-box'><h3>Summary</h3><p>{summary}</p></div>" if summary else ""
-                    
-                    formatted_content = f"""
-                    <div class="exa-content">
-                        <h1>{title}</h1>
-                        
-                        {summary_html}
-                        
-                        <div class="article-content">
-                            {processed_content}
-                        </div>
+                    <div class="article-content">
+                        {processed_content}
                     </div>
-                    """
-                    
-                    exa_result = {
-                        "title": title,
-                        "content": formatted_content,
-                        "url": url,
-                        "source": "exa"
-                    }
-                    
-                    # Cache the result
-                    await cache_article_content(url, exa_result)
-                    
-                    return exa_result
+                </div>
+                """
                 
-                logger.warning(f"No results found for {url} using Exa")
-                return None
+                # Keep the text Exa returned, so summaries never parse the markup above
+                exa_result = with_text_fields({
+                    "title": title,
+                    "content": formatted_content,
+                    "url": url,
+                    "source": "exa"
+                }, text=content)
                 
+                # Cache the result
+                await cache_article_content(url, exa_result)
+                
+                return exa_result
+            
+            logger.warning(f"No results found for {url} using Exa")
+            return None
+            
     except Exception as e:
         logger.error(f"Error extracting content with Exa: {str(e)}")
         return None
 
 
+def is_acceptable_extraction(result: Optional[Dict]) -> bool:
+    """
+    Check whether an extraction result is good enough to return to the user
+    """
+    return bool(
+        result
+        and not result.get("is_fallback")
+        and len(result.get("content", "")) >= 100
+    )
+
+
+def get_hedge_delay() -> float:
+    """
+    Get how long to wait for Tavily before also starting Exa.
+    Uses the configured percentile of recent Tavily latencies once enough samples exist.
+    """
+    if EXTRACT_HEDGE_MODE == "immediate":
+        return 0.0
+    observed = extraction_latency["tavily"].percentile(EXTRACT_HEDGE_PERCENTILE)
+    if observed is None:
+        return EXTRACT_HEDGE_DELAY
+    return min(max(observed, EXTRACT_HEDGE_MIN_DELAY), EXTRACT_HEDGE_MAX_DELAY)
+
+
+async def _timed_extraction(provider, extraction):
+    start = time.monotonic()
+    result = await extraction
+    if is_acceptable_extraction(result):
+        extraction_latency[provider].record(time.monotonic() - start)
+    return result
+
+
+def _task_result(task):
+    if task.cancelled() or task.exception():
+        if not task.cancelled():
+            logger.error(f"Task failed with exception: {task.exception()}")
+        return None
+    return task.result()
+
+
+async def hedged_extraction(session: aiohttp.ClientSession, url, domain):
+    """
+    Extract content with Tavily, starting Exa as a hedge if Tavily is slow or fails.
+    The first acceptable result wins and the other request is cancelled.
+    With EXTRACT_HEDGE_MODE=off the providers are tried strictly one after the other.
+    """
+    if EXTRACT_HEDGE_MODE == "off":
+        tavily_result = await _timed_extraction("tavily", try_tavily_extraction(session, url, domain))
+        if is_acceptable_extraction(tavily_result):
+            return tavily_result
+        exa_result = await _timed_extraction("exa", try_exa_extraction(session, url, domain))
+        return exa_result if is_acceptable_extraction(exa_result) else None
+
+    tavily_task = asyncio.ensure_future(_timed_extraction("tavily", try_tavily_extraction(session, url, domain)))
+    exa_task = None
+    try:
+        # Give Tavily a head start; it is skipped if Tavily finishes (or fails) first
+        done, _ = await asyncio.wait({tavily_task}, timeout=get_hedge_delay())
+        if done:
+            result = _task_result(tavily_task)
+            if is_acceptable_extraction(result):
+                return result
+        else:
+            logger.info(f"Tavily slower than hedge delay for {url}, starting Exa in parallel")
+
+        exa_task = asyncio.ensure_future(_timed_extraction("exa", try_exa_extraction(session, url, domain)))
+        pending = {task for task in (tavily_task, exa_task) if not task.done()}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result = _task_result(task)
+                if is_acceptable_extraction(result):
+                    return result
+        return None
+    finally:
+        for task in (tavily_task, exa_task):
+            if task and not task.done():
+                task.cancel()
+
+
+async def extract_article(session, url: str, priority: int = PRIORITY_USER):
+    """
+    Get the extracted content for a URL, without a summary.
+    Concurrent calls for the same URL, or for copies of it that only differ by
+    host alias or tracking parameters, share a single extraction.
+    Cached content is returned right away; a new extraction waits for admission
+    and raises Overloaded if it is shed. A user request that joins a background
+    extraction raises its admission priority, so it never waits behind prefetch work.
+    """
+    key = generate_cache_key("content", canonical_key(url))
+    shared = _extract_priorities.join(key, priority)
+    extracted = await extract_flight.do(key, lambda: _shared_extraction(session, url, key, shared))
+    # Also covers joining a flight that was already finishing, after it dropped its priority
+    _extract_priorities.forget(key, shared)
+    return extracted
+
+
+async def _shared_extraction(session, url: str, key: str, priority: SharedPriority):
+    try:
+        return await _extract_article(session, url, priority)
+    finally:
+        _extract_priorities.forget(key, priority)
+
+
+async def _extract_and_store(session, url: str, domain: str):
+    # Extract fresh content and keep the body in the article store
+    extracted = await hedged_extraction(session, url, domain)
+    if extracted and article_store:
+        # Under the URL the article was listed and linked with, so the body lands on its row
+        await article_store.save_content(url, extracted)
+    return extracted
+
+
+async def _extract_article(session, url: str, priority: SharedPriority):
+    # Extract domain from URL for domain-specific handling
+    domain = urlparse(url).netloc
+    
+    # Check cache first for any content from this URL; stale content is refreshed in the background
+    cached_content = await get_cached_article_content(url, revalidate=lambda: _extract_and_store(session, url, domain))
+    if cached_content:
+        logger.info(f"Using cached content for {url}")
+        return cached_content
+    
+    # Try Tavily API first (better for article extraction), hedging with Exa API if it is slow or fails
+    async with extract_admission.slot(priority):
+        extracted = await _extract_and_store(session, url, domain)
+    if extracted:
+        return extracted
+    
+    # If both APIs failed, use our fallback content
+    logger.warning(f"Both Tavily and Exa APIs failed for {url}, using fallback content")
+    FALLBACK_CONTENT.inc()
+    fallback_content = generate_fallback_content(url, domain)
+    return fallback_content
+
+
 def generate_fallback_content(url, domain):
     """
     Generate fallback content for URLs that can't be extracted
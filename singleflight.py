@@ -0,0 +1,141 @@
+"""
+Single-Flight Module
+
+This module coalesces concurrent identical requests so they share a single
+upstream call. Within a worker, callers with the same key await one shared task.
+With SINGLEFLIGHT_REDIS_LOCK enabled, a lock in the shared cache backend extends
+this across workers:
+only the lock holder runs the call, the others wait for the lock to be released
+and then run it themselves, which normally resolves from the cache.
+"""
+
+import asyncio
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from config import (
+    SINGLEFLIGHT_REDIS_LOCK,
+    SINGLEFLIGHT_LOCK_TTL,
+    SINGLEFLIGHT_WAIT_TIMEOUT,
+    SINGLEFLIGHT_POLL_INTERVAL,
+    logger
+)
+from scheduler import SharedBudget, call_budget, join_call_budget, share_call_budget
+import cache
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one execution.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._budgets: Dict[str, Optional[SharedBudget]] = {}
+
+    def in_flight(self) -> int:
+        """
+        Get the number of keys currently being executed.
+
+        Returns:
+            int: The number of in-flight keys
+        """
+        return len(self._tasks)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn once for all concurrent callers with the same key.
+
+        The shared task is shielded, so a cancelled caller (e.g. a client
+        disconnect) does not cancel the work other callers are waiting on.
+        It is charged to the first caller's call budget, if any, until a caller
+        without one joins.
+
+        Args:
+            key (str): The coalescing key
+            fn (Callable[[], Awaitable[Any]]): Zero-argument coroutine factory
+
+        Returns:
+            Any: The result of fn, shared by all callers
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            budget = share_call_budget()
+            task = asyncio.ensure_future(self._run(key, fn, budget))
+            self._tasks[key] = task
+            self._budgets[key] = budget
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            logger.info(f"Joining in-flight {self.name} request for key: {key}")
+            join_call_budget(self._budgets.get(key))
+        return await asyncio.shield(task)
+
+    async def _run(self, key: str, fn: Callable[[], Awaitable[Any]], budget: Optional[SharedBudget]) -> Any:
+        # The task has its own copy of the context, so this only affects the shared work
+        call_budget.set(budget)
+        return await self.exclusive(key, fn)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+            self._budgets.pop(key, None)
+        # Mark the exception as retrieved in case every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    async def exclusive(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn under the key's cross-worker lock, without coalescing callers in this worker.
+        For work shared some other way, such as a broadcast stream. A worker that
+        finds the lock held waits for its release and then runs fn, which should
+        check the cache first.
+
+        Args:
+            key (str): The coalescing key
+            fn (Callable[[], Awaitable[Any]]): Zero-argument coroutine factory
+
+        Returns:
+            Any: The result of fn
+        """
+        if not SINGLEFLIGHT_REDIS_LOCK or not cache.backend:
+            return await fn()
+
+        lock_key = f"lock:{self.name}:{key}"
+        token = uuid.uuid4().hex
+        if await self._acquire(lock_key, token):
+            try:
+                return await fn()
+            finally:
+                await self._release(lock_key, token)
+
+        logger.info(f"Waiting for {self.name} lock held by another worker: {lock_key}")
+        await self._wait_for_release(lock_key)
+        return await fn()
+
+    async def _acquire(self, lock_key: str, token: str) -> bool:
+        try:
+            return await cache.backend.set_if_absent(lock_key, token, SINGLEFLIGHT_LOCK_TTL)
+        except Exception as e:
+            # Fail open: without the lock we just lose cross-worker coalescing
+            logger.error(f"Error acquiring lock {lock_key}: {str(e)}")
+            return True
+
+    async def _release(self, lock_key: str, token: str) -> None:
+        try:
+            # Delete the lock only if it is still held by us
+            await cache.backend.delete_if_equals(lock_key, token)
+        except Exception as e:
+            logger.error(f"Error releasing lock {lock_key}: {str(e)}")
+
+    async def _wait_for_release(self, lock_key: str) -> None:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + SINGLEFLIGHT_WAIT_TIMEOUT
+        while loop.time() < deadline:
+            try:
+                if not await cache.backend.exists(lock_key):
+                    return
+            except Exception as e:
+                logger.error(f"Error checking lock {lock_key}: {str(e)}")
+                return
+            await asyncio.sleep(SINGLEFLIGHT_POLL_INTERVAL)
+        logger.warning(f"Timed out waiting for lock {lock_key}")
@@ -65,54 +65,64 @@ const initializeContentUI = (elements, url) => {
     updateLoadingState(elements, 5, 'Preparing to extract content...');
 };
 
+// Identifies the latest preview request, so a stream for a previously opened article stops rendering
+let activeRequestId = 0;
+
 /**
- * Fetches the article content from the backend
+ * Streams the article content from the backend as newline-delimited JSON events
  * @param {string} url - The article URL
- * @returns {Promise<Object>} - The article data
+ * @param {Object} elements - DOM elements for loading UI
+ * @param {Function} isCurrent - Returns false once a newer request has started
+ * @param {Object} handlers - Callbacks keyed by event type (content, summary, done)
+ * @returns {Promise<void>}
  */
-const fetchContent = async (url, elements) => {
+const streamContent = async (url, elements, isCurrent, handlers) => {
     updateLoadingState(elements, 10, 'Sending request to server...');
     
-    const response = await fetch(`/extract?url=${encodeURIComponent(url)}`);
+    const response = await fetch(`/extract/stream?url=${encodeURIComponent(url)}`);
     
+    if (response.status === 503) {
+        const retryAfter = response.headers.get('Retry-After') || 'a few';
+        throw new Error(`The server is busy. Please try again in ${retryAfter} seconds.`);
+    }
     if (!response.ok) {
         throw new Error(`Failed to fetch content: ${response.status}`);
     }
     
     updateLoadingState(elements, 30, 'Processing content...', 'fa-cogs', 'fa-spin');
     
-    const data = await response.json();
-    
-    if (data.error) {
-        throw new Error(data.error);
-    }
-    
-    // Calculate content size to help with progress updates
-    const contentSize = data.content ? data.content.length : 0;
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
     
-    // Update progress based on content size
-    const progressValue = 40 + Math.min(20, Math.floor(contentSize / 1000));
-    updateLoadingState(elements, progressValue, 'Content extracted successfully!', 'fa-check', '');
+    const dispatch = (line) => {
+        if (!line.trim()) {
+            return;
+        }
+        const event = JSON.parse(line);
+        const handler = handlers[event.type];
+        if (handler) {
+            handler(event);
+        }
+    };
     
-    return data;
-};
-
-/**
- * Processes Chinese summary if available
- * @param {Object} data - The article data
- * @param {Object} elements - DOM elements
- */
-const processChineseSummary = async (data, elements) => {
-    if (data.chinese_summary) {
-        updateLoadingState(elements, 70, 'Processing Chinese summary...', 'fa-language', 'fa-beat');
-        
-        // Simulate processing time based on summary length
-        const summaryLength = data.chinese_summary.length;
-        const processingTime = Math.min(500, summaryLength / 10);
-        await new Promise(resolve => setTimeout(resolve, processingTime));
+    while (true) {
+        const { value, done } = await reader.read();
+        if (!isCurrent()) {
+            reader.cancel();
+            return;
+        }
+        if (done) {
+            break;
+        }
+        buffer += decoder.decode(value, { stream: true });
         
-        updateLoadingState(elements, 85, 'Chinese summary ready!', 'fa-check-circle', '');
+        // Dispatch every complete line, keep the partial tail for the next chunk
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        lines.forEach(dispatch);
     }
+    dispatch(buffer + decoder.decode());
 };
 
 /**
@@ -163,32 +173,11 @@ const displayContent = (data, elements) => {
     
     // Add content
     if (data.content) {
-        // Check if we have a Chinese summary available
-        if (data.chinese_summary) {
-            // Format the Chinese summary for better display
-            let formattedSummary = formatChineseSummary(data.chinese_summary);
-            
-            // Store the raw summary for clipboard copying (strip HTML tags)
-            const rawSummary = data.chinese_summary.replace(/```text\s?/g, '').replace(/```/g, '');
-            
-            // Get article title for display
-            const articleTitle = data.title || 'Untitled Article';
-            
+        // Check if we have a Chinese summary available (or one is still streaming in)
+        if (data.chinese_summary || data.summaryPending) {
             formattedContent += `
                 ${sourceLabel}
-                
-                <div class="chinese-summary-container mb-4">
-                    <div class="summary-header">
-                        <h3><i class="fa-solid fa-language me-2"></i>中文摘要</h3>
-                        <div class="summary-divider"></div>
-                    </div>
-                    <div class="chinese-summary">${formattedSummary}</div>
-                    <div class="summary-actions">
-                        <button class="copy-summary-btn" data-summary="${encodeURIComponent(rawSummary)}">
-                            <i class="fa-solid fa-copy"></i> 复制摘要
-                        </button>
-                    </div>
-                </div>
+                ${getSummarySection(data.chinese_summary || '', data.summaryPending)}
                 <div class="content-divider mb-4"></div>
                 ${getOriginalContentSection(data.content)}
             `;
@@ -226,7 +215,52 @@ const setupEventListeners = (extractedContent) => {
 };
 
 /**
- * Fetches article content using the backend API
+ * Updates the summary section while the summary streams in
+ * @param {HTMLElement} extractedContent - The content container
+ * @param {string} summary - The summary text received so far
+ */
+const updateSummary = (extractedContent, summary) => {
+    const summaryElement = extractedContent.querySelector('.chinese-summary');
+    if (summaryElement) {
+        summaryElement.innerHTML = formatChineseSummary(summary);
+    }
+};
+
+/**
+ * Finalizes the summary section once the summary is complete
+ * @param {HTMLElement} extractedContent - The content container
+ * @param {string|null} summary - The complete summary, or null if none was generated
+ * @param {string} [status] - "pending" when the server was too busy to summarize
+ */
+const finalizeSummary = (extractedContent, summary, status) => {
+    const container = extractedContent.querySelector('.chinese-summary-container');
+    if (!container) {
+        return;
+    }
+    
+    if (!summary && status === 'pending') {
+        // The server is busy; tell the reader instead of silently dropping the summary
+        container.querySelector('.chinese-summary').innerHTML =
+            '<p class="summary-pending"><i class="fa-solid fa-hourglass-half me-2"></i>摘要生成繁忙，请稍后重新打开本文。</p>';
+        return;
+    }
+    
+    if (!summary) {
+        // No summary available; drop the placeholder and its divider
+        const divider = container.nextElementSibling;
+        if (divider && divider.classList.contains('content-divider')) {
+            divider.remove();
+        }
+        container.remove();
+        return;
+    }
+    
+    container.outerHTML = getSummarySection(summary, false);
+};
+
+/**
+ * Fetches article content using the backend API, rendering the article as soon
+ * as it is extracted and the Chinese summary as it is generated
  * @param {string} url - The URL of the article to fetch
  * @param {Object} elements - DOM elements needed for content display
  */
@@ -238,46 +272,86 @@ export const fetchArticleContent = async (url, elements) => {
         errorMessage
     } = elements;
     
+    const requestId = ++activeRequestId;
+    const isCurrent = () => requestId === activeRequestId;
+    let contentDisplayed = false;
+    let summaryText = '';
+    
     try {
         // Initialize UI
         initializeContentUI(elements, url);
         
-        // Fetch content
-        const data = await fetchContent(url, elements);
-        
-        // Process Chinese summary if available
-        await processChineseSummary(data, elements);
-        
-        // Final loading state
-        updateLoadingState(elements, 95, 'Preparing display...', 'fa-check-circle', '');
-        
-        // Add a small delay to show the completion state before displaying content
-        await new Promise(resolve => setTimeout(resolve, 500));
-        
-        // Update to 100% complete
-        updateLoadingState(elements, 100, 'Ready to display!', 'fa-check-circle', '');
-        
-        // Add a small delay to show the completion state
-        await new Promise(resolve => setTimeout(resolve, 300));
-        
-        // Hide loading and show content
-        contentLoading.classList.add('d-none');
-        extractedContent.classList.remove('d-none');
-        
-        // Format and display the content
-        displayContent(data, elements);
-        
-        // Set up event listeners
-        setupEventListeners(extractedContent);
+        await streamContent(url, elements, isCurrent, {
+            content: (data) => {
+                updateLoadingState(elements, 100, 'Content extracted successfully!', 'fa-check', '');
+                
+                // Hide loading and show content
+                contentLoading.classList.add('d-none');
+                extractedContent.classList.remove('d-none');
+                
+                // Format and display the content, with a placeholder for the summary
+                displayContent({ ...data, summaryPending: !data.is_fallback }, elements);
+                contentDisplayed = true;
+            },
+            summary: (event) => {
+                summaryText += event.text;
+                updateSummary(extractedContent, summaryText);
+            },
+            done: (event) => {
+                finalizeSummary(extractedContent, event.chinese_summary, event.summary_status);
+                
+                // Set up event listeners
+                setupEventListeners(extractedContent);
+            }
+        });
         
     } catch (error) {
         console.error('Error fetching article content:', error);
+        if (!isCurrent()) {
+            return;
+        }
+        if (contentDisplayed) {
+            // The article is already on screen; only the summary failed
+            finalizeSummary(extractedContent, summaryText || null);
+            setupEventListeners(extractedContent);
+            return;
+        }
         contentLoading.classList.add('d-none');
         contentError.classList.remove('d-none');
         errorMessage.textContent = error.message || 'Failed to load content';
     }
 };
 
+/**
+ * Helper function to generate the Chinese summary section HTML
+ * @param {string} summary - The summary text (possibly partial)
+ * @param {boolean} pending - Whether the summary is still being generated
+ * @returns {string} HTML for the summary section
+ */
+const getSummarySection = (summary, pending) => {
+    // Store the raw summary for clipboard copying (strip code block markers)
+    const rawSummary = summary.replace(/```text\s?/g, '').replace(/```/g, '');
+    const summaryBody = summary
+        ? formatChineseSummary(summary)
+        : '<p class="summary-pending"><i class="fa-solid fa-language me-2 fa-beat"></i>正在生成摘要...</p>';
+    const actions = pending ? '' : `
+            <div class="summary-actions">
+                <button class="copy-summary-btn" data-summary="${encodeURIComponent(rawSummary)}">
+                    <i class="fa-solid fa-copy"></i> 复制摘要
+                </button>
+            </div>`;
+    
+    return `
+        <div class="chinese-summary-container mb-4">
+            <div class="summary-header">
+                <h3><i class="fa-solid fa-language me-2"></i>中文摘要</h3>
+                <div class="summary-divider"></div>
+            </div>
+            <div class="chinese-summary">${summaryBody}</div>${actions}
+        </div>
+    `;
+};
+
 /**
  * Helper function to generate the original content section HTML
  * @param {string} content - The original content to display
@@ -10,6 +10,7 @@ import {
 } from './ui.js';
 // import { initializeBookmarks } from './bookmarks.js';
 import { initializeArticlePreview } from './content.js';
+import { initializePendingSections } from './progressive.js';
 
 /**
  * Initializes the application when the DOM is loaded
@@ -64,6 +65,7 @@ export const initializeApp = () => {
     initializeRetryButton(retryBtn);
     // initializeBookmarks(articlesContainer);
     initializeArticlePreview(articlesContainer, contentModal, modalElements);
+    initializePendingSections(articlesContainer);
     
     // Hide loading spinner after content loads
     window.addEventListener('load', () => {
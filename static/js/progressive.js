@@ -0,0 +1,58 @@
+// Progressive loading of domains that missed the home page render deadline
+
+/**
+ * Builds the fragment URL for a pending domain, using the page's current configuration
+ * @param {string} domain - The domain to load
+ * @returns {string} - The fragment endpoint URL
+ */
+const buildFragmentUrl = (domain) => {
+    const config = window.appConfig || {};
+    const params = new URLSearchParams({ domain });
+    if (config.domains) params.set('domains', config.domains);
+    if (config.articlesPerDomain) params.set('articles_per_domain', config.articlesPerDomain);
+    if (config.lookbackDays) params.set('lookback_days', config.lookbackDays);
+    return `/fragments/domain?${params.toString()}`;
+};
+
+/**
+ * Replaces a placeholder section with the rendered sections for its domain
+ * @param {HTMLElement} placeholder - The pending section element
+ */
+const loadPendingSection = async (placeholder) => {
+    const domain = placeholder.getAttribute('data-domain');
+    try {
+        const response = await fetch(buildFragmentUrl(domain));
+        if (!response.ok) {
+            throw new Error(`HTTP error! Status: ${response.status}`);
+        }
+        const template = document.createElement('template');
+        template.innerHTML = (await response.text()).trim();
+        placeholder.replaceWith(template.content);
+        
+        // Let AOS pick up the newly inserted cards
+        if (window.AOS) {
+            AOS.refreshHard();
+        }
+    } catch (error) {
+        console.error(`Failed to load articles from ${domain}:`, error);
+        placeholder.removeAttribute('aria-busy');
+        const status = placeholder.querySelector('.pending-status');
+        if (status) {
+            status.innerHTML = '';
+            const message = document.createElement('p');
+            message.className = 'mb-0 text-muted';
+            message.textContent = `Couldn't load news from ${domain}. Try refreshing the page.`;
+            status.appendChild(message);
+        }
+    }
+};
+
+/**
+ * Fills in every placeholder section on the page, in parallel
+ * @param {HTMLElement} articlesContainer - The container for all articles
+ */
+export const initializePendingSections = (articlesContainer) => {
+    if (articlesContainer) {
+        articlesContainer.querySelectorAll('.pending-section[data-domain]').forEach(loadPendingSection);
+    }
+};
@@ -0,0 +1,192 @@
+"""
+Summarizer Module
+
+This module provides the summarization engine that all Gemini calls go through.
+It holds one native Gemini async client per API key, limits
+how many generations run at once, and admits waiting requests in priority order
+through an admission controller, so user-facing summaries are served before
+background prefetch work. When the wait queue is full, or a request waits too
+long, it fails fast with SummaryOverloaded instead of hanging. Calls also go
+through the Gemini circuit breaker and adaptive timeout from the resilience
+module, and are spread over the Gemini API keys by the scheduler module.
+"""
+
+import asyncio
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Optional, Union
+
+from config import (
+    GEMINI_MODEL,
+    SUMMARY_CONCURRENCY,
+    SUMMARY_QUEUE_SIZE,
+    SUMMARY_QUEUE_TIMEOUT,
+    logger
+)
+from admission import AdmissionController, Overloaded, SharedPriority, PRIORITY_USER
+from resilience import guards, RateLimitedError
+from scheduler import ApiKey, scheduled
+
+if TYPE_CHECKING:
+    from google.ai import generativelanguage as glm
+
+# Options for the Gemini async clients (see GenerativeServiceAsyncClient), applied when they are created
+_gemini_options: dict = {}
+
+def configure_gemini(**options) -> None:
+    """
+    Set the options the Gemini async clients are created with, such as a transport.
+    An api_key option replaces the pool's keys; an empty one sends none.
+    Takes effect when the SDK is first used, or immediately if it is already loaded.
+    """
+    _gemini_options.clear()
+    _gemini_options.update(options)
+    engine.reset()
+
+def _create_client(api_key: str) -> "glm.GenerativeServiceAsyncClient":
+    # The SDK takes most of a second to import, so it is loaded on the first summary, not at startup
+    from google.ai import generativelanguage as glm
+
+    # Each key gets its own client, since genai.configure would set one key for the whole process.
+    # Options from configure_gemini take precedence over the key.
+    options = {"api_key": api_key, **_gemini_options}
+    api_key = options.pop("api_key")
+    if api_key:
+        options["client_options"] = {**options.get("client_options", {}), "api_key": api_key}
+    client = glm.GenerativeServiceAsyncClient(**options)
+    logger.info("Google Gemini API configured successfully")
+    return client
+
+def _model_name() -> str:
+    # The API addresses models by resource name
+    return GEMINI_MODEL if "/" in GEMINI_MODEL else f"models/{GEMINI_MODEL}"
+
+def _rate_limited(error: Exception) -> Optional[RateLimitedError]:
+    # google.api_core raises ResourceExhausted (code 429) for rate limits, with the delay in a RetryInfo detail
+    if getattr(error, "code", None) != 429:
+        return None
+    retry_after = None
+    for detail in getattr(error, "details", None) or []:
+        delay = getattr(detail, "retry_delay", None)
+        if hasattr(delay, "ToTimedelta"):
+            delay = delay.ToTimedelta()
+        if hasattr(delay, "total_seconds"):
+            retry_after = delay.total_seconds()
+    return RateLimitedError(f"Gemini rate limited: {error}", retry_after)
+
+class SummaryOverloaded(Overloaded):
+    """Raised when the engine is at capacity and the request cannot be queued."""
+
+class SummarizationEngine:
+    """
+    Concurrency-bounded, priority-ordered gateway to the Gemini API.
+    """
+
+    def __init__(self, concurrency: int, queue_size: int, queue_timeout: float):
+        self.admission = AdmissionController("summary", concurrency, queue_size, queue_timeout, error=SummaryOverloaded)
+        self._clients: Dict[str, "glm.GenerativeServiceAsyncClient"] = {}
+
+    def client(self, api_key: ApiKey) -> "glm.GenerativeServiceAsyncClient":
+        # Created once per key, on first use, and reused for every call
+        if api_key.key not in self._clients:
+            self._clients[api_key.key] = _create_client(api_key.key)
+        return self._clients[api_key.key]
+
+    def reset(self) -> None:
+        """Drop the async clients so they are rebuilt on the next call."""
+        self._clients.clear()
+
+    async def _request(self, api_key: ApiKey, prompt: str, generation_config: dict, stream: bool):
+        from google.ai import generativelanguage as glm
+        from google.generativeai.types import AsyncGenerateContentResponse
+
+        client = self.client(api_key)
+        request = glm.GenerateContentRequest(
+            model=_model_name(),
+            contents=[glm.Content(role="user", parts=[glm.Part(text=prompt)])],
+            generation_config=glm.GenerationConfig(**generation_config)
+        )
+        if stream:
+            return await AsyncGenerateContentResponse.from_aiterator(await client.stream_generate_content(request))
+        return AsyncGenerateContentResponse.from_response(await client.generate_content(request))
+
+    async def _start(self, api_key: ApiKey, prompt: str, generation_config: dict, stream: bool = False):
+        try:
+            return await asyncio.wait_for(
+                self._request(api_key, prompt, generation_config, stream),
+                timeout=guards["gemini"].timeout()
+            )
+        except Exception as e:
+            rate_limited = _rate_limited(e)
+            if rate_limited:
+                raise rate_limited from e
+            raise
+
+    def stats(self) -> dict:
+        """
+        Get engine counters for monitoring.
+
+        Returns:
+            dict: Active generations, queued requests, admitted and shed requests
+        """
+        return self.admission.stats()
+
+    def slot(self, priority: Union[int, SharedPriority] = PRIORITY_USER):
+        """
+        Hold one generation slot for the duration of the block.
+
+        Args:
+            priority (Union[int, SharedPriority], optional): Queue priority, lower is served first. Defaults to PRIORITY_USER.
+
+        Raises:
+            SummaryOverloaded: If the queue is full or the wait exceeds the queue timeout
+        """
+        return self.admission.slot(priority)
+
+    async def generate(self, prompt: str, generation_config: dict, priority: Union[int, SharedPriority] = PRIORITY_USER) -> Optional[str]:
+        """
+        Run one Gemini generation.
+
+        Args:
+            prompt (str): The full prompt
+            generation_config (dict): The Gemini generation settings
+            priority (Union[int, SharedPriority], optional): Queue priority. Defaults to PRIORITY_USER.
+
+        Returns:
+            Optional[str]: The generated text, or None if the response was empty
+        """
+        guard = guards["gemini"]
+
+        async def start(api_key: ApiKey):
+            # Tracked per attempt, so the time spent waiting for a key does not feed the timeout
+            async with guard.track(operation="generate"):
+                return await self._start(api_key, prompt, generation_config)
+
+        async with self.slot(priority):
+            async with scheduled("gemini", start, guard) as response:
+                return response.text if response and response.text else None
+
+    async def stream(self, prompt: str, generation_config: dict, priority: Union[int, SharedPriority] = PRIORITY_USER) -> AsyncIterator[str]:
+        """
+        Run one Gemini generation, yielding text as it is produced.
+
+        Args:
+            prompt (str): The full prompt
+            generation_config (dict): The Gemini generation settings
+            priority (Union[int, SharedPriority], optional): Queue priority. Defaults to PRIORITY_USER.
+
+        Yields:
+            str: Chunks of generated text
+        """
+        guard = guards["gemini"]
+        async with self.slot(priority):
+            # Only the wait for the stream to start is bounded; its duration does not feed the timeout
+            async with guard.track(record_latency=False, operation="stream"):
+                async with scheduled(
+                    "gemini",
+                    lambda api_key: self._start(api_key, prompt, generation_config, stream=True)
+                ) as response:
+                    async for chunk in response:
+                        if chunk.text:
+                            yield chunk.text
+
+# Shared engine for the process
+engine = SummarizationEngine(SUMMARY_CONCURRENCY, SUMMARY_QUEUE_SIZE, SUMMARY_QUEUE_TIMEOUT)
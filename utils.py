@@ -1,4 +1,7 @@
 import re
+import math
+import hashlib
+from typing import Dict, Optional
 from config import logger
 
 def datetimeformat(value, format="%Y"):
@@ -32,4 +35,74 @@ def extract_title_from_content(content):
             title = title[:50] + '...'
         return title
     
-    return None 
\ No newline at end of file
+    return None
+
+
+# Matches CJK characters, which tokenize at roughly one token per character
+CJK_PATTERN = re.compile(r'[\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]')
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of model tokens in a text.
+    
+    Args:
+        text (str): The text to measure
+        
+    Returns:
+        int: Approximate token count (one per CJK character, one per four other characters)
+    """
+    cjk = len(CJK_PATTERN.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+def clean_text(content: str) -> str:
+    """
+    Strip HTML from content while keeping paragraph breaks.
+    
+    Args:
+        content (str): The HTML content
+        
+    Returns:
+        str: Plain text with paragraphs separated by blank lines
+    """
+    text = re.sub(r'(?i)<br\s*/?>|</(p|div|h[1-6]|li|tr|blockquote)>', '\n', content)
+    text = re.sub(r'<[^>]+>', ' ', text)
+    text = re.sub(r'[ \t\r\f\v]+', ' ', text)
+    text = re.sub(r' *\n *', '\n', text)
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    return text.strip()
+
+def count_words(text: str) -> int:
+    """
+    Count the words in a text, counting each CJK character as a word.
+    
+    Args:
+        text (str): The text to measure
+        
+    Returns:
+        int: The word count
+    """
+    cjk = len(CJK_PATTERN.findall(text))
+    return cjk + len(CJK_PATTERN.sub(' ', text).split())
+
+def with_text_fields(content_data: Dict, text: Optional[str] = None) -> Dict:
+    """
+    Add the plain text of an extraction result and its derived fields, so
+    summaries and cache keys never re-parse the rendered HTML.
+    
+    Args:
+        content_data (Dict): The extraction result, with the rendered HTML in "content"
+        text (str, optional): The extracted text, if the provider returned it separately from the HTML
+        
+    Returns:
+        Dict: The result with "text", "content_hash", "word_count" and "token_count"
+    """
+    if "content_hash" in content_data:
+        return content_data
+    text = clean_text(content_data.get("content", "") if text is None else text)
+    return {
+        **content_data,
+        "text": text,
+        "content_hash": hashlib.sha256(text.encode()).hexdigest(),
+        "word_count": count_words(text),
+        "token_count": estimate_tokens(text)
+    }